@@ -17,9 +17,44 @@ EXPERIMENTS_DIR.mkdir(parents=True, exist_ok=True)
 TILE_SIZE = int(os.getenv("TILE_SIZE", 512))
 DEFAULT_BACKBONE = os.getenv("DEFAULT_BACKBONE", "efficientnet")
 
+# Serving model; an empty MODEL_CHECKPOINT runs a randomly initialised model
+MODEL_CHECKPOINT = os.getenv("MODEL_CHECKPOINT", "efficientnet_unet.pth")
+
+# Inference GSD in m/pixel; unset uses the model's registry metadata
+MODEL_TARGET_GSD = float(os.getenv("MODEL_TARGET_GSD", 0)) or None
+
+# Coarse-to-fine inference; COARSE_FACTOR=0 runs every tile at full resolution
+COARSE_FACTOR = int(os.getenv("COARSE_FACTOR", 0)) or None
+COARSE_THRESHOLD = float(os.getenv("COARSE_THRESHOLD", 0.2))
+
+# Tile triage classifier (training/train_triage.py); empty disables it.
+# Tiles are skipped below TRIAGE_THRESHOLD * (1 - TRIAGE_MARGIN)
+TRIAGE_CHECKPOINT = os.getenv("TRIAGE_CHECKPOINT", "")
+TRIAGE_THRESHOLD = float(os.getenv("TRIAGE_THRESHOLD", 0.5))
+TRIAGE_MARGIN = float(os.getenv("TRIAGE_MARGIN", 0.5))
+
 # Energy model constants
 SOLAR_IRRADIANCE = float(os.getenv("SOLAR_IRRADIANCE", 0.75))
 SUNLIGHT_HOURS = float(os.getenv("SUNLIGHT_HOURS", 1700))
 COOLING_EFFICIENCY = float(os.getenv("COOLING_EFFICIENCY", 0.65))
 ELECTRICITY_PRICE = float(os.getenv("ELECTRICITY_PRICE", 0.3))
-EMISSION_FACTOR = float(os.getenv("EMISSION_FACTOR", 0.1))
\ No newline at end of file
+EMISSION_FACTOR = float(os.getenv("EMISSION_FACTOR", 0.1))
+
+# Job scheduler
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", 100))
+
+# Batch / mosaic jobs
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 2))
+MOSAIC_BLOCK_SIZE = int(os.getenv("MOSAIC_BLOCK_SIZE", 4096))
+
+# Uploads
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 4 * 1024 ** 3))
+
+# Map tiles
+TILE_CACHE_BYTES = int(os.getenv("TILE_CACHE_BYTES", 64 * 1024 ** 2))
+
+# Instrumentation (METRICS_ENABLED is read by backend.utils.metrics)
+PROFILE_JOBS = os.getenv("PROFILE_JOBS", "0") == "1"
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 25))
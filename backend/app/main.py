@@ -1,21 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from backend.app.routes.health import router as health_router
 from backend.app.routes.upload import router as upload_router
 from backend.app.routes.process import router as process_router
+from backend.app.routes.process import scheduler
+from backend.app.routes.status import router as status_router
 from backend.app.routes.results import router as results_router
+from backend.app.routes.tiles import router as tiles_router
+from backend.app.routes.analytics import router as analytics_router
+from backend.app.routes.spatial import router as spatial_router
+from backend.app.routes.metrics import router as metrics_router
 
 from backend.services.db import init_db
 
 init_db()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler.start()
+    yield
+    scheduler.stop(timeout=5)
+
+
 app = FastAPI(
     title="Rooflytics API",
     description="Urban Roof Intelligence Backend",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(health_router)
 app.include_router(upload_router)
 app.include_router(process_router)
-app.include_router(results_router)
\ No newline at end of file
+app.include_router(status_router)
+app.include_router(results_router)
+app.include_router(tiles_router)
+app.include_router(analytics_router)
+app.include_router(spatial_router)
+app.include_router(metrics_router)
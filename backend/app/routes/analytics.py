@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Query
+
+from backend.services.db import get_roof_totals, list_analysis_results, list_roofs
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/summary")
+def summary(job_id: str = None):
+    totals = get_roof_totals(job_id)
+
+    return {
+        "job_id": job_id,
+        **totals,
+        "area_m2": round(totals["area_m2"], 2),
+        "energy_kwh": round(totals["energy_kwh"], 2),
+        "cost_nzd": round(totals["cost_nzd"], 2),
+        "co2_kg": round(totals["co2_kg"], 2),
+    }
+
+
+@router.get("/roofs/{job_id}")
+def roofs(
+    job_id: str,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    return {
+        "job_id": job_id,
+        "roofs": list_roofs(job_id, limit=limit, offset=offset),
+    }
+
+
+@router.get("/files/{job_id}")
+def files(job_id: str):
+    """Per-file rows of a job (one for single uploads, one per GeoTIFF of a batch)."""
+    return {
+        "job_id": job_id,
+        "files": list_analysis_results(job_id),
+    }
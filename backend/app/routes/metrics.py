@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from backend.utils.metrics import render_prometheus
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
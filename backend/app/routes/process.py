@@ -1,104 +1,98 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pathlib import Path
-import uuid
 
-from backend.services.data_loader import load_geotiff
-from backend.services.segmentation import RoofSegmentationService
-from backend.services.postprocess import clean_roof_mask
-from backend.services.reflectance import compute_reflectance_map
-from backend.services.clustering import (
-    extract_roof_reflectance,
-    cluster_roofs_by_reflectance,
-    create_thermal_cluster_mask,
+from backend.app.config import (
+    COARSE_FACTOR,
+    COARSE_THRESHOLD,
+    DEFAULT_BACKBONE,
+    MODEL_CHECKPOINT,
+    MODEL_TARGET_GSD,
+    TRIAGE_CHECKPOINT,
+    TRIAGE_MARGIN,
+    TRIAGE_THRESHOLD,
+    JOB_WORKERS,
+    JOB_QUEUE_LIMIT,
+    PROFILE_JOBS,
+    PROFILE_TOP_N,
 )
-from backend.services.energy_model import (
-    compute_roof_areas,
-    estimate_cooling_savings,
+from backend.services.segmentation import RoofSegmentationService
+from backend.services.jobs import JobScheduler, QueueFullError
+from backend.services.pipeline import (
+    ANALYSIS_PIPELINE,
+    BATCH_PIPELINE,
+    clear_checkpoints,
+    run_batch,
+    run_file,
 )
-from backend.services.export import export_mask_geotiff
-
-from backend.services.db import insert_analysis_result
 
 
 router = APIRouter(prefix="/process", tags=["Process"])
 
-MODEL_PATH = "efficientnet_unet.pth"
 RESULTS_ROOT = Path("results")
 RESULTS_ROOT.mkdir(exist_ok=True)
 
-service = RoofSegmentationService(checkpoint_path=MODEL_PATH)
+service = RoofSegmentationService(
+    checkpoint_path=MODEL_CHECKPOINT or None,
+    model_name=DEFAULT_BACKBONE,
+    target_gsd=MODEL_TARGET_GSD,
+    coarse_factor=COARSE_FACTOR,
+    coarse_threshold=COARSE_THRESHOLD,
+    triage_checkpoint=TRIAGE_CHECKPOINT or None,
+    triage_threshold=TRIAGE_THRESHOLD,
+    triage_margin=TRIAGE_MARGIN,
+)
 
 
-@router.post("/{job_id}")
-def process_job(job_id: str):
+def run_job(job_id: str, progress):
+    """
+    Scheduler handler: run the job's pipeline, resuming from its
+    checkpoints if it was interrupted (see backend.services.pipeline).
+    """
     job_dir = RESULTS_ROOT / job_id
-    input_path = job_dir / "input.tif"
-
-    if not input_path.exists():
-        return {"error": "Input file not found for job"}
-
-    image, meta = load_geotiff(input_path, is_mask=False)
-
-    raw_mask = service.predict(image)
-    cleaned_mask = clean_roof_mask(raw_mask, min_area=150)
 
-    reflectance = compute_reflectance_map(image, cleaned_mask)
-
-    roof_stats = extract_roof_reflectance(cleaned_mask, reflectance)
-    roof_stats = cluster_roofs_by_reflectance(roof_stats)
-    thermal_mask = create_thermal_cluster_mask(cleaned_mask, roof_stats)
+    if (job_dir / "inputs").is_dir():
+        progress.stages = BATCH_PIPELINE.names
+        return run_batch(job_dir / "inputs", job_dir, job_id, service, progress.stage)
+
+    return run_file(
+        job_dir / "input.tif",
+        job_dir,
+        job_id,
+        "input.tif",
+        service,
+        progress.stage,
+    )
 
-    export_mask_geotiff(raw_mask, meta, job_dir / "pred_mask.tif")
-    export_mask_geotiff(cleaned_mask, meta, job_dir / "pred_mask_cleaned.tif")
-    export_mask_geotiff(thermal_mask, meta, job_dir / "thermal_clusters.tif")
 
-    transform = meta["transform"]
-    pixel_area_m2 = abs(transform[0] * transform[4])
+scheduler = JobScheduler(
+    handler=run_job,
+    stages=ANALYSIS_PIPELINE.names,
+    num_workers=JOB_WORKERS,
+    max_queued=JOB_QUEUE_LIMIT,
+    artifacts_dir=lambda job_id: RESULTS_ROOT / job_id,
+    profile_top_n=PROFILE_TOP_N,
+    # Re-running a completed job recomputes every stage
+    reset=lambda job_id: clear_checkpoints(RESULTS_ROOT / job_id),
+)
 
-    roof_areas = compute_roof_areas(cleaned_mask, pixel_area_m2)
 
-    constants = {
-        "SOLAR_IRRADIANCE": 0.75,
-        "SUNLIGHT_HOURS": 1700,
-        "COOLING_EFFICIENCY": 0.65,
-        "ELECTRICITY_PRICE": 0.30,
-        "EMISSION_FACTOR": 0.10,
-        "USAGE_FACTOR": 0.025,
-        "MAX_KWH_PER_ROOF": 5000,
-    }
+@router.post("/{job_id}", status_code=202)
+def process_job(job_id: str, priority: int = 0, profile: bool = False):
+    job_dir = RESULTS_ROOT / job_id
 
-    energy = estimate_cooling_savings(roof_stats, roof_areas, constants)
-
-    total_energy = sum(e["energy_kwh_per_year"] for e in energy)
-    total_cost = sum(e["cost_savings_per_year"] for e in energy)
-    total_co2 = sum(e["co2_savings_kg_per_year"] for e in energy)
-
-    insert_analysis_result(
-    job_id=job_id,
-    tile_name="input.tif",
-    num_roofs=len(roof_stats),
-    hot_roofs=sum(r["type"] == "hot" for r in roof_stats),
-    cool_roofs=sum(r["type"] == "cool" for r in roof_stats),
-    energy_kwh=total_energy,
-    cost_nzd=total_cost,
-    co2_kg=total_co2,
-    usage_factor=constants["USAGE_FACTOR"],
-    max_kwh_per_roof=constants["MAX_KWH_PER_ROOF"],
-    )
+    if not (job_dir / "input.tif").exists() and not (job_dir / "inputs").is_dir():
+        raise HTTPException(status_code=404, detail="Input file not found for job")
 
+    try:
+        job = scheduler.submit(
+            job_id,
+            priority=priority,
+            profile=profile or PROFILE_JOBS,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     return {
         "job_id": job_id,
-        "num_roofs": len(roof_stats),
-        "cool_roofs": sum(r["type"] == "cool" for r in roof_stats),
-        "hot_roofs": sum(r["type"] == "hot" for r in roof_stats),
-        "total_energy_kwh_per_year": round(
-            sum(e["energy_kwh_per_year"] for e in energy), 2
-        ),
-        "total_cost_nzd_per_year": round(
-            sum(e["cost_savings_per_year"] for e in energy), 2
-        ),
-        "total_co2_kg_per_year": round(
-            sum(e["co2_savings_kg_per_year"] for e in energy), 2
-        ),
+        "status": job["status"],
     }
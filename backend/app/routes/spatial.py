@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.app.schemas import PolygonQuery
+from backend.services.db import query_roofs_in_bbox, get_bbox_totals
+from backend.services.spatial import summarize_polygon
+
+router = APIRouter(prefix="/spatial", tags=["Spatial"])
+
+
+@router.get("/bbox")
+def roofs_in_bbox(
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    crs: str = None,
+    limit: int = Query(1000, ge=0, le=100000),
+):
+    if min_x > max_x or min_y > max_y:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+    return {
+        "totals": get_bbox_totals(min_x, min_y, max_x, max_y, crs=crs),
+        "roofs": query_roofs_in_bbox(
+            min_x, min_y, max_x, max_y, crs=crs, limit=limit
+        ),
+    }
+
+
+@router.get("/point")
+def roofs_at_point(x: float, y: float, crs: str = None):
+    return {
+        "roofs": query_roofs_in_bbox(x, y, x, y, crs=crs),
+    }
+
+
+@router.post("/polygon")
+def roofs_in_polygon(query: PolygonQuery):
+    try:
+        totals, roofs = summarize_polygon(
+            query.geometry, crs=query.crs, limit=query.limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "totals": totals,
+        "roofs": roofs,
+    }
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException
+import json
+
+from backend.services.db import get_job
+
+router = APIRouter(prefix="/status", tags=["Status"])
+
+
+@router.get("/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "priority": job["priority"],
+        "profile": bool(job["profile"]),
+        "stage": job["stage"],
+        "progress": round(job["progress"] or 0.0, 3),
+        "stage_timings": json.loads(job["stage_timings"] or "{}"),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "result": json.loads(job["result"]) if job["result"] else None,
+    }
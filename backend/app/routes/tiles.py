@@ -0,0 +1,124 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from pathlib import Path
+
+from backend.app.config import TILE_CACHE_BYTES
+from backend.services.tiles import (
+    TileCache,
+    preview_shape,
+    render_rgb_tile,
+    render_class_tile,
+    render_rgb_preview,
+    render_class_preview,
+    THERMAL_PALETTE,
+    MASK_PALETTE,
+)
+
+router = APIRouter(prefix="/tiles", tags=["Tiles"])
+
+RESULTS_ROOT = Path("results")
+
+MAX_ZOOM = 24
+MAX_PREVIEW_SIZE = 4096
+
+# layer -> (result file, renderer)
+LAYERS = {
+    "rgb": (
+        "input.tif",
+        render_rgb_tile,
+    ),
+    "thermal": (
+        "thermal_clusters.tif",
+        lambda path, z, x, y: render_class_tile(path, z, x, y, THERMAL_PALETTE),
+    ),
+    "mask": (
+        "pred_mask_cleaned.tif",
+        lambda path, z, x, y: render_class_tile(path, z, x, y, MASK_PALETTE),
+    ),
+}
+
+# layer -> whole-raster preview renderer (path, (height, width))
+PREVIEWS = {
+    "rgb": render_rgb_preview,
+    "thermal": lambda path, shape: render_class_preview(path, shape, THERMAL_PALETTE),
+    "mask": lambda path, shape: render_class_preview(path, shape, MASK_PALETTE),
+}
+
+cache = TileCache(max_bytes=TILE_CACHE_BYTES)
+
+
+def _layer_path(job_id: str, layer: str):
+    if layer not in LAYERS:
+        raise HTTPException(status_code=404, detail="Unknown layer")
+
+    path = RESULTS_ROOT / job_id / LAYERS[layer][0]
+
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Layer not available")
+
+    return path
+
+
+def _png_response(png: bytes):
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
+
+
+@router.get("/{job_id}/{layer}/preview.png")
+def get_preview(
+    job_id: str,
+    layer: str,
+    max_width: int = 1024,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+):
+    """
+    Whole layer as one small PNG.
+
+    Pass width and height to get several layers on the same grid (the
+    masks may be at a decimated resolution, see MODEL_TARGET_GSD).
+    """
+    path = _layer_path(job_id, layer)
+
+    if (width is None) != (height is None):
+        raise HTTPException(status_code=400, detail="Pass both width and height")
+
+    sizes = (width, height) if width is not None else (max_width,)
+    if not all(0 < n <= MAX_PREVIEW_SIZE for n in sizes):
+        raise HTTPException(status_code=400, detail="Preview size out of range")
+
+    shape = (height, width) if width is not None else preview_shape(path, max_width)
+
+    key = (job_id, layer, path.stat().st_mtime_ns, "preview", *shape)
+
+    png = cache.get(key)
+    if png is None:
+        png = PREVIEWS[layer](path, shape)
+        cache.put(key, png)
+
+    return _png_response(png)
+
+
+@router.get("/{job_id}/{layer}/{z}/{x}/{y}.png")
+def get_tile(job_id: str, layer: str, z: int, x: int, y: int):
+    path = _layer_path(job_id, layer)
+
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Tile out of range")
+
+    render = LAYERS[layer][1]
+
+    # mtime in the key so a reprocessed job never serves stale tiles
+    key = (job_id, layer, path.stat().st_mtime_ns, z, x, y)
+
+    png = cache.get(key)
+    if png is None:
+        png = render(path, z, x, y)
+        cache.put(key, png)
+
+    return _png_response(png)
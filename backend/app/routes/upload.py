@@ -1,13 +1,49 @@
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
+from typing import List
+import hashlib
+import shutil
 import uuid
 
+import aiofiles
+
+from backend.app.config import UPLOAD_CHUNK_SIZE, MAX_UPLOAD_BYTES
+from backend.services.data_loader import validate_geotiff
+from backend.services.mosaic import RASTER_SUFFIXES, VRT_SUFFIX, validate_batch
+
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 RESULTS_ROOT = Path("results")
 RESULTS_ROOT.mkdir(exist_ok=True)
 
 
+async def _stream_to_disk(file: UploadFile, path: Path):
+    """
+    Stream an upload to disk chunk by chunk, hashing as we go.
+
+    Returns:
+        (size_bytes, sha256 hex digest)
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+
+    async with aiofiles.open(path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes",
+                )
+
+            sha256.update(chunk)
+            await f.write(chunk)
+
+    return size, sha256.hexdigest()
+
+
 @router.post("/")
 async def upload_geotiff(file: UploadFile = File(...)):
     job_id = str(uuid.uuid4())
@@ -15,11 +51,83 @@ async def upload_geotiff(file: UploadFile = File(...)):
     job_dir.mkdir()
 
     input_path = job_dir / "input.tif"
+    partial_path = job_dir / "input.tif.part"
+
+    # Any failure (bad file, disk error, client disconnect, cancelled
+    # request) must not leave a partial job directory behind
+    completed = False
+
+    try:
+        size, digest = await _stream_to_disk(file, partial_path)
 
-    with open(input_path, "wb") as f:
-        f.write(await file.read())
+        try:
+            raster = await run_in_threadpool(validate_geotiff, partial_path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        partial_path.rename(input_path)
+        completed = True
+
+    finally:
+        if not completed:
+            shutil.rmtree(job_dir, ignore_errors=True)
 
     return {
         "job_id": job_id,
         "message": "File uploaded successfully",
+        "sha256": digest,
+        "size_bytes": size,
+        "raster": raster,
+    }
+
+
+@router.post("/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload adjacent GeoTIFF tiles (optionally with a VRT mosaic of
+    them) to be processed as one batch job.
+    """
+    job_id = str(uuid.uuid4())
+    inputs_dir = RESULTS_ROOT / job_id / "inputs"
+    inputs_dir.mkdir(parents=True)
+
+    uploaded = []
+    completed = False
+
+    try:
+        for file in files:
+            name = Path(file.filename or "").name
+            suffix = Path(name).suffix.lower()
+
+            if suffix not in RASTER_SUFFIXES + (VRT_SUFFIX,):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unsupported file type: {name!r}",
+                )
+
+            if any(u["name"] == name for u in uploaded):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Duplicate file name: {name!r}",
+                )
+
+            size, digest = await _stream_to_disk(file, inputs_dir / name)
+            uploaded.append({"name": name, "sha256": digest, "size_bytes": size})
+
+        try:
+            batch = await run_in_threadpool(validate_batch, inputs_dir)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        completed = True
+
+    finally:
+        if not completed:
+            shutil.rmtree(inputs_dir.parent, ignore_errors=True)
+
+    return {
+        "job_id": job_id,
+        "message": f"{len(uploaded)} files uploaded successfully",
+        "files": uploaded,
+        "batch": batch,
     }
@@ -0,0 +1,12 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PolygonQuery(BaseModel):
+    geometry: dict = Field(
+        ...,
+        description="GeoJSON Polygon or MultiPolygon in the roofs' CRS",
+    )
+    crs: Optional[str] = None
+    limit: int = Field(1000, ge=0, le=100000)
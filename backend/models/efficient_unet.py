@@ -2,13 +2,16 @@ import segmentation_models_pytorch as smp
 import torch.nn as nn
 
 
-def get_efficientnet_unet(num_classes: int = 1):
+def get_efficientnet_unet(num_classes: int = 1, encoder_weights="imagenet"):
     """
     EfficientNet-B0 U-Net with ImageNet pretrained encoder.
+
+    Pass encoder_weights=None when a full checkpoint is loaded
+    afterwards, to skip downloading the ImageNet weights.
     """
     model = smp.Unet(
         encoder_name="efficientnet-b0",
-        encoder_weights="imagenet",
+        encoder_weights=encoder_weights,
         in_channels=3,
         classes=num_classes,
         activation=None,  # logits
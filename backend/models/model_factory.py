@@ -0,0 +1,76 @@
+import torch
+
+from backend.models.efficient_unet import get_efficientnet_unet
+from backend.models.pruning import resize_to_state_dict
+from backend.models.student_unet import StudentUNet
+from backend.models.unet_scratch import UNet
+
+
+# name -> builder(pretrained) and metadata
+#   target_gsd: ground sample distance (m/pixel) the model was trained
+#       at; finer imagery is decimated to it before inference
+MODELS = {
+    "efficientnet": {
+        "build": lambda pretrained: get_efficientnet_unet(
+            encoder_weights="imagenet" if pretrained else None,
+        ),
+        "target_gsd": 0.075,  # AIRS
+    },
+    "scratch": {
+        "build": lambda pretrained: UNet(),
+        "target_gsd": 0.075,  # AIRS
+    },
+    # Distilled from efficientnet (training/distill.py), ~4x faster on CPU
+    "student": {
+        "build": lambda pretrained: StudentUNet(),
+        "target_gsd": 0.075,  # AIRS, via the teacher
+    },
+    # ~25k parameters; for load tests and smoke runs, not for accuracy
+    "tiny": {
+        "build": lambda pretrained: UNet(base_channels=8),
+        "target_gsd": None,
+    },
+}
+
+
+def model_info(name: str):
+    """
+    Registry metadata of a model (everything but the builder).
+    """
+    if name not in MODELS:
+        raise ValueError(
+            f"Unknown model '{name}', expected one of {sorted(MODELS)}"
+        )
+
+    return {k: v for k, v in MODELS[name].items() if k != "build"}
+
+
+def build_model(name: str, pretrained: bool = False):
+    """
+    Build a segmentation model by name.
+
+    Args:
+        name: one of MODELS
+        pretrained: load ImageNet encoder weights where the model
+            has them (only needed when training from this model)
+
+    Returns:
+        torch.nn.Module producing (N, 1, H, W) logits
+    """
+    model_info(name)  # validates the name
+
+    return MODELS[name]["build"](pretrained)
+
+
+def load_weights(model, checkpoint_path: str, map_location="cpu"):
+    """
+    Load a state dict into model. Checkpoints of pruned models
+    (training/prune.py) are smaller than the architecture they were
+    built from, so layers are shrunk to the saved shapes first.
+    """
+    state_dict = torch.load(checkpoint_path, map_location=map_location)
+
+    resize_to_state_dict(model, state_dict)
+    model.load_state_dict(state_dict)
+
+    return model
@@ -0,0 +1,157 @@
+import torch
+import torch.nn as nn
+
+
+def _slice_conv(conv: nn.Conv2d, out_idx=None, in_idx=None):
+    """Keep only the given output / input channels of conv, in place."""
+    weight = conv.weight.data
+    depthwise = conv.groups > 1 and conv.groups == conv.in_channels
+
+    if out_idx is not None:
+        weight = weight[out_idx]
+        if conv.bias is not None:
+            conv.bias = nn.Parameter(conv.bias.data[out_idx].clone())
+        conv.out_channels = len(out_idx)
+
+        if depthwise:
+            conv.in_channels = conv.groups = len(out_idx)
+
+    if in_idx is not None and not depthwise:
+        weight = weight[:, in_idx]
+        conv.in_channels = len(in_idx)
+
+    conv.weight = nn.Parameter(weight.clone())
+
+
+def _slice_bn(bn: nn.BatchNorm2d, idx):
+    bn.weight = nn.Parameter(bn.weight.data[idx].clone())
+    bn.bias = nn.Parameter(bn.bias.data[idx].clone())
+    bn.running_mean = bn.running_mean[idx].clone()
+    bn.running_var = bn.running_var[idx].clone()
+    bn.num_features = len(idx)
+
+
+def _keep(bn: nn.BatchNorm2d, ratio: float, min_channels: int, multiple: int = 8):
+    """
+    Indices of the channels to keep, ranked by |BN gamma| (a channel
+    whose scale is near zero contributes little after normalisation).
+
+    The count is rounded to a multiple of 8, which CPU convolution
+    kernels vectorise well.
+    """
+    n = bn.num_features
+    keep = max(min_channels, int(round(n * (1 - ratio) / multiple)) * multiple)
+
+    if keep >= n:
+        return None
+
+    order = torch.argsort(bn.weight.data.abs(), descending=True)
+    return torch.sort(order[:keep]).values
+
+
+def prune_mbconv(block, ratio: float, min_channels: int = 8):
+    """
+    Remove expanded channels of an EfficientNet MBConv block.
+
+    Only the channels between the expansion and the projection are
+    pruned, so the block's input, output and residual are untouched.
+    """
+    if not block._has_expansion:
+        return
+
+    idx = _keep(block._bn1, ratio, min_channels)
+    if idx is None:
+        return
+
+    _slice_conv(block._expand_conv, out_idx=idx)
+    _slice_bn(block._bn0, idx)
+    _slice_conv(block._depthwise_conv, out_idx=idx)
+    _slice_bn(block._bn1, idx)
+
+    if block._has_se:
+        _slice_conv(block._se_reduce, in_idx=idx)
+        _slice_conv(block._se_expand, out_idx=idx)
+
+    _slice_conv(block._project_conv, in_idx=idx)
+
+
+def prune_decoder_block(block, consumer: nn.Conv2d, ratio: float, min_channels: int = 8):
+    """
+    Remove channels of both convolutions of a U-Net decoder block.
+
+    The block's output feeds consumer (the next block's conv1, where it
+    comes first in the concatenation with the skip, or the
+    segmentation head), whose input channels are sliced to match.
+    """
+    conv1, bn1 = block.conv1[0], block.conv1[1]
+    conv2, bn2 = block.conv2[0], block.conv2[1]
+
+    idx = _keep(bn1, ratio, min_channels)
+    if idx is not None:
+        _slice_conv(conv1, out_idx=idx)
+        _slice_bn(bn1, idx)
+        _slice_conv(conv2, in_idx=idx)
+
+    idx = _keep(bn2, ratio, min_channels)
+    if idx is not None:
+        width = conv2.out_channels
+        skip = torch.arange(width, consumer.in_channels)
+
+        _slice_conv(conv2, out_idx=idx)
+        _slice_bn(bn2, idx)
+        _slice_conv(consumer, in_idx=torch.cat([idx, skip]))
+
+
+def prune_unet(model, ratio: float, min_channels: int = 8):
+    """
+    One structured pruning round on an smp EfficientNet U-Net.
+
+    Every MBConv expansion and decoder convolution loses ratio of its
+    remaining channels (never going below min_channels). Channels are
+    physically removed, so the model gets smaller and faster.
+    """
+    for block in model.encoder._blocks:
+        prune_mbconv(block, ratio, min_channels)
+
+    blocks = model.decoder.blocks
+    consumers = [b.conv1[0] for b in blocks[1:]] + [model.segmentation_head[0]]
+
+    for block, consumer in zip(blocks, consumers):
+        prune_decoder_block(block, consumer, ratio, min_channels)
+
+    return model
+
+
+def resize_to_state_dict(model, state_dict):
+    """
+    Shrink convolutions and batch norms to the shapes in state_dict so
+    a pruned checkpoint loads into a freshly built model.
+    """
+    for name, module in model.named_modules():
+        key = f"{name}.weight"
+        if key not in state_dict:
+            continue
+
+        shape = state_dict[key].shape
+
+        if isinstance(module, nn.Conv2d) and module.weight.shape != shape:
+            depthwise = module.groups > 1 and module.groups == module.in_channels
+
+            module.out_channels = shape[0]
+            module.in_channels = shape[0] if depthwise else shape[1]
+            if depthwise:
+                module.groups = shape[0]
+
+            module.weight = nn.Parameter(torch.empty(shape))
+            if module.bias is not None:
+                module.bias = nn.Parameter(torch.empty(shape[0]))
+
+        elif isinstance(module, nn.BatchNorm2d) and module.num_features != shape[0]:
+            n = shape[0]
+            module.num_features = n
+            module.weight = nn.Parameter(torch.empty(n))
+            module.bias = nn.Parameter(torch.empty(n))
+            module.running_mean = torch.zeros(n)
+            module.running_var = torch.ones(n)
+
+    return model
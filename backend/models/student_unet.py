@@ -0,0 +1,68 @@
+import torch
+import torch.nn as nn
+
+
+class SeparableConv(nn.Sequential):
+    """Depthwise 3x3 followed by pointwise 1x1, BN and ReLU."""
+
+    def __init__(self, in_ch, out_ch):
+        super().__init__(
+            nn.Conv2d(in_ch, in_ch, 3, padding=1, groups=in_ch, bias=False),
+            nn.Conv2d(in_ch, out_ch, 1, bias=False),
+            nn.BatchNorm2d(out_ch),
+            nn.ReLU(inplace=True),
+        )
+
+
+class SeparableDoubleConv(nn.Sequential):
+    def __init__(self, in_ch, out_ch):
+        super().__init__(
+            SeparableConv(in_ch, out_ch),
+            SeparableConv(out_ch, out_ch),
+        )
+
+
+class StudentUNet(nn.Module):
+    """
+    Small U-Net built from depthwise separable convolutions, trained
+    by distillation from the EfficientNet U-Net (training/distill.py).
+    """
+
+    def __init__(self, in_channels=3, out_channels=1, base_channels=16):
+        super().__init__()
+
+        c = base_channels
+
+        # Strided full convolution on the 3-channel input: the network
+        # runs at half resolution and the logits are upsampled at the end
+        self.stem = nn.Sequential(
+            nn.Conv2d(in_channels, c, 3, stride=2, padding=1, bias=False),
+            nn.BatchNorm2d(c),
+            nn.ReLU(inplace=True),
+        )
+
+        self.enc1 = SeparableDoubleConv(c, c)
+        self.enc2 = SeparableDoubleConv(c, c * 2)
+        self.enc3 = SeparableDoubleConv(c * 2, c * 4)
+        self.enc4 = SeparableDoubleConv(c * 4, c * 8)
+
+        self.pool = nn.MaxPool2d(2)
+
+        self.dec3 = SeparableDoubleConv(c * 8 + c * 4, c * 4)
+        self.dec2 = SeparableDoubleConv(c * 4 + c * 2, c * 2)
+        self.dec1 = SeparableDoubleConv(c * 2 + c, c)
+
+        self.up = nn.Upsample(scale_factor=2, mode="bilinear", align_corners=False)
+        self.out = nn.Conv2d(c, out_channels, 1)
+
+    def forward(self, x):
+        e1 = self.enc1(self.stem(x))
+        e2 = self.enc2(self.pool(e1))
+        e3 = self.enc3(self.pool(e2))
+        e4 = self.enc4(self.pool(e3))
+
+        d3 = self.dec3(torch.cat([self.up(e4), e3], dim=1))
+        d2 = self.dec2(torch.cat([self.up(d3), e2], dim=1))
+        d1 = self.dec1(torch.cat([self.up(d2), e1], dim=1))
+
+        return self.up(self.out(d1))
@@ -0,0 +1,37 @@
+import torch.nn as nn
+
+
+def _down(in_ch, out_ch):
+    return nn.Sequential(
+        nn.Conv2d(in_ch, out_ch, 3, stride=2, padding=1, bias=False),
+        nn.BatchNorm2d(out_ch),
+        nn.ReLU(inplace=True),
+    )
+
+
+class TileClassifier(nn.Module):
+    """
+    Tiny CNN predicting whether a tile contains any roof.
+
+    The tile is average-pooled by input_downsample before the first
+    convolution, so a 512 px tile costs a few MFLOPs on CPU.
+    Outputs one logit per tile, shape (N, 1).
+    """
+
+    def __init__(self, in_channels=3, base_channels=8, input_downsample=4):
+        super().__init__()
+
+        c = base_channels
+
+        self.pool = nn.AvgPool2d(input_downsample)
+        self.features = nn.Sequential(
+            _down(in_channels, c),
+            _down(c, c * 2),
+            _down(c * 2, c * 4),
+            _down(c * 4, c * 4),
+        )
+        self.head = nn.Linear(c * 4, 1)
+
+    def forward(self, x):
+        x = self.features(self.pool(x))
+        return self.head(x.mean(dim=(2, 3)))
@@ -17,20 +17,22 @@ class DoubleConv(nn.Module):
 
 
 class UNet(nn.Module):
-    def __init__(self, in_channels=3, out_channels=1):
+    def __init__(self, in_channels=3, out_channels=1, base_channels=64):
         super().__init__()
 
-        self.enc1 = DoubleConv(in_channels, 64)
-        self.enc2 = DoubleConv(64, 128)
-        self.enc3 = DoubleConv(128, 256)
+        c = base_channels
+
+        self.enc1 = DoubleConv(in_channels, c)
+        self.enc2 = DoubleConv(c, c * 2)
+        self.enc3 = DoubleConv(c * 2, c * 4)
 
         self.pool = nn.MaxPool2d(2)
 
-        self.dec3 = DoubleConv(256 + 128, 128)
-        self.dec2 = DoubleConv(128 + 64, 64)
+        self.dec3 = DoubleConv(c * 4 + c * 2, c * 2)
+        self.dec2 = DoubleConv(c * 2 + c, c)
 
         self.up = nn.Upsample(scale_factor=2, mode="bilinear", align_corners=False)
-        self.out = nn.Conv2d(64, out_channels, 1)
+        self.out = nn.Conv2d(c, out_channels, 1)
 
     def forward(self, x):
         e1 = self.enc1(x)
@@ -2,6 +2,8 @@ import numpy as np
 import cv2
 from sklearn.cluster import KMeans
 
+from backend.utils.metrics import timed
+
 
 def extract_roof_reflectance(
     roof_mask: np.ndarray,
@@ -11,6 +13,9 @@ def extract_roof_reflectance(
     """
     Extract per-roof reflectance statistics.
 
+    Zonal statistics are read from each roof's bounding box rather than
+    by scanning the full label image once per roof.
+
     Args:
         roof_mask: np.ndarray (H, W), uint8
         reflectance_map: np.ndarray (H, W), float
@@ -24,29 +29,67 @@ def extract_roof_reflectance(
         connectivity=8,
     )
 
-    roof_stats = []
+    roofs = []
 
     for i in range(1, num_labels):  # skip background
         area = stats[i, cv2.CC_STAT_AREA]
         if area < min_pixels:
             continue
 
-        pixels = reflectance_map[labels == i]
+        x = stats[i, cv2.CC_STAT_LEFT]
+        y = stats[i, cv2.CC_STAT_TOP]
+        w = stats[i, cv2.CC_STAT_WIDTH]
+        h = stats[i, cv2.CC_STAT_HEIGHT]
+
+        inside = labels[y:y + h, x:x + w] == i
+
+        roofs.append({
+            "label": i,
+            "area_pixels": area,
+            "pixels": reflectance_map[y:y + h, x:x + w][inside],
+        })
+
+    return summarize_roof_reflectance(roofs)
+
+
+def summarize_roof_reflectance(roofs):
+    """
+    Reduce sparse per-roof reflectance pixels to summary statistics.
+
+    Args:
+        roofs: list of dicts with label, area_pixels and pixels
+            (see compute_roof_reflectance)
+
+    Returns:
+        roof_stats: list of dicts
+    """
+    roof_stats = []
+
+    for roof in roofs:
+        pixels = roof["pixels"]
         pixels = pixels[pixels > 0]
 
         if len(pixels) == 0:
             continue
 
-        roof_stats.append({
-            "label": i,
-            "area_pixels": area,
+        stats = {
+            "label": roof["label"],
+            "area_pixels": roof["area_pixels"],
             "mean_reflectance": float(pixels.mean()),
             "median_reflectance": float(np.median(pixels)),
-        })
+        }
+
+        # Pixel geometry, when the sparse extractor provided it
+        for key in ("bbox", "centroid"):
+            if key in roof:
+                stats[key] = roof[key]
+
+        roof_stats.append(stats)
 
     return roof_stats
 
 
+@timed()
 def cluster_roofs_by_reflectance(
     roof_stats,
 ):
@@ -56,13 +99,19 @@ def cluster_roofs_by_reflectance(
     Returns:
         roof_stats with cluster labels added
     """
+    if not roof_stats:
+        return roof_stats
+
     values = np.array(
         [[r["mean_reflectance"]] for r in roof_stats],
         dtype=np.float32,
     )
 
+    # A single roof has nothing to be compared with; it ends up "cool"
+    n_clusters = min(2, len(roof_stats))
+
     kmeans = KMeans(
-        n_clusters=2,
+        n_clusters=n_clusters,
         random_state=42,
         n_init=10,
     )
@@ -71,7 +120,7 @@ def cluster_roofs_by_reflectance(
     # Determine which cluster is "cool"
     cluster_means = {
         c: values[clusters == c].mean()
-        for c in [0, 1]
+        for c in range(n_clusters)
     }
 
     cool_cluster = max(cluster_means, key=cluster_means.get)
@@ -83,6 +132,7 @@ def cluster_roofs_by_reflectance(
     return roof_stats
 
 
+@timed()
 def create_thermal_cluster_mask(
     roof_mask: np.ndarray,
     roof_stats,
@@ -1,25 +1,123 @@
+import numpy as np
 import rasterio
+import rasterio.errors
+from affine import Affine
 from rasterio.enums import Resampling
+from rasterio.windows import Window
 
+from backend.services.preprocessing import pixel_scale, scale_from_maximum
+from backend.utils.metrics import count, timed
 
-def load_geotiff(path: str, is_mask: bool = False):
+# Float rasters: windows per axis (and their size) sampled for the
+# 0–1 vs 0–255 decision when the file has no band statistics
+SCALE_SAMPLE_GRID = 4
+SCALE_SAMPLE_SIZE = 64
+
+
+def decimation_factor(path: str, target_gsd: float = None):
+    """
+    Integer factor by which to decimate a raster to reach target_gsd.
+
+    Only whole factors are used, so decimated grids of adjacent files
+    stay aligned and match GDAL's 2/4/8 overviews; imagery coarser than
+    the target is never upsampled.
+
+    Returns:
+        factor >= 1 (1 = native resolution)
+    """
+    if not target_gsd:
+        return 1
+
+    with rasterio.open(path) as src:
+        gsd = max(abs(src.res[0]), abs(src.res[1]))
+
+    return max(1, int(target_gsd / gsd + 1e-6))
+
+
+def raster_pixel_scale(path: str) -> float:
+    """
+    Value mapping a raster's pixels onto 0–1, decided once per file.
+
+    Integer rasters use their dtype (pixel_scale). Float rasters may
+    hold 0–1 or 0–255 values; the band maximum decides, taken from
+    GDAL's statistics tags when present, else from a small grid of
+    windows so the raster is never read in full.
+    """
+    with rasterio.open(path) as src:
+        scale = pixel_scale(src.dtypes[0])
+        if scale is not None:
+            return scale
+
+        bands = [1, 2, 3] if src.count >= 3 else [1]
+        maxima = [src.tags(b).get("STATISTICS_MAXIMUM") for b in bands]
+
+        if all(m is not None for m in maxima):
+            return scale_from_maximum(max(float(m) for m in maxima))
+
+        size = min(SCALE_SAMPLE_SIZE, src.width, src.height)
+        xs = np.linspace(0, src.width - size, SCALE_SAMPLE_GRID).astype(int)
+        ys = np.linspace(0, src.height - size, SCALE_SAMPLE_GRID).astype(int)
+
+        maximum = max(
+            float(np.nanmax(src.read(bands, window=Window(x, y, size, size))))
+            for y in np.unique(ys)
+            for x in np.unique(xs)
+        )
+
+    return scale_from_maximum(maximum)
+
+
+@timed("load_geotiff")
+def load_geotiff(
+    path: str,
+    is_mask: bool = False,
+    out_dtype=None,
+    window=None,
+    decimation: int = 1,
+):
     """
     Load GeoTIFF.
 
+    Pixels are kept in the source dtype (uint8/uint16) unless out_dtype
+    is given, so a scene costs 1–2 bytes per sample instead of 4.
+
     Args:
-        path: path to tif
+        path: path to tif (or VRT)
         is_mask: if True, loads single-band mask
+        out_dtype: optional dtype to cast to while reading
+        window: optional rasterio Window; only that block is read and
+            the returned metadata describes the block
+        decimation: read every decimation-th pixel's worth (see
+            decimation_factor); GDAL serves this from overviews when
+            the file has them. Images are averaged, masks use nearest.
 
     Returns:
         image: np.ndarray
         meta: rasterio metadata
     """
     with rasterio.open(path) as src:
+        if window is None:
+            height, width = src.height, src.width
+            transform = src.transform
+        else:
+            height, width = int(window.height), int(window.width)
+            transform = src.window_transform(window)
+
+        out_shape = None
+        resampling = Resampling.nearest
+
+        if decimation > 1:
+            out_shape = (-(-height // decimation), -(-width // decimation))
+            if not is_mask:
+                resampling = Resampling.average
+
         if is_mask:
             image = src.read(
                 1,
-                out_dtype="float32",
-                resampling=Resampling.nearest,
+                out_dtype=out_dtype,
+                window=window,
+                out_shape=out_shape,
+                resampling=resampling,
             )
         else:
             if src.count < 3:
@@ -27,13 +125,79 @@ def load_geotiff(path: str, is_mask: bool = False):
 
             image = src.read(
                 indexes=[1, 2, 3],
-                out_dtype="float32",
-                resampling=Resampling.nearest,
+                out_dtype=out_dtype,
+                window=window,
+                out_shape=(3, *out_shape) if out_shape else None,
+                resampling=resampling,
             )
 
         meta = src.meta.copy()
 
+        if window is not None or out_shape is not None:
+            out_height, out_width = image.shape[-2:]
+
+            meta.update({
+                "height": out_height,
+                "width": out_width,
+                "transform": transform * Affine.scale(
+                    width / out_width,
+                    height / out_height,
+                ),
+            })
+
     if not is_mask:
         image = image.transpose(1, 2, 0)  # (H, W, 3)
 
+    count("pixels_read", meta["width"] * meta["height"])
+
     return image, meta
+
+
+def validate_geotiff(
+    path: str,
+    min_bands: int = 3,
+    allowed_dtypes=("uint8", "uint16", "float32"),
+):
+    """
+    Cheap header-only validation of an input GeoTIFF.
+
+    Only the file header is read, so this is safe to run on multi-GB
+    uploads before any processing is queued.
+
+    Args:
+        path: path to tif
+        min_bands: minimum number of bands (RGB)
+        allowed_dtypes: accepted pixel dtypes
+
+    Returns:
+        info: dict with width, height, count, dtype, crs, res
+
+    Raises:
+        ValueError: if the file is not a usable RGB GeoTIFF
+    """
+    try:
+        with rasterio.open(path) as src:
+            info = {
+                "width": src.width,
+                "height": src.height,
+                "count": src.count,
+                "dtype": src.dtypes[0],
+                "crs": src.crs.to_string() if src.crs else None,
+                "res": src.res,
+            }
+    except rasterio.errors.RasterioIOError:
+        raise ValueError("Not a readable GeoTIFF")
+
+    if info["count"] < min_bands:
+        raise ValueError(
+            f"RGB GeoTIFF must have at least {min_bands} bands, "
+            f"got {info['count']}"
+        )
+
+    if info["dtype"] not in allowed_dtypes:
+        raise ValueError(f"Unsupported pixel dtype: {info['dtype']}")
+
+    if info["crs"] is None:
+        raise ValueError("GeoTIFF has no CRS")
+
+    return info
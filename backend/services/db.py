@@ -1,4 +1,5 @@
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_DIR = Path("db")
@@ -6,20 +7,109 @@ DB_DIR.mkdir(exist_ok=True)
 
 DB_PATH = DB_DIR / "rooflytics.db"
 
+_local = threading.local()
+
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    """
+    Return this thread's pooled connection, opening it on first use.
+
+    Connections are reused for the life of the thread and run in WAL
+    mode, so API readers never block the job workers' writes.
+    """
+    conn = getattr(_local, "conn", None)
+
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+# Columns added after a table was first released; CREATE TABLE IF NOT
+# EXISTS will not add them to an existing database
+MIGRATIONS = {
+    "jobs": {
+        "profile": "INT DEFAULT 0",
+    },
+}
+
+
+def _add_missing_columns(conn):
+    for table, columns in MIGRATIONS.items():
+        existing = {
+            row["name"]
+            for row in conn.execute(f"PRAGMA table_info({table})")
+        }
+
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+RESULT_COLUMNS = (
+    "job_id",
+    "tile_name",
+    "num_roofs",
+    "hot_roofs",
+    "cool_roofs",
+    "energy_kwh",
+    "cost_nzd",
+    "co2_kg",
+    "usage_factor",
+    "max_kwh_per_roof",
+    "created_at",
+)
+
+
+def _rebuild_analysis_results(conn, schema: str):
+    """
+    analysis_results was keyed by job_id, allowing one row per job;
+    batch jobs need one per file. SQLite cannot change a primary key
+    in place, so the table is recreated and its rows copied over.
+    """
+    keys = [
+        row["name"]
+        for row in conn.execute("PRAGMA table_info(analysis_results)")
+        if row["pk"]
+    ]
+
+    if keys != ["job_id"]:
+        return
+
+    columns = ", ".join(RESULT_COLUMNS)
+
+    conn.execute("ALTER TABLE analysis_results RENAME TO analysis_results_old")
+    conn.executescript(schema)
+    conn.execute(
+        f"INSERT INTO analysis_results ({columns}) "
+        f"SELECT {columns} FROM analysis_results_old"
+    )
+    conn.execute("DROP TABLE analysis_results_old")
 
 
 def init_db():
     conn = get_connection()
-    cur = conn.cursor()
 
     with open(DB_DIR / "schema.sql", "r") as f:
-        cur.executescript(f.read())
+        schema = f.read()
 
+    conn.executescript(schema)
+
+    _rebuild_analysis_results(conn, schema)
+    _add_missing_columns(conn)
     conn.commit()
-    conn.close()
 
 
 def insert_analysis_result(
@@ -35,28 +125,333 @@ def insert_analysis_result(
     max_kwh_per_roof: float,
 ):
     conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        INSERT INTO analysis_results (
-            job_id, tile_name, num_roofs, hot_roofs, cool_roofs,
-            energy_kwh, cost_nzd, co2_kg, usage_factor, max_kwh_per_roof
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+
+    # A rerun replaces the file's previous row
+    with conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO analysis_results (
+                job_id, tile_name, num_roofs, hot_roofs, cool_roofs,
+                energy_kwh, cost_nzd, co2_kg, usage_factor, max_kwh_per_roof
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                job_id,
+                tile_name,
+                num_roofs,
+                hot_roofs,
+                cool_roofs,
+                energy_kwh,
+                cost_nzd,
+                co2_kg,
+                usage_factor,
+                max_kwh_per_roof,
+            ),
+        )
+
+
+def list_analysis_results(job_id: str):
+    rows = get_connection().execute(
+        f"""
+        SELECT {", ".join(RESULT_COLUMNS)}
+        FROM analysis_results
+        WHERE job_id = ?
+        ORDER BY tile_name
         """,
-        (
-            job_id,
-            tile_name,
-            num_roofs,
-            hot_roofs,
-            cool_roofs,
-            energy_kwh,
-            cost_nzd,
-            co2_kg,
-            usage_factor,
-            max_kwh_per_roof,
-        ),
-    )
+        (job_id,),
+    ).fetchall()
 
-    conn.commit()
-    conn.close()
+    return [dict(r) for r in rows]
+
+
+ROOF_COLUMNS = (
+    "label",
+    "area_m2",
+    "mean_reflectance",
+    "roof_type",
+    "energy_kwh",
+    "cost_nzd",
+    "co2_kg",
+    "centroid_x",
+    "centroid_y",
+    "crs",
+    "min_x",
+    "min_y",
+    "max_x",
+    "max_y",
+)
+
+
+def insert_roofs(job_id: str, tile_name: str, roofs):
+    """
+    Replace the per-roof rows of one job file in a single transaction.
+
+    Args:
+        job_id: job the roofs belong to
+        tile_name: source file within the job
+        roofs: iterable of dicts with the keys in ROOF_COLUMNS
+    """
+    rows = [
+        (job_id, tile_name, *(r[c] for c in ROOF_COLUMNS))
+        for r in roofs
+    ]
+
+    conn = get_connection()
+
+    with conn:
+        conn.execute(
+            """
+            DELETE FROM roofs_rtree WHERE id IN (
+                SELECT id FROM roofs WHERE job_id = ? AND tile_name = ?
+            )
+            """,
+            (job_id, tile_name),
+        )
+        conn.execute(
+            "DELETE FROM roofs WHERE job_id = ? AND tile_name = ?",
+            (job_id, tile_name),
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO roofs (job_id, tile_name, {", ".join(ROOF_COLUMNS)})
+            VALUES ({", ".join("?" for _ in range(len(ROOF_COLUMNS) + 2))})
+            """,
+            rows,
+        )
+
+        # Index the new rows' bounding boxes in one statement
+        conn.execute(
+            """
+            INSERT INTO roofs_rtree (id, min_x, max_x, min_y, max_y)
+            SELECT id, min_x, max_x, min_y, max_y
+            FROM roofs
+            WHERE job_id = ? AND tile_name = ? AND min_x IS NOT NULL
+            """,
+            (job_id, tile_name),
+        )
+
+
+TOTALS_SELECT = """
+    SELECT
+        COUNT(DISTINCT r.job_id)                AS num_jobs,
+        COUNT(*)                                AS num_roofs,
+        COALESCE(SUM(r.roof_type = 'hot'), 0)   AS hot_roofs,
+        COALESCE(SUM(r.roof_type = 'cool'), 0)  AS cool_roofs,
+        COALESCE(SUM(r.area_m2), 0)             AS area_m2,
+        COALESCE(SUM(r.energy_kwh), 0)          AS energy_kwh,
+        COALESCE(SUM(r.cost_nzd), 0)            AS cost_nzd,
+        COALESCE(SUM(r.co2_kg), 0)              AS co2_kg
+"""
+
+
+def get_roof_totals(job_id: str = None):
+    """
+    Aggregate roof counts and savings, city-wide or for one job.
+
+    Returns:
+        dict of totals
+    """
+    where = "WHERE r.job_id = ?" if job_id else ""
+    params = (job_id,) if job_id else ()
+
+    row = get_connection().execute(
+        f"{TOTALS_SELECT} FROM roofs r {where}",
+        params,
+    ).fetchone()
+
+    return dict(row)
+
+
+def _bbox_filter(min_x, min_y, max_x, max_y, crs=None):
+    """
+    FROM/WHERE clause selecting roofs whose bounding box intersects the
+    query box, resolved through the R*Tree index.
+
+    The R*Tree stores float32 bounds rounded outwards (about 0.5 m at
+    NZTM northings), so its candidates are rechecked against the exact
+    double columns of roofs.
+    """
+    sql = """
+        FROM roofs_rtree t
+        JOIN roofs r ON r.id = t.id
+        WHERE t.max_x >= ? AND t.min_x <= ?
+          AND t.max_y >= ? AND t.min_y <= ?
+          AND r.max_x >= ? AND r.min_x <= ?
+          AND r.max_y >= ? AND r.min_y <= ?
+    """
+    params = [min_x, max_x, min_y, max_y] * 2
+
+    if crs:
+        sql += " AND r.crs = ?"
+        params.append(crs)
+
+    return sql, params
+
+
+def query_roofs_in_bbox(
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    crs: str = None,
+    limit: int = None,
+):
+    """
+    Roofs whose bounding box intersects a projected query box.
+
+    Returns:
+        list of roof dicts
+    """
+    where, params = _bbox_filter(min_x, min_y, max_x, max_y, crs)
+
+    sql = f"SELECT r.* {where}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    rows = get_connection().execute(sql, params).fetchall()
+    return [dict(r) for r in rows]
+
+
+def iter_roofs_in_bbox(
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    crs: str = None,
+    page_size: int = 1000,
+):
+    """
+    Roofs whose bounding box intersects a projected query box, streamed
+    from one query in pages, so callers can stop early and never hold
+    every candidate at once.
+
+    Yields:
+        lists of at most page_size roof dicts
+    """
+    where, params = _bbox_filter(min_x, min_y, max_x, max_y, crs)
+    cursor = get_connection().execute(f"SELECT r.* {where}", params)
+
+    try:
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                return
+            yield [dict(r) for r in rows]
+    finally:
+        cursor.close()
+
+
+def get_bbox_totals(
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    crs: str = None,
+):
+    """
+    Aggregate roof counts and savings inside a projected query box.
+
+    Returns:
+        dict of totals
+    """
+    where, params = _bbox_filter(min_x, min_y, max_x, max_y, crs)
+
+    row = get_connection().execute(
+        f"{TOTALS_SELECT} {where}",
+        params,
+    ).fetchone()
+
+    return dict(row)
+
+
+def list_roofs(job_id: str, limit: int = 1000, offset: int = 0):
+    rows = get_connection().execute(
+        f"""
+        SELECT tile_name, {", ".join(ROOF_COLUMNS)}
+        FROM roofs
+        WHERE job_id = ?
+        ORDER BY tile_name, label
+        LIMIT ? OFFSET ?
+        """,
+        (job_id, limit, offset),
+    ).fetchall()
+
+    return [dict(r) for r in rows]
+
+
+JOB_FIELDS = (
+    "status",
+    "priority",
+    "stage",
+    "progress",
+    "stage_timings",
+    "result",
+    "error",
+    "started_at",
+    "finished_at",
+)
+
+
+def create_job(job_id: str, priority: int = 0, profile: bool = False):
+    conn = get_connection()
+
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO jobs (job_id, status, priority, profile)
+            VALUES (?, 'queued', ?, ?)
+            ON CONFLICT (job_id) DO UPDATE SET
+                status = 'queued',
+                priority = excluded.priority,
+                profile = excluded.profile,
+                stage = NULL,
+                progress = 0,
+                stage_timings = NULL,
+                result = NULL,
+                error = NULL,
+                started_at = NULL,
+                finished_at = NULL
+            """,
+            (job_id, priority, int(profile)),
+        )
+
+
+def update_job(job_id: str, **fields):
+    unknown = set(fields) - set(JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+
+    conn = get_connection()
+
+    with conn:
+        conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+            (*fields.values(), job_id),
+        )
+
+
+def get_job(job_id: str):
+    row = get_connection().execute(
+        "SELECT * FROM jobs WHERE job_id = ?",
+        (job_id,),
+    ).fetchone()
+
+    return dict(row) if row else None
+
+
+def list_jobs(statuses):
+    placeholders = ", ".join("?" for _ in statuses)
+
+    rows = get_connection().execute(
+        f"""
+        SELECT * FROM jobs
+        WHERE status IN ({placeholders})
+        ORDER BY priority DESC, created_at
+        """,
+        tuple(statuses),
+    ).fetchall()
+
+    return [dict(r) for r in rows]
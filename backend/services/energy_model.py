@@ -1,7 +1,10 @@
 import numpy as np
 import cv2
 
+from backend.utils.metrics import timed
 
+
+@timed()
 def compute_roof_areas(
     roof_mask: np.ndarray,
     pixel_area_m2: float,
@@ -30,6 +33,7 @@ def compute_roof_areas(
     return roof_areas
 
 
+@timed()
 def estimate_cooling_savings(
     roof_stats,
     roof_areas,
@@ -92,3 +96,64 @@ def estimate_cooling_savings(
         })
 
     return results
+
+
+def build_roof_records(
+    roof_stats,
+    energy_results,
+    transform,
+    crs: str = None,
+):
+    """
+    Join per-roof statistics and energy results into flat records.
+
+    Args:
+        roof_stats: list of dicts (from clustering)
+        energy_results: list of dicts (from estimate_cooling_savings)
+        transform: affine transform of the source GeoTIFF
+        crs: CRS string of the source GeoTIFF
+
+    Returns:
+        list of per-roof dicts ready for persistence, with centroid and
+        bounding box in the raster's projected coordinates
+    """
+    stats_by_label = {r["label"]: r for r in roof_stats}
+    records = []
+
+    for e in energy_results:
+        r = stats_by_label[e["label"]]
+
+        centroid_x = centroid_y = None
+        if "centroid" in r:
+            col, row = r["centroid"]
+            centroid_x, centroid_y = transform * (col + 0.5, row + 0.5)
+
+        min_x = min_y = max_x = max_y = None
+        if "bbox" in r:
+            x, y, w, h = r["bbox"]
+            corners = [
+                transform * (cx, cy)
+                for cx in (x, x + w)
+                for cy in (y, y + h)
+            ]
+            xs, ys = zip(*corners)
+            min_x, min_y, max_x, max_y = min(xs), min(ys), max(xs), max(ys)
+
+        records.append({
+            "label": int(e["label"]),
+            "area_m2": float(e["area_m2"]),
+            "mean_reflectance": r["mean_reflectance"],
+            "roof_type": e["roof_type"],
+            "energy_kwh": e["energy_kwh_per_year"],
+            "cost_nzd": e["cost_savings_per_year"],
+            "co2_kg": e["co2_savings_kg_per_year"],
+            "centroid_x": centroid_x,
+            "centroid_y": centroid_y,
+            "crs": crs,
+            "min_x": min_x,
+            "min_y": min_y,
+            "max_x": max_x,
+            "max_y": max_y,
+        })
+
+    return records
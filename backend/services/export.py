@@ -1,8 +1,11 @@
 import rasterio
-from rasterio.enums import Compression
+from rasterio.enums import Compression, Resampling
 import numpy as np
 
+from backend.utils.metrics import timed
 
+
+@timed()
 def export_mask_geotiff(
     mask: np.ndarray,
     reference_meta: dict,
@@ -19,6 +22,7 @@ def export_mask_geotiff(
     meta = reference_meta.copy()
 
     meta.update({
+        "driver": "GTiff",  # reference may be a VRT
         "count": 1,
         "dtype": rasterio.uint8,
         "compress": Compression.lzw,
@@ -27,4 +31,36 @@ def export_mask_geotiff(
     mask = mask.astype("uint8")
 
     with rasterio.open(output_path, "w", **meta) as dst:
-        dst.write(mask, 1)
\ No newline at end of file
+        dst.write(mask, 1)
+
+
+@timed()
+def build_overviews(
+    path: str,
+    resampling: Resampling = Resampling.nearest,
+    min_size: int = 256,
+    external: bool = False,
+):
+    """
+    Add decimated overview levels to a GeoTIFF.
+
+    Overviews let tile and preview reads fetch zoomed-out data without
+    touching the full-resolution raster.
+
+    Args:
+        path: GeoTIFF to update
+        resampling: resampling used to build the levels
+        min_size: stop once the coarsest level fits in this many pixels
+        external: write a sidecar .ovr instead of modifying the file
+    """
+    with rasterio.Env(TIFF_USE_OVR=external):
+        with rasterio.open(path, "r+") as dst:
+            factors = []
+            factor = 2
+
+            while max(dst.width, dst.height) / factor >= min_size:
+                factors.append(factor)
+                factor *= 2
+
+            if factors:
+                dst.build_overviews(factors, resampling)
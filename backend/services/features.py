@@ -0,0 +1,51 @@
+import numpy as np
+
+from backend.services.preprocessing import (
+    compute_luminance,
+    detect_shadows,
+    resolve_pixel_scale,
+)
+
+
+class FeaturePlanes:
+    """
+    Per-tile cache of derived feature planes.
+
+    Each plane (luminance, shadow mask, ...) is computed at most once
+    and shared by shadow masking, reflectance and zonal statistics.
+    """
+
+    def __init__(self, tile: np.ndarray, scale: float = None):
+        """
+        Args:
+            tile: np.ndarray (H, W, 3), uint8/uint16 or float
+            scale: value mapping pixels to 0–1 (see pixel_scale);
+                inferred from the tile when None
+        """
+        self.tile = tile
+        self.scale = resolve_pixel_scale(tile, scale)
+        self._planes = {}
+
+    @property
+    def luminance(self) -> np.ndarray:
+        """Rec.709 luminance, float32 (H, W) in 0–1."""
+        if "luminance" not in self._planes:
+            self._planes["luminance"] = compute_luminance(
+                self.tile,
+                scale=self.scale,
+            )
+
+        return self._planes["luminance"]
+
+    def shadow_mask(self, threshold: float = 0.15) -> np.ndarray:
+        """Boolean shadow mask (H, W) derived from the cached luminance."""
+        key = ("shadow_mask", threshold)
+
+        if key not in self._planes:
+            self._planes[key] = detect_shadows(
+                self.tile,
+                threshold=threshold,
+                luminance=self.luminance,
+            )
+
+        return self._planes[key]
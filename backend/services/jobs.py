@@ -0,0 +1,228 @@
+import itertools
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from backend.services.db import create_job, get_job, list_jobs, update_job
+from backend.utils.logging import get_logger
+from backend.utils.metrics import collect_job_metrics, count
+from backend.utils.profiling import profile_job
+
+logger = get_logger("JobScheduler")
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class JobProgress:
+    """
+    Per-job stage tracker handed to the job handler.
+
+    Each stage updates the job row with the current stage, the fraction
+    of stages finished and the wall time spent in every finished stage.
+    """
+
+    def __init__(self, job_id: str, stages):
+        self.job_id = job_id
+        self.stages = list(stages)
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        update_job(self.job_id, stage=name)
+
+        start = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - start, 4)
+
+        update_job(
+            self.job_id,
+            progress=len(self.timings) / len(self.stages),
+            stage_timings=json.dumps(self.timings),
+        )
+
+
+class JobScheduler:
+    """
+    Bounded worker pool that runs jobs in the background.
+
+    Jobs are ordered by priority (higher first, FIFO within a priority)
+    and their state lives in the `jobs` table, so work that was queued
+    or running when the process stopped is picked up again on start().
+
+    max_queued bounds submit() only: the internal queue itself is
+    unbounded, so resumed jobs and stop() sentinels never block.
+    """
+
+    def __init__(
+        self,
+        handler,
+        stages,
+        num_workers: int = 1,
+        max_queued: int = 0,
+        artifacts_dir=None,
+        profile_top_n: int = 25,
+        reset=None,
+    ):
+        """
+        Args:
+            handler: callable(job_id, progress) -> JSON-serialisable result
+            stages: ordered stage names reported through JobProgress
+            num_workers: number of jobs run concurrently
+            max_queued: maximum waiting jobs (0 = unbounded)
+            artifacts_dir: callable(job_id) -> directory for profile
+                output; profiling is unavailable when None
+            profile_top_n: hotspots kept in a profiled job's result
+            reset: optional callable(job_id) run before a completed job
+                is queued again (e.g. to drop its checkpoints)
+        """
+        self.handler = handler
+        self.stages = list(stages)
+        self.num_workers = num_workers
+        self.artifacts_dir = artifacts_dir
+        self.profile_top_n = profile_top_n
+        self.max_queued = max_queued
+        self.reset = reset
+
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+
+        # Not bounded by max_queued: these jobs were already accepted
+        with self._lock:
+            for job in list_jobs([QUEUED, RUNNING]):
+                logger.info(f"Resuming job {job['job_id']} ({job['status']})")
+                self._enqueue(job["job_id"], job["priority"] or 0)
+
+        for i in range(self.num_workers):
+            t = threading.Thread(
+                target=self._worker,
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = None):
+        for _ in self._threads:
+            # Sentinels sort ahead of every real job
+            self._queue.put_nowait((float("-inf"), next(self._counter), None))
+
+        for t in self._threads:
+            t.join(timeout)
+
+        self._threads = []
+
+    def submit(self, job_id: str, priority: int = 0, profile: bool = False):
+        """
+        Queue a job unless it is already queued or running.
+
+        A completed job is run again from scratch (after reset), e.g. to
+        profile it; a failed one resumes from its checkpoints.
+
+        Args:
+            job_id: job to run
+            priority: higher runs first
+            profile: run the job under the profiler (see profile_job)
+
+        Returns:
+            job: current job row
+        """
+        with self._lock:
+            job = get_job(job_id)
+            if job and job["status"] in (QUEUED, RUNNING):
+                return job
+
+            if self.max_queued and len(self._pending) >= self.max_queued:
+                raise QueueFullError("Job queue is full")
+
+            if job and job["status"] == COMPLETED and self.reset is not None:
+                self.reset(job_id)
+
+            create_job(job_id, priority, profile=profile)
+            self._enqueue(job_id, priority)
+
+        return get_job(job_id)
+
+    def _enqueue(self, job_id: str, priority: int):
+        # Caller holds self._lock
+        if job_id in self._pending:
+            return
+
+        self._pending.add(job_id)
+        self._queue.put((-priority, next(self._counter), job_id))
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+
+            if job_id is None:
+                return
+
+            with self._lock:
+                self._pending.discard(job_id)
+
+            self._run(job_id)
+
+    def _run(self, job_id: str):
+        job = get_job(job_id)
+        update_job(job_id, status=RUNNING, started_at=_now())
+        progress = JobProgress(job_id, self.stages)
+
+        if job["profile"] and self.artifacts_dir is not None:
+            profiler = profile_job(
+                self.artifacts_dir(job_id),
+                top_n=self.profile_top_n,
+            )
+        else:
+            profiler = nullcontext()
+
+        try:
+            with collect_job_metrics() as metrics, profiler as report:
+                result = self.handler(job_id, progress)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            count("jobs_failed")
+            update_job(
+                job_id,
+                status=FAILED,
+                error=str(e),
+                finished_at=_now(),
+            )
+            return
+
+        count("jobs_completed")
+
+        if isinstance(result, dict):
+            result["metrics"] = metrics.as_dict()
+
+            if report is not None:
+                result["profile"] = report.as_dict()
+
+        update_job(
+            job_id,
+            status=COMPLETED,
+            stage=None,
+            progress=1.0,
+            result=json.dumps(result),
+            finished_at=_now(),
+        )
@@ -0,0 +1,595 @@
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from backend.services.clustering import summarize_roof_reflectance
+from backend.services.data_loader import validate_geotiff
+
+RASTER_SUFFIXES = (".tif", ".tiff")
+VRT_SUFFIX = ".vrt"
+
+
+def member_stem(name: str):
+    """
+    Name a member's outputs and checkpoint are keyed by: the member
+    name without a raster suffix. Only .tif/.tiff are stripped, as VRT
+    block names (city_0.075m_r0_c0) may contain other dots.
+    """
+    path = Path(name)
+    return path.stem if path.suffix.lower() in RASTER_SUFFIXES else name
+
+
+def check_vrt_sources(vrt_path: Path, root: Path):
+    """
+    Make sure an uploaded VRT only references files uploaded with it.
+
+    Returns:
+        resolved paths of the VRT's sources
+
+    Raises:
+        ValueError: if a source is missing, outside root or a GDAL
+            virtual path
+    """
+    root = Path(root).resolve()
+
+    try:
+        tree = ET.parse(vrt_path)
+    except ET.ParseError:
+        raise ValueError("VRT is not valid XML")
+
+    sources = set()
+
+    for source in tree.getroot().iter("SourceFilename"):
+        name = (source.text or "").strip()
+
+        if not name or name.startswith("/vsi"):
+            raise ValueError(f"Unsupported VRT source: {name!r}")
+
+        path = Path(name)
+        if source.get("relativeToVRT") == "1":
+            path = vrt_path.parent / path
+
+        path = path.resolve()
+
+        if not path.is_relative_to(root) or not path.is_file():
+            raise ValueError(f"VRT source not found in upload: {name!r}")
+
+        sources.add(path)
+
+    return sorted(sources)
+
+
+def _rasters(inputs_dir: Path):
+    return sorted(
+        p for p in inputs_dir.iterdir()
+        if p.suffix.lower() in RASTER_SUFFIXES
+    )
+
+
+def _single_vrt(inputs_dir: Path):
+    vrts = sorted(inputs_dir.glob(f"*{VRT_SUFFIX}"))
+
+    if len(vrts) > 1:
+        raise ValueError("At most one VRT per batch")
+
+    return vrts[0] if vrts else None
+
+
+def vrt_sources(vrt_path: Path, inputs_dir: Path):
+    """
+    GeoTIFFs of a batch referenced by its VRT.
+
+    Every GeoTIFF of the batch must be referenced; one that is not
+    would silently be left out of the mosaic.
+
+    Raises:
+        ValueError: if a source is invalid (see check_vrt_sources) or
+            a GeoTIFF is not referenced
+    """
+    referenced = check_vrt_sources(vrt_path, inputs_dir)
+
+    unreferenced = [
+        p.name for p in _rasters(inputs_dir)
+        if p.resolve() not in referenced
+    ]
+    if unreferenced:
+        raise ValueError(
+            f"GeoTIFFs not referenced by {vrt_path.name}: {', '.join(unreferenced)}"
+        )
+
+    return referenced
+
+
+# Origins may be off the shared grid by this fraction of a pixel
+GRID_TOLERANCE = 1e-3
+
+
+def _north_up_transforms(rasters):
+    """
+    Transforms and sizes of the rasters.
+
+    Returns:
+        list of (transform, width, height)
+
+    Raises:
+        ValueError: if a raster is rotated or skewed
+    """
+    grids = []
+
+    for path in rasters:
+        with rasterio.open(path) as src:
+            t = src.transform
+            grids.append((t, src.width, src.height))
+
+        if t.b != 0 or t.d != 0 or t.a <= 0 or t.e >= 0:
+            raise ValueError(f"{path.name} is rotated or skewed; batch files must be north-up")
+
+    return grids
+
+
+def _grid_extents(rasters, grids):
+    """
+    Pixel extents of north-up rasters of one pixel size on the first
+    raster's grid.
+
+    Returns:
+        list of (col, row, width, height), in pixels from the first
+        raster's origin
+
+    Raises:
+        ValueError: if a raster's origin is off the shared pixel grid
+    """
+    ref = grids[0][0]
+    extents = []
+
+    for path, (t, width, height) in zip(rasters, grids):
+        col = (t.c - ref.c) / ref.a
+        row = (t.f - ref.f) / ref.e
+
+        if max(abs(col - round(col)), abs(row - round(row))) > GRID_TOLERANCE:
+            raise ValueError(
+                f"{path.name} is not aligned with the pixel grid of {rasters[0].name}"
+            )
+
+        extents.append((round(col), round(row), width, height))
+
+    return extents
+
+
+def _check_overlaps(rasters, extents):
+    """Raise ValueError naming the first two files whose footprints overlap."""
+    for i, (col_a, row_a, w_a, h_a) in enumerate(extents):
+        for j in range(i + 1, len(extents)):
+            col_b, row_b, w_b, h_b = extents[j]
+
+            if (
+                col_a < col_b + w_b and col_b < col_a + w_a
+                and row_a < row_b + h_b and row_b < row_a + h_a
+            ):
+                raise ValueError(
+                    f"{rasters[i].name} and {rasters[j].name} overlap; "
+                    "batch files must be adjacent, not overlapping"
+                )
+
+
+def validate_batch(inputs_dir: Path):
+    """
+    Validate the rasters of a batch upload.
+
+    All GeoTIFFs must share one CRS and pixel size, be north-up, sit on
+    one pixel grid and not overlap, so roofs can be matched across file
+    edges and none is counted twice. A VRT, if present, is the mosaic
+    to process and may only reference the uploaded files.
+
+    Returns:
+        info: dict with files, vrt, crs and res
+
+    Raises:
+        ValueError: if the batch cannot be processed as one mosaic
+    """
+    rasters = _rasters(inputs_dir)
+    vrt = _single_vrt(inputs_dir)
+
+    if not rasters:
+        raise ValueError("Batch contains no GeoTIFFs")
+
+    infos = [validate_geotiff(p) for p in rasters]
+
+    if vrt is not None:
+        vrt_sources(vrt, inputs_dir)
+        infos.append(validate_geotiff(vrt))
+
+    if len({i["crs"] for i in infos}) > 1:
+        raise ValueError("All files in a batch must share one CRS")
+
+    grids = _north_up_transforms(rasters)
+
+    if len({i["res"] for i in infos}) > 1:
+        raise ValueError("All files in a batch must share one pixel size")
+
+    _check_overlaps(rasters, _grid_extents(rasters, grids))
+
+    return {
+        "files": len(rasters),
+        "vrt": vrt.name if vrt else None,
+        "crs": infos[0]["crs"],
+        "res": infos[0]["res"],
+    }
+
+
+def plan_members(inputs_dir: Path, block_size: int = 4096):
+    """
+    Split a batch into independently processed members.
+
+    Without a VRT every GeoTIFF is a member. With a VRT the mosaic is
+    cut into block_size windows instead, so members stay bounded in
+    memory whatever the size of the source files (results are still
+    reported per GeoTIFF, see source_files).
+
+    Returns:
+        list of dicts with name, path and window (None = whole file)
+
+    Raises:
+        ValueError: if the batch has several VRTs, or GeoTIFFs its VRT
+            does not reference
+    """
+    vrt = _single_vrt(inputs_dir)
+
+    if vrt is None:
+        return [
+            {"name": p.name, "path": p, "window": None}
+            for p in _rasters(inputs_dir)
+        ]
+
+    # Rejected before any work rather than silently left out
+    vrt_sources(vrt, inputs_dir)
+
+    with rasterio.open(vrt) as src:
+        height, width = src.height, src.width
+
+    return [
+        {
+            "name": f"{vrt.stem}_r{row}_c{col}",
+            "path": vrt,
+            "window": Window(
+                col,
+                row,
+                min(block_size, width - col),
+                min(block_size, height - row),
+            ),
+        }
+        for row in range(0, height, block_size)
+        for col in range(0, width, block_size)
+    ]
+
+
+def source_files(inputs_dir: Path):
+    """
+    The files a VRT batch reports its results per.
+
+    A VRT mosaic is processed in blocks, but blocks are a processing
+    detail: results are reported per GeoTIFF the VRT references.
+
+    Returns:
+        list of (name, bounds) with bounds (left, bottom, right, top)
+        in the batch CRS, or None without a VRT (members are the files)
+    """
+    vrt = _single_vrt(inputs_dir)
+    if vrt is None:
+        return None
+
+    sources = []
+    for path in vrt_sources(vrt, inputs_dir):
+        with rasterio.open(path) as src:
+            sources.append((path.name, tuple(src.bounds)))
+
+    return sources
+
+
+def assign_sources(roofs, sources):
+    """
+    Index into sources of the file owning each merged roof: the file
+    holding its centroid or, when the centroid falls in a gap between
+    files, the one overlapping the roof's bounds most.
+    """
+    owners = []
+
+    for r in roofs:
+        x, y = r["centroid_xy"]
+        inside = [
+            i for i, (_, b) in enumerate(sources)
+            if b[0] <= x <= b[2] and b[1] <= y <= b[3]
+        ]
+
+        if inside:
+            owners.append(inside[0])
+            continue
+
+        x0, y0, x1, y1 = r["bounds"]
+        overlap = [
+            max(0.0, min(x1, b[2]) - max(x0, b[0])) * max(0.0, min(y1, b[3]) - max(y0, b[1]))
+            for _, b in sources
+        ]
+        owners.append(int(np.argmax(overlap)))
+
+    return owners
+
+
+def _touches_border(bbox, shape):
+    x, y, w, h = bbox
+    return x == 0 or y == 0 or x + w == shape[1] or y + h == shape[0]
+
+
+def describe_member(name: str, meta: dict, labels: np.ndarray, parts):
+    """
+    Reduce one processed member to what the merge step needs.
+
+    Roofs fully inside the member are summarised straight away; only
+    roofs on the member's edge keep their reflectance pixels, since
+    they may continue in a neighbour. The label image itself is
+    reduced to its four edge strips.
+
+    Args:
+        name: member name (tile_name in the database)
+        meta: raster metadata of the member
+        labels: connected-component labels of the cleaned mask
+        parts: roofs from compute_roof_reflectance on the same mask
+
+    Returns:
+        dict describing the member
+    """
+    shape = labels.shape
+    transform = meta["transform"]
+
+    roofs = []
+    for part in parts:
+        if _touches_border(part["bbox"], shape):
+            roofs.append(part)
+        else:
+            roofs.extend(summarize_roof_reflectance([part]))
+
+    left, top = transform * (0, 0)
+    right, bottom = transform * (shape[1], shape[0])
+
+    return {
+        "name": name,
+        "shape": shape,
+        "transform": transform,
+        "crs": meta["crs"].to_string() if meta["crs"] else None,
+        "pixel_area_m2": abs(transform[0] * transform[4]),
+        "bounds": (
+            min(left, right), min(top, bottom),
+            max(left, right), max(top, bottom),
+        ),
+        "borders": {
+            "top": labels[0].copy(),
+            "bottom": labels[-1].copy(),
+            "left": labels[:, 0].copy(),
+            "right": labels[:, -1].copy(),
+        },
+        "roofs": roofs,
+    }
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def find_boundary_links(members):
+    """
+    Pairs of roof parts that touch across a member edge.
+
+    Each labelled pixel on a member's right and bottom edge is stepped
+    one pixel outwards to its three 8-connected neighbours (straight
+    and both diagonals), and the labels found there in neighbouring
+    members link the parts. Diagonal steps past the member's corners
+    land in the corner neighbours, so roofs that only join across a
+    corner are merged too. Members must be north-up and share a pixel
+    grid (see validate_batch).
+
+    Returns:
+        set of ((member, label), (member, label))
+    """
+    links = set()
+
+    for i, a in enumerate(members):
+        h, w = a["shape"]
+
+        for edge, neighbour_edge in (("right", "left"), ("bottom", "top")):
+            strip = a["borders"][edge]
+            idx = np.flatnonzero(strip)
+
+            if not idx.size:
+                continue
+
+            # Along the edge: the pixel's own line and the two diagonals
+            labels = np.tile(strip[idx], 3)
+            along = np.concatenate([idx - 1, idx, idx + 1]) + 0.5
+
+            if edge == "right":
+                cols, rows = np.full(along.shape, w + 0.5), along
+            else:
+                cols, rows = along, np.full(along.shape, h + 0.5)
+
+            xs, ys = a["transform"] * (cols, rows)
+
+            for j, b in enumerate(members):
+                if j == i or not _overlaps(a["bounds"], b["bounds"]):
+                    continue
+
+                bc, br = ~b["transform"] * (xs, ys)
+                bc = np.floor(bc).astype(np.int64)
+                br = np.floor(br).astype(np.int64)
+
+                if edge == "right":
+                    hit = (bc == 0) & (br >= 0) & (br < b["shape"][0])
+                    other = b["borders"][neighbour_edge][br[hit]]
+                else:
+                    hit = (br == 0) & (bc >= 0) & (bc < b["shape"][1])
+                    other = b["borders"][neighbour_edge][bc[hit]]
+
+                for la, lb in set(zip(labels[hit], other)):
+                    if lb:
+                        links.add(((i, int(la)), (j, int(lb))))
+
+    return links
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, key):
+        self.parent.setdefault(key, key)
+
+        while self.parent[key] != key:
+            self.parent[key] = self.parent[self.parent[key]]
+            key = self.parent[key]
+
+        return key
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _world_geometry(part, transform):
+    col, row = part["centroid"]
+    x, y, w, h = part["bbox"]
+
+    corners = [
+        transform * (cx, cy)
+        for cx in (x, x + w)
+        for cy in (y, y + h)
+    ]
+    xs, ys = zip(*corners)
+
+    return (
+        transform * (col + 0.5, row + 0.5),
+        (min(xs), min(ys), max(xs), max(ys)),
+    )
+
+
+def merge_roofs(members, min_area: int = 150):
+    """
+    Join roof parts that cross member edges into whole roofs.
+
+    Args:
+        members: list of describe_member() results
+        min_area: minimum pixels of a merged roof (edge fragments are
+            kept per member and only filtered once merged)
+
+    Returns:
+        roofs: list of dicts with a batch-wide label, area_pixels,
+            area_m2, reflectance statistics, centroid_xy, bounds,
+            member (index owning the largest part) and parts
+            ([(member, label), ...])
+    """
+    uf = _UnionFind()
+
+    for a, b in find_boundary_links(members):
+        uf.union(a, b)
+
+    groups = defaultdict(list)
+    for m, member in enumerate(members):
+        for part in member["roofs"]:
+            groups[uf.find((m, part["label"]))].append((m, part))
+
+    roofs = []
+
+    for key in sorted(groups):
+        parts = groups[key]
+
+        area_pixels = sum(int(p["area_pixels"]) for _, p in parts)
+        if area_pixels < min_area:
+            continue
+
+        if "pixels" in parts[0][1]:
+            # Edge parts (the only ones that can be linked) kept pixels
+            merged = summarize_roof_reflectance([{
+                "label": key,
+                "area_pixels": area_pixels,
+                "pixels": np.concatenate([p["pixels"] for _, p in parts]),
+            }])
+            if not merged:
+                continue
+            stats = merged[0]
+        else:
+            stats = parts[0][1]
+
+        area_m2 = 0.0
+        cx = cy = 0.0
+        bounds = [np.inf, np.inf, -np.inf, -np.inf]
+
+        for m, p in parts:
+            (px, py), (x0, y0, x1, y1) = _world_geometry(p, members[m]["transform"])
+
+            area_m2 += p["area_pixels"] * members[m]["pixel_area_m2"]
+            cx += px * p["area_pixels"]
+            cy += py * p["area_pixels"]
+            bounds = [
+                min(bounds[0], x0), min(bounds[1], y0),
+                max(bounds[2], x1), max(bounds[3], y1),
+            ]
+
+        owner = max(parts, key=lambda mp: mp[1]["area_pixels"])[0]
+
+        roofs.append({
+            "label": len(roofs) + 1,
+            "area_pixels": area_pixels,
+            "area_m2": float(area_m2),
+            "mean_reflectance": stats["mean_reflectance"],
+            "median_reflectance": stats["median_reflectance"],
+            "centroid_xy": (cx / area_pixels, cy / area_pixels),
+            "bounds": tuple(bounds),
+            "member": owner,
+            "parts": [(m, int(p["label"])) for m, p in parts],
+        })
+
+    return roofs
+
+
+def build_mosaic_records(roofs, energy_results, crs: str = None, owners=None):
+    """
+    Per-roof records grouped by owner, ready for insert_roofs.
+
+    Args:
+        owners: owner index per roof (e.g. from assign_sources);
+            defaults to each roof's member
+
+    Returns:
+        dict owner index -> list of records
+    """
+    if owners is None:
+        owners = [r["member"] for r in roofs]
+
+    by_label = {r["label"]: (r, o) for r, o in zip(roofs, owners)}
+    records = defaultdict(list)
+
+    for e in energy_results:
+        r, owner = by_label[e["label"]]
+        min_x, min_y, max_x, max_y = r["bounds"]
+
+        records[owner].append({
+            "label": int(e["label"]),
+            "area_m2": float(e["area_m2"]),
+            "mean_reflectance": r["mean_reflectance"],
+            "roof_type": e["roof_type"],
+            "energy_kwh": e["energy_kwh_per_year"],
+            "cost_nzd": e["cost_savings_per_year"],
+            "co2_kg": e["co2_savings_kg_per_year"],
+            "centroid_x": r["centroid_xy"][0],
+            "centroid_y": r["centroid_xy"][1],
+            "crs": crs,
+            "min_x": min_x,
+            "min_y": min_y,
+            "max_x": max_x,
+            "max_y": max_y,
+        })
+
+    return records
@@ -0,0 +1,732 @@
+"""
+Resumable analysis pipeline.
+
+Stages are declared as a DAG and every stage's output is checkpointed
+to disk, so an interrupted run picks up where it stopped and never
+recomputes a finished stage. The API job handler and the offline CLI
+run the same pipelines:
+
+    python -m backend.services.pipeline data/city results/city --workers 4
+    python -m backend.services.pipeline data/city results/city --mosaic
+
+Rerunning the same command resumes; changing an input file (or the
+model) invalidates that run's checkpoints.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+
+import cv2
+from rasterio.enums import Resampling
+
+from backend.app.config import (
+    BATCH_WORKERS,
+    COARSE_FACTOR,
+    COARSE_THRESHOLD,
+    DEFAULT_BACKBONE,
+    MODEL_CHECKPOINT,
+    MODEL_TARGET_GSD,
+    MOSAIC_BLOCK_SIZE,
+    TRIAGE_CHECKPOINT,
+    TRIAGE_MARGIN,
+    TRIAGE_THRESHOLD,
+)
+from backend.services.clustering import (
+    cluster_roofs_by_reflectance,
+    create_thermal_cluster_mask,
+    summarize_roof_reflectance,
+)
+from backend.services.data_loader import (
+    decimation_factor,
+    load_geotiff,
+    raster_pixel_scale,
+)
+from backend.services.db import init_db, insert_analysis_result, insert_roofs
+from backend.services.energy_model import (
+    build_roof_records,
+    compute_roof_areas,
+    estimate_cooling_savings,
+)
+from backend.services.export import build_overviews, export_mask_geotiff
+from backend.services.mosaic import (
+    RASTER_SUFFIXES,
+    assign_sources,
+    build_mosaic_records,
+    describe_member,
+    member_stem,
+    merge_roofs,
+    plan_members,
+    source_files,
+)
+from backend.services.postprocess import clean_roof_mask
+from backend.services.reflectance import compute_roof_reflectance
+from backend.utils.logging import get_logger
+from backend.utils.metrics import bind_job_metrics
+
+logger = get_logger("Pipeline")
+
+CHECKPOINT_DIR = ".checkpoints"
+
+MIN_ROOF_AREA = 150
+MIN_REFLECTANCE_PIXELS = 50
+
+ENERGY_CONSTANTS = {
+    "SOLAR_IRRADIANCE": 0.75,
+    "SUNLIGHT_HOURS": 1700,
+    "COOLING_EFFICIENCY": 0.65,
+    "ELECTRICITY_PRICE": 0.30,
+    "EMISSION_FACTOR": 0.10,
+    "USAGE_FACTOR": 0.025,
+    "MAX_KWH_PER_ROOF": 5000,
+}
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    fn is called as fn(ctx, **outputs_of_deps). Stages with
+    checkpoint=False are cheap to redo (e.g. reading the input) and
+    are recomputed when a later stage needs them after a resume.
+    """
+
+    def __init__(self, name: str, fn, deps=(), checkpoint: bool = True):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.checkpoint = checkpoint
+
+
+class CheckpointStore:
+    """
+    Pickled stage outputs in one directory per run.
+
+    A manifest records the run's fingerprint (inputs, stages, model);
+    when it changes, existing checkpoints are discarded.
+    """
+
+    def __init__(self, directory: Path, fingerprint: dict):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        manifest = self.directory / "manifest.json"
+        fingerprint = json.loads(json.dumps(fingerprint))
+
+        if manifest.exists() and json.loads(manifest.read_text()) != fingerprint:
+            logger.info(f"Inputs changed, discarding checkpoints in {self.directory}")
+            shutil.rmtree(self.directory)
+            self.directory.mkdir(parents=True)
+
+        manifest.write_text(json.dumps(fingerprint, indent=2))
+
+    def _path(self, key: str):
+        return self.directory / f"{key}.pkl"
+
+    def has(self, key: str):
+        return self._path(key).exists()
+
+    def load(self, key: str):
+        with open(self._path(key), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, key: str, value):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write then rename, so a crash never leaves a partial checkpoint
+        partial = path.with_suffix(".part")
+        with open(partial, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+
+    def cached(self, key: str, compute):
+        """Load key if checkpointed, otherwise compute and save it."""
+        if self.has(key):
+            return self.load(key)
+
+        value = compute()
+        self.save(key, value)
+        return value
+
+
+def clear_checkpoints(out_dir):
+    """Drop a run's checkpoints so its next run starts over."""
+    shutil.rmtree(Path(out_dir) / CHECKPOINT_DIR, ignore_errors=True)
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = {s.name: s for s in stages}
+        self.order = self._toposort(stages)
+
+    @property
+    def names(self):
+        return list(self.order)
+
+    def _toposort(self, stages):
+        order = []
+        state = {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline has a cycle through '{name}'")
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage '{name}'")
+
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for s in stages:
+            visit(s.name)
+
+        return order
+
+    def signature(self):
+        return [[name, list(self.stages[name].deps)] for name in self.order]
+
+    def run(self, ctx, store: CheckpointStore, stage_context=None):
+        """
+        Run every stage that has no checkpoint yet.
+
+        Args:
+            ctx: RunContext handed to every stage
+            store: checkpoints of this run
+            stage_context: optional callable(name) -> context manager
+                entered around each executed stage (e.g. JobProgress)
+
+        Returns:
+            output of the last stage
+        """
+        ctx.checkpoints = store
+        results = {}
+
+        def get(name):
+            if name in results:
+                return results[name]
+
+            stage = self.stages[name]
+
+            if stage.checkpoint and store.has(name):
+                results[name] = store.load(name)
+                return results[name]
+
+            inputs = {dep: get(dep) for dep in stage.deps}
+            value = stage.fn(ctx, **inputs)
+
+            if stage.checkpoint:
+                store.save(name, value)
+
+            results[name] = value
+            return value
+
+        for name in self.order:
+            stage = self.stages[name]
+
+            if stage.checkpoint and store.has(name):
+                ctx.resumed.append(name)
+                continue
+
+            with stage_context(name) if stage_context else nullcontext():
+                get(name)
+
+        return get(self.order[-1])
+
+
+class RunContext:
+    def __init__(self, input_path: Path, out_dir: Path, job_id: str, tile_name: str, service):
+        self.input_path = Path(input_path)
+        self.out_dir = Path(out_dir)
+        self.job_id = job_id
+        self.tile_name = tile_name
+        self.service = service
+        self.checkpoints = None
+        self.resumed = []
+
+
+def _file_fingerprint(paths):
+    return {
+        p.name: [p.stat().st_size, p.stat().st_mtime_ns]
+        for p in sorted(paths)
+    }
+
+
+def _model_fingerprint(service):
+    return getattr(service, "model_id", None)
+
+
+def _totals(energy):
+    return {
+        "total_energy_kwh_per_year": round(
+            sum(e["energy_kwh_per_year"] for e in energy), 2
+        ),
+        "total_cost_nzd_per_year": round(
+            sum(e["cost_savings_per_year"] for e in energy), 2
+        ),
+        "total_co2_kg_per_year": round(
+            sum(e["co2_savings_kg_per_year"] for e in energy), 2
+        ),
+    }
+
+
+def _scaled_area(pixels: int, decimation: int):
+    # Area thresholds are tuned at full resolution
+    return max(1, round(pixels / decimation ** 2))
+
+
+def _load(ctx):
+    decimation = decimation_factor(ctx.input_path, ctx.service.target_gsd)
+    image, meta = load_geotiff(ctx.input_path, is_mask=False, decimation=decimation)
+
+    return {
+        "image": image,
+        "meta": meta,
+        "scale": raster_pixel_scale(ctx.input_path),
+        "decimation": decimation,
+    }
+
+
+def _segmentation(ctx, load):
+    return ctx.service.predict(load["image"], scale=load["scale"])
+
+
+def _postprocess(ctx, load, segmentation):
+    return clean_roof_mask(
+        segmentation,
+        min_area=_scaled_area(MIN_ROOF_AREA, load["decimation"]),
+    )
+
+
+def _reflectance(ctx, load, postprocess):
+    return compute_roof_reflectance(
+        load["image"],
+        postprocess,
+        scale=load["scale"],
+        min_pixels=_scaled_area(MIN_REFLECTANCE_PIXELS, load["decimation"]),
+    )
+
+
+def _clustering(ctx, postprocess, reflectance):
+    roof_stats = summarize_roof_reflectance(reflectance)
+    roof_stats = cluster_roofs_by_reflectance(roof_stats)
+
+    return {
+        "roof_stats": roof_stats,
+        "thermal_mask": create_thermal_cluster_mask(postprocess, roof_stats),
+    }
+
+
+def _export(ctx, load, segmentation, postprocess, clustering):
+    meta = load["meta"]
+    out = ctx.out_dir
+
+    export_mask_geotiff(segmentation, meta, out / "pred_mask.tif")
+    export_mask_geotiff(postprocess, meta, out / "pred_mask_cleaned.tif")
+    export_mask_geotiff(clustering["thermal_mask"], meta, out / "thermal_clusters.tif")
+
+    # Overviews for the tile server. The input gets a sidecar .ovr only
+    # when the job owns it (uploads live in the job directory); CLI
+    # inputs are user data, possibly read-only, and are never touched
+    if ctx.input_path.resolve().parent == out.resolve():
+        build_overviews(ctx.input_path, Resampling.average, external=True)
+    build_overviews(out / "pred_mask_cleaned.tif")
+    build_overviews(out / "thermal_clusters.tif")
+
+    return ["pred_mask.tif", "pred_mask_cleaned.tif", "thermal_clusters.tif"]
+
+
+def _energy(ctx, load, postprocess, clustering):
+    transform = load["meta"]["transform"]
+    pixel_area_m2 = abs(transform[0] * transform[4])
+
+    roof_areas = compute_roof_areas(postprocess, pixel_area_m2)
+
+    return estimate_cooling_savings(
+        clustering["roof_stats"],
+        roof_areas,
+        ENERGY_CONSTANTS,
+    )
+
+
+def _persist(ctx, load, clustering, energy):
+    meta = load["meta"]
+    roof_stats = clustering["roof_stats"]
+
+    insert_analysis_result(
+        job_id=ctx.job_id,
+        tile_name=ctx.tile_name,
+        num_roofs=len(roof_stats),
+        hot_roofs=sum(r["type"] == "hot" for r in roof_stats),
+        cool_roofs=sum(r["type"] == "cool" for r in roof_stats),
+        energy_kwh=sum(e["energy_kwh_per_year"] for e in energy),
+        cost_nzd=sum(e["cost_savings_per_year"] for e in energy),
+        co2_kg=sum(e["co2_savings_kg_per_year"] for e in energy),
+        usage_factor=ENERGY_CONSTANTS["USAGE_FACTOR"],
+        max_kwh_per_roof=ENERGY_CONSTANTS["MAX_KWH_PER_ROOF"],
+    )
+
+    insert_roofs(
+        ctx.job_id,
+        ctx.tile_name,
+        build_roof_records(
+            roof_stats,
+            energy,
+            meta["transform"],
+            crs=meta["crs"].to_string() if meta["crs"] else None,
+        ),
+    )
+
+    return {
+        "job_id": ctx.job_id,
+        "num_roofs": len(roof_stats),
+        "cool_roofs": sum(r["type"] == "cool" for r in roof_stats),
+        "hot_roofs": sum(r["type"] == "hot" for r in roof_stats),
+        **_totals(energy),
+    }
+
+
+ANALYSIS_PIPELINE = Pipeline([
+    Stage("load", _load, checkpoint=False),
+    Stage("segmentation", _segmentation, deps=["load"]),
+    Stage("postprocess", _postprocess, deps=["load", "segmentation"]),
+    Stage("reflectance", _reflectance, deps=["load", "postprocess"]),
+    Stage("clustering", _clustering, deps=["postprocess", "reflectance"]),
+    Stage("export", _export, deps=["load", "segmentation", "postprocess", "clustering"]),
+    Stage("energy", _energy, deps=["load", "postprocess", "clustering"]),
+    Stage("persist", _persist, deps=["load", "clustering", "energy"]),
+])
+
+
+def run_file(input_path, out_dir, job_id: str, tile_name: str, service, stage_context=None):
+    """
+    Analyse one raster, resuming from out_dir/.checkpoints.
+
+    Returns:
+        summary dict (see _persist)
+    """
+    input_path, out_dir = Path(input_path), Path(out_dir)
+    ctx = RunContext(input_path, out_dir, job_id, tile_name, service)
+
+    store = CheckpointStore(
+        out_dir / CHECKPOINT_DIR,
+        {
+            "pipeline": ANALYSIS_PIPELINE.signature(),
+            "inputs": _file_fingerprint([input_path]),
+            "model": _model_fingerprint(service),
+            "job_id": job_id,
+        },
+    )
+
+    result = ANALYSIS_PIPELINE.run(ctx, store, stage_context)
+
+    if ctx.resumed:
+        logger.info(f"{tile_name}: resumed after {', '.join(ctx.resumed)}")
+
+    return result
+
+
+def _process_member(ctx, member):
+    """
+    Segment one batch member and reduce it for merging; the cleaned
+    mask is written next to the outputs for the thermal export.
+    """
+    decimation = decimation_factor(member["path"], ctx.service.target_gsd)
+    image, meta = load_geotiff(
+        member["path"],
+        window=member["window"],
+        decimation=decimation,
+    )
+    scale = raster_pixel_scale(member["path"])
+
+    raw_mask = ctx.service.predict(image, scale=scale)
+
+    # Small edge fragments may be part of a roof in the next file
+    cleaned_mask = clean_roof_mask(
+        raw_mask,
+        min_area=_scaled_area(MIN_ROOF_AREA, decimation),
+        keep_border=True,
+    )
+
+    parts = compute_roof_reflectance(image, cleaned_mask, scale=scale, min_pixels=1)
+
+    stem = member_stem(member["name"])
+    export_mask_geotiff(cleaned_mask, meta, ctx.out_dir / f"{stem}_mask_cleaned.tif")
+
+    _, labels, _, _ = cv2.connectedComponentsWithStats(cleaned_mask, connectivity=8)
+
+    described = describe_member(member["name"], meta, labels, parts)
+    described["decimation"] = decimation
+    return described
+
+
+def _members(ctx):
+    members = plan_members(ctx.input_path, block_size=MOSAIC_BLOCK_SIZE)
+
+    # Each member is checkpointed on its own, so an interrupted batch
+    # only redoes the members that had not finished
+    def run(member):
+        return ctx.checkpoints.cached(
+            f"members/{member_stem(member['name'])}",
+            lambda: _process_member(ctx, member),
+        )
+
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        return list(pool.map(bind_job_metrics(run), members))
+
+
+def _merge(ctx, members):
+    # Members share one pixel size (validate_batch), so one factor
+    decimation = members[0]["decimation"] if members else 1
+    return merge_roofs(members, min_area=_scaled_area(MIN_ROOF_AREA, decimation))
+
+
+def _batch_clustering(ctx, merge):
+    return cluster_roofs_by_reflectance(merge)
+
+
+def _export_member_thermal(ctx, member, roof_types):
+    stem = member_stem(member["name"])
+
+    cleaned_mask, meta = load_geotiff(
+        ctx.out_dir / f"{stem}_mask_cleaned.tif",
+        is_mask=True,
+    )
+
+    thermal_mask = create_thermal_cluster_mask(
+        cleaned_mask,
+        [{"label": label, "type": t} for label, t in roof_types.items()],
+    )
+
+    name = f"{stem}_thermal_clusters.tif"
+    export_mask_geotiff(thermal_mask, meta, ctx.out_dir / name)
+    return name
+
+
+def _batch_export(ctx, members, clustering):
+    roof_types = [{} for _ in members]
+    for r in clustering:
+        for m, label in r["parts"]:
+            roof_types[m][label] = r["type"]
+
+    export = bind_job_metrics(lambda args: _export_member_thermal(ctx, *args))
+
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        return list(pool.map(export, zip(members, roof_types)))
+
+
+def _batch_energy(ctx, clustering):
+    return estimate_cooling_savings(
+        clustering,
+        {r["label"]: r["area_m2"] for r in clustering},
+        ENERGY_CONSTANTS,
+    )
+
+
+def _batch_persist(ctx, members, clustering, energy):
+    roofs = clustering
+    energy_by_label = {e["label"]: e for e in energy}
+
+    # One row per input file: the members themselves, or the GeoTIFFs
+    # behind a VRT whose blocks were the members
+    sources = source_files(ctx.input_path)
+    if sources is None:
+        names = [m["name"] for m in members]
+        owners = [r["member"] for r in roofs]
+    else:
+        names = [name for name, _ in sources]
+        owners = assign_sources(roofs, sources)
+
+    records = build_mosaic_records(roofs, energy, crs=members[0]["crs"], owners=owners)
+
+    for u, name in enumerate(names):
+        owned = [r for r, o in zip(roofs, owners) if o == u]
+        owned_energy = [energy_by_label[r["label"]] for r in owned]
+
+        insert_analysis_result(
+            job_id=ctx.job_id,
+            tile_name=name,
+            num_roofs=len(owned),
+            hot_roofs=sum(r["type"] == "hot" for r in owned),
+            cool_roofs=sum(r["type"] == "cool" for r in owned),
+            energy_kwh=sum(e["energy_kwh_per_year"] for e in owned_energy),
+            cost_nzd=sum(e["cost_savings_per_year"] for e in owned_energy),
+            co2_kg=sum(e["co2_savings_kg_per_year"] for e in owned_energy),
+            usage_factor=ENERGY_CONSTANTS["USAGE_FACTOR"],
+            max_kwh_per_roof=ENERGY_CONSTANTS["MAX_KWH_PER_ROOF"],
+        )
+
+        insert_roofs(ctx.job_id, name, records.get(u, []))
+
+    return {
+        "job_id": ctx.job_id,
+        "batch": True,
+        "num_members": len(members),
+        "num_files": len(names),
+        "num_roofs": len(roofs),
+        "merged_roofs": sum(len({m for m, _ in r["parts"]}) > 1 for r in roofs),
+        "cool_roofs": sum(r["type"] == "cool" for r in roofs),
+        "hot_roofs": sum(r["type"] == "hot" for r in roofs),
+        **_totals(energy),
+    }
+
+
+BATCH_PIPELINE = Pipeline([
+    Stage("members", _members),
+    Stage("merge", _merge, deps=["members"]),
+    Stage("clustering", _batch_clustering, deps=["merge"]),
+    Stage("export", _batch_export, deps=["members", "clustering"]),
+    Stage("energy", _batch_energy, deps=["clustering"]),
+    Stage("persist", _batch_persist, deps=["members", "clustering", "energy"]),
+])
+
+
+def run_batch(inputs_dir, out_dir, job_id: str, service, stage_context=None):
+    """
+    Analyse a directory of adjacent rasters (or a VRT) as one mosaic,
+    resuming from out_dir/.checkpoints.
+
+    Members are processed in parallel, roofs cut by member edges are
+    merged, and clustering runs once over the whole batch so hot/cool
+    is consistent across files. One analysis_results row is stored per
+    input GeoTIFF (also when a VRT was processed in blocks) and the
+    returned summary covers the whole batch.
+    """
+    inputs_dir, out_dir = Path(inputs_dir), Path(out_dir)
+    ctx = RunContext(inputs_dir, out_dir, job_id, None, service)
+
+    store = CheckpointStore(
+        out_dir / CHECKPOINT_DIR,
+        {
+            "pipeline": BATCH_PIPELINE.signature(),
+            "inputs": _file_fingerprint(p for p in inputs_dir.iterdir() if p.is_file()),
+            "model": _model_fingerprint(service),
+            "block_size": MOSAIC_BLOCK_SIZE,
+            "job_id": job_id,
+        },
+    )
+
+    return BATCH_PIPELINE.run(ctx, store, stage_context)
+
+
+_service = None
+
+
+def _init_worker(service_kwargs, threads):
+    global _service
+
+    import torch
+    from backend.services.segmentation import RoofSegmentationService
+
+    torch.set_num_threads(threads)
+    _service = RoofSegmentationService(**service_kwargs)
+
+
+def _run_cli_file(path: Path, output_dir: Path, job_id: str):
+    start = time.perf_counter()
+    result = run_file(path, output_dir / path.stem, job_id, path.name, _service)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input_dir", type=Path, help="directory of GeoTIFFs")
+    parser.add_argument("output_dir", type=Path, help="outputs and checkpoints")
+    parser.add_argument("--workers", type=int, default=1, help="files processed in parallel")
+    parser.add_argument("--job-id", default=None, help="analysis_results job id (default: output dir name)")
+    parser.add_argument("--mosaic", action="store_true", help="treat the files as one mosaic (batch job)")
+    parser.add_argument("--checkpoint", default=MODEL_CHECKPOINT or None)
+    parser.add_argument("--model", default=DEFAULT_BACKBONE)
+    parser.add_argument(
+        "--target-gsd",
+        type=float,
+        default=MODEL_TARGET_GSD,
+        help="inference GSD in m/pixel (default: the model's)",
+    )
+    parser.add_argument(
+        "--coarse-factor",
+        type=int,
+        default=COARSE_FACTOR,
+        help="coarse-to-fine first pass downsampling (default: off)",
+    )
+    parser.add_argument("--coarse-threshold", type=float, default=COARSE_THRESHOLD)
+    parser.add_argument(
+        "--triage-checkpoint",
+        default=TRIAGE_CHECKPOINT or None,
+        help="tile triage classifier weights (default: off)",
+    )
+    parser.add_argument("--triage-threshold", type=float, default=TRIAGE_THRESHOLD)
+    parser.add_argument("--triage-margin", type=float, default=TRIAGE_MARGIN)
+    args = parser.parse_args(argv)
+
+    service_kwargs = {
+        "checkpoint_path": args.checkpoint,
+        "model_name": args.model,
+        "target_gsd": args.target_gsd,
+        "coarse_factor": args.coarse_factor,
+        "coarse_threshold": args.coarse_threshold,
+        "triage_checkpoint": args.triage_checkpoint,
+        "triage_threshold": args.triage_threshold,
+        "triage_margin": args.triage_margin,
+    }
+
+    job_id = args.job_id or args.output_dir.resolve().name
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    init_db()
+
+    if args.mosaic:
+        _init_worker(service_kwargs, os.cpu_count() or 1)
+        result = run_batch(args.input_dir, args.output_dir, job_id, _service)
+        print(json.dumps(result, indent=2))
+        return 0
+
+    paths = sorted(
+        p for p in args.input_dir.iterdir()
+        if p.suffix.lower() in RASTER_SUFFIXES
+    )
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    failed = 0
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(service_kwargs, threads),
+    ) as pool:
+        futures = {
+            pool.submit(_run_cli_file, p, args.output_dir, job_id): p
+            for p in paths
+        }
+
+        for i, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{i}/{len(paths)}] {path.name}: FAILED ({e})")
+                continue
+
+            print(
+                f"[{i}/{len(paths)}] {path.name}: {result['num_roofs']} roofs "
+                f"in {seconds:.1f} s"
+            )
+
+    print(f"{len(paths) - failed}/{len(paths)} files done, job_id={job_id}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
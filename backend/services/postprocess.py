@@ -1,11 +1,15 @@
 import numpy as np
 import cv2
 
+from backend.utils.metrics import timed
 
+
+@timed()
 def clean_roof_mask(
     mask: np.ndarray,
     min_area: int = 100,
     kernel_size: int = 3,
+    keep_border: bool = False,
 ):
     """
     Clean raw roof segmentation mask.
@@ -14,6 +18,9 @@ def clean_roof_mask(
         mask: np.ndarray (H, W), uint8 (0 or 1)
         min_area: minimum connected component area to keep
         kernel_size: morphological kernel size
+        keep_border: keep components touching the image edge whatever
+            their size, for mosaics where they may continue in the
+            neighbouring file (see backend.services.mosaic)
 
     Returns:
         cleaned_mask: np.ndarray (H, W), uint8
@@ -39,10 +46,23 @@ def clean_roof_mask(
     )
 
     cleaned = np.zeros_like(mask)
+    h, w = mask.shape
 
     for i in range(1, num_labels):  # skip background
         area = stats[i, cv2.CC_STAT_AREA]
-        if area >= min_area:
+
+        keep = area >= min_area
+
+        if keep_border and not keep:
+            x = stats[i, cv2.CC_STAT_LEFT]
+            y = stats[i, cv2.CC_STAT_TOP]
+            keep = (
+                x == 0 or y == 0
+                or x + stats[i, cv2.CC_STAT_WIDTH] == w
+                or y + stats[i, cv2.CC_STAT_HEIGHT] == h
+            )
+
+        if keep:
             cleaned[labels == i] = 1
 
     return cleaned
@@ -5,63 +5,178 @@ import cv2
 IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
 IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
 
+# Rec.709 luma weights (R, G, B)
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+
+def pixel_scale(dtype):
+    """
+    Value that maps a raster dtype onto the 0–1 range.
+
+    Decided once per raster from its metadata (meta["dtype"]) so tiles
+    never need a max() scan. Float rasters may hold 0–1 or 0–255
+    values, so their scale cannot come from the dtype: see
+    data_loader.raster_pixel_scale, or resolve_pixel_scale on the
+    whole image.
+
+    Args:
+        dtype: numpy / rasterio dtype of the source pixels
+
+    Returns:
+        scale: 255.0 for uint8, the dtype max for wider integers,
+            None for floats
+    """
+    dtype = np.dtype(dtype)
+
+    if dtype == np.uint8:
+        return 255.0
+
+    if np.issubdtype(dtype, np.integer):
+        return float(np.iinfo(dtype).max)
+
+    return None
+
+
+def scale_from_maximum(maximum: float) -> float:
+    """Legacy float rule: values above 1 are taken as 0–255."""
+    return 255.0 if maximum > 1.0 else 1.0
+
+
+def resolve_pixel_scale(tile: np.ndarray, scale=None) -> float:
+    """
+    Pick the 0–1 scale for a tile when the caller did not pass one.
+
+    Integer tiles use their dtype; float tiles fall back to the legacy
+    0–255 vs 0–1 check.
+    """
+    if scale is not None:
+        return float(scale)
+
+    if np.issubdtype(tile.dtype, np.integer):
+        return pixel_scale(tile.dtype)
+
+    return scale_from_maximum(float(tile.max()))
+
+
+def to_uint8(tile: np.ndarray, scale: float = None):
+    """
+    Map a tile onto uint8 (0–255); uint8 tiles are returned as is.
+    """
+    if tile.dtype == np.uint8:
+        return tile
+
+    scale = resolve_pixel_scale(tile, scale)
+    out = np.multiply(tile, np.float32(255.0 / scale), dtype=np.float32)
+
+    return np.clip(out, 0, 255, out=out).astype(np.uint8)
+
 
 def normalize_tile(
     tile: np.ndarray,
     method: str = "imagenet",
+    scale: float = None,
+    out: np.ndarray = None,
 ):
     """
     Normalize a single tile.
 
+    Rescaling and standardization are folded into one per-channel
+    multiply-add written straight into the output buffer.
+
     Args:
-        tile: np.ndarray (H, W, 3), values 0–255 or 0–1
+        tile: np.ndarray (H, W, 3), uint8/uint16 or float
         method: "imagenet" or "per_image"
+        scale: value mapping pixels to 0–1 (see pixel_scale);
+            inferred from the tile when None
+        out: optional preallocated float32 buffer of the tile's shape
 
     Returns:
         normalized tile (float32)
     """
-    tile = tile.astype(np.float32)
-
-    # Scale to 0–1 if needed
-    if tile.max() > 1.0:
-        tile = tile / 255.0
+    scale = resolve_pixel_scale(tile, scale)
 
     if method == "imagenet":
-        tile = (tile - IMAGENET_MEAN) / IMAGENET_STD
+        mean = IMAGENET_MEAN
+        std = IMAGENET_STD
 
     elif method == "per_image":
-        mean = tile.mean(axis=(0, 1), keepdims=True)
-        std = tile.std(axis=(0, 1), keepdims=True) + 1e-6
-        tile = (tile - mean) / std
+        # Statistics in raw units, then mapped to the 0–1 range
+        mean = tile.mean(axis=(0, 1), dtype=np.float64) / scale
+        std = tile.std(axis=(0, 1), dtype=np.float64) / scale + 1e-6
 
     else:
         raise ValueError(f"Unknown normalization method: {method}")
 
-    return tile
+    # (x / scale - mean) / std  ==  x * gain - offset
+    gain = (1.0 / (scale * std)).astype(np.float32)
+    offset = (mean / std).astype(np.float32)
+
+    if out is None:
+        out = np.empty(tile.shape, dtype=np.float32)
+
+    np.multiply(tile, gain, out=out, casting="unsafe")
+    np.subtract(out, offset, out=out)
+
+    return out
 
 
-def detect_shadows(tile: np.ndarray, threshold: float = 0.15):
+def compute_luminance(
+    image: np.ndarray,
+    scale: float = None,
+    out: np.ndarray = None,
+    rows_per_chunk: int = 256,
+):
+    """
+    Compute Rec.709 luminance in the 0–1 range.
+
+    Runs in row strips so only one strip is ever promoted to float32,
+    whatever the size of the image.
+
+    Args:
+        image: np.ndarray (H, W, 3), uint8/uint16 or float
+        scale: value mapping pixels to 0–1 (see pixel_scale);
+            inferred from the image when None
+        out: optional preallocated float32 buffer (H, W)
+        rows_per_chunk: rows processed per strip
+
+    Returns:
+        luminance: np.ndarray (H, W), float32
+    """
+    scale = resolve_pixel_scale(image, scale)
+    weights = LUMINANCE_WEIGHTS / np.float32(scale)
+
+    if out is None:
+        out = np.empty(image.shape[:2], dtype=np.float32)
+
+    for y in range(0, image.shape[0], rows_per_chunk):
+        out[y:y + rows_per_chunk] = image[y:y + rows_per_chunk, :, :3] @ weights
+
+    return out
+
+
+def detect_shadows(
+    tile: np.ndarray,
+    threshold: float = 0.15,
+    scale: float = None,
+    luminance: np.ndarray = None,
+):
     """
     Detect shadow regions using luminance thresholding.
 
     Args:
-        tile: np.ndarray (H, W, 3) in 0–1 range
-        threshold: luminance threshold
+        tile: np.ndarray (H, W, 3), uint8/uint16 or float
+        threshold: luminance threshold (0–1 range)
+        scale: value mapping pixels to 0–1 (see pixel_scale);
+            inferred from the tile when None
+        luminance: optional precomputed luminance (see compute_luminance)
 
     Returns:
         shadow_mask: np.ndarray (H, W), bool
     """
-    if tile.max() > 1.0:
-        tile = tile / 255.0
+    if luminance is None:
+        luminance = compute_luminance(tile, scale=scale)
 
-    # Convert to grayscale luminance
-    gray = (
-        0.2126 * tile[:, :, 0]
-        + 0.7152 * tile[:, :, 1]
-        + 0.0722 * tile[:, :, 2]
-    )
-
-    shadow_mask = gray < threshold
+    shadow_mask = luminance < threshold
     return shadow_mask
 
 
@@ -99,6 +214,7 @@ def morphological_cleanup(
 def preprocess_tile(
     tile: np.ndarray,
     norm_method: str = "imagenet",
+    scale: float = None,
 ):
     """
     Full preprocessing pipeline for a single tile.
@@ -107,8 +223,10 @@ def preprocess_tile(
         processed_tile: np.ndarray (H, W, 3)
         shadow_mask: np.ndarray (H, W), bool
     """
-    tile_norm = normalize_tile(tile, method=norm_method)
-    shadow_mask = detect_shadows(tile)
+    scale = resolve_pixel_scale(tile, scale)
+
+    tile_norm = normalize_tile(tile, method=norm_method, scale=scale)
+    shadow_mask = detect_shadows(tile, scale=scale)
     shadow_mask = morphological_cleanup(shadow_mask)
 
     return tile_norm, shadow_mask
@@ -1,36 +1,104 @@
 import numpy as np
+import cv2
+
+from backend.services.features import FeaturePlanes
+from backend.services.preprocessing import LUMINANCE_WEIGHTS, resolve_pixel_scale
+from backend.utils.metrics import count, timed
 
 
 def compute_reflectance_map(
     image: np.ndarray,
     roof_mask: np.ndarray,
+    scale: float = None,
 ):
     """
     Compute per-pixel reflectance for roof regions.
 
+    Dense variant kept for callers that need a full raster; the
+    pipeline uses compute_roof_reflectance instead.
+
     Args:
-        image: np.ndarray (H, W, 3), RGB, uint8 or float
+        image: np.ndarray (H, W, 3), RGB, uint8/uint16 or float
         roof_mask: np.ndarray (H, W), uint8 or bool
+        scale: value mapping pixels to 0–1 (see pixel_scale);
+            inferred from the image when None
 
     Returns:
         reflectance_map: np.ndarray (H, W), float32
     """
-    image = image.astype(np.float32)
+    scale = np.float32(resolve_pixel_scale(image, scale))
+
+    roof = roof_mask > 0
+    pixels = image[roof]  # (N, 3), source dtype
+
+    reflectance_map = np.zeros(roof_mask.shape, dtype=np.float32)
+    reflectance_map[roof] = pixels @ (LUMINANCE_WEIGHTS / scale)
+
+    return reflectance_map
+
+
+@timed()
+def compute_roof_reflectance(
+    image: np.ndarray,
+    roof_mask: np.ndarray,
+    scale: float = None,
+    min_pixels: int = 50,
+    shadow_threshold: float = None,
+):
+    """
+    Compute reflectance sparsely, one roof at a time.
 
-    if image.max() > 1.0:
-        image = image / 255.0
+    Luminance is only evaluated inside each roof's bounding box and
+    only the roof's own pixels are kept, so no full-scene float map is
+    ever allocated.
 
-    R = image[:, :, 0]
-    G = image[:, :, 1]
-    B = image[:, :, 2]
+    Args:
+        image: np.ndarray (H, W, 3), RGB, uint8/uint16 or float
+        roof_mask: np.ndarray (H, W), uint8 or bool
+        scale: value mapping pixels to 0–1 (see pixel_scale);
+            inferred from the image when None
+        min_pixels: minimum pixels to consider a roof valid
+        shadow_threshold: if set, drop roof pixels whose luminance is
+            below this value
+
+    Returns:
+        roofs: list of dicts with label, area_pixels, bbox (x, y, w, h),
+            centroid (col, row) and pixels (float32 reflectance of the
+            roof's pixels)
+    """
+    scale = resolve_pixel_scale(image, scale)
 
-    luminance = (
-        0.2126 * R +
-        0.7152 * G +
-        0.0722 * B
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
+        roof_mask.astype(np.uint8),
+        connectivity=8,
     )
 
-    reflectance_map = np.zeros_like(luminance, dtype=np.float32)
-    reflectance_map[roof_mask > 0] = luminance[roof_mask > 0]
+    roofs = []
 
-    return reflectance_map
+    for i in range(1, num_labels):  # skip background
+        area = stats[i, cv2.CC_STAT_AREA]
+        if area < min_pixels:
+            continue
+
+        x = stats[i, cv2.CC_STAT_LEFT]
+        y = stats[i, cv2.CC_STAT_TOP]
+        w = stats[i, cv2.CC_STAT_WIDTH]
+        h = stats[i, cv2.CC_STAT_HEIGHT]
+
+        planes = FeaturePlanes(image[y:y + h, x:x + w], scale=scale)
+        inside = labels[y:y + h, x:x + w] == i
+
+        if shadow_threshold is not None:
+            inside &= ~planes.shadow_mask(shadow_threshold)
+
+        roofs.append({
+            "label": i,
+            "area_pixels": area,
+            "bbox": (int(x), int(y), int(w), int(h)),
+            "centroid": (float(centroids[i, 0]), float(centroids[i, 1])),
+            "pixels": planes.luminance[inside],
+        })
+
+    count("roofs", len(roofs))
+
+    return roofs
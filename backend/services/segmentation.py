@@ -1,60 +1,236 @@
+import cv2
 import torch
 import numpy as np
 
-from backend.models.efficient_unet import get_efficientnet_unet
-from backend.services.preprocessing import normalize_tile
+from backend.models.model_factory import build_model, load_weights, model_info
+from backend.models.tile_classifier import TileClassifier
+from backend.services.preprocessing import (
+    normalize_tile,
+    resolve_pixel_scale,
+)
 from backend.services.tiling import tile_image, stitch_tiles
+from backend.utils.metrics import count, timed, timer
+from backend.utils.profiling import torch_profile
+
+INFERENCE_TILE = 512
 
 
 class RoofSegmentationService:
-    def __init__(self, checkpoint_path: str):
+    def __init__(
+        self,
+        checkpoint_path: str = None,
+        model_name: str = "efficientnet",
+        target_gsd: float = None,
+        coarse_factor: int = None,
+        coarse_threshold: float = 0.2,
+        triage_checkpoint: str = None,
+        triage_threshold: float = 0.5,
+        triage_margin: float = 0.5,
+    ):
+        """
+        Args:
+            checkpoint_path: state dict to load; None keeps the random
+                initialisation (load tests and smoke runs only)
+            model_name: architecture from backend.models.model_factory
+            target_gsd: GSD (m/pixel) to run inference at; defaults to
+                the model's registry metadata
+            coarse_factor: downsampling of the coarse-to-fine first
+                pass; None runs every tile at full resolution
+            coarse_threshold: coarse probability a tile needs to get
+                the full-resolution pass (low = favour recall)
+            triage_checkpoint: TileClassifier state dict; tiles it
+                rates as roof-free are not segmented. None disables
+                triage
+            triage_threshold: roof probability below which a tile is
+                roof-free (tuned by training/train_triage.py)
+            triage_margin: safety margin, the fraction the threshold is
+                lowered by before a tile is actually skipped
+        """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"[Segmentation] Using device: {self.device}")
 
-        self.model = get_efficientnet_unet()
-        self.model.load_state_dict(
-            torch.load(checkpoint_path, map_location=self.device)
+        self.model = build_model(model_name)
+        self.target_gsd = target_gsd or model_info(model_name)["target_gsd"]
+        self.coarse_factor = coarse_factor
+        self.coarse_threshold = coarse_threshold
+
+        # Identifies the weights and scale in pipeline checkpoints
+        self.model_id = (
+            f"{model_name}:{checkpoint_path or 'random'}@{self.target_gsd}"
         )
+        if coarse_factor:
+            self.model_id += f"/coarse{coarse_factor}:{coarse_threshold}"
+
+        self.triage = None
+        self.triage_cutoff = triage_threshold * (1 - triage_margin)
+
+        if triage_checkpoint:
+            self.triage = TileClassifier()
+            self.triage.load_state_dict(
+                torch.load(triage_checkpoint, map_location=self.device)
+            )
+            self.triage.to(self.device)
+            self.triage.eval()
+            self.model_id += f"/triage:{triage_checkpoint}<{self.triage_cutoff:g}"
+
+        if checkpoint_path:
+            load_weights(self.model, checkpoint_path, map_location=self.device)
+        else:
+            print(f"[Segmentation] No checkpoint, {model_name} is randomly initialised")
+
         self.model.to(self.device)
         self.model.eval()
 
-    @torch.no_grad()
-    def predict(self, image: np.ndarray, threshold: float = 0.5):
+    def _to_tensor(self, tile, scale, buffer):
+        tile_norm = normalize_tile(
+            tile,
+            method="imagenet",
+            scale=scale,
+            out=buffer,
+        )
+
+        return (
+            torch.from_numpy(tile_norm)
+            .permute(2, 0, 1)
+            .unsqueeze(0)
+            .to(self.device)
+        )
+
+    def _is_roof_free(self, x):
+        with timer("triage"):
+            return torch.sigmoid(self.triage(x)).item() < self.triage_cutoff
+
+    def _predict_probs(self, image, scale, keep=None, counter="tiles", triage=False):
         """
-        Run tiled inference on full image.
+        Tiled probabilities; tiles rejected by keep(info), or by the
+        triage classifier when triage is set, stay 0.
 
-        Args:
-            image: np.ndarray (H, W, 3)
-            threshold: sigmoid threshold
+        Edge tiles are zero-padded to INFERENCE_TILE, so every pixel is
+        predicted whatever the (possibly decimated) scene size.
 
         Returns:
-            binary_mask: np.ndarray (H, W), uint8
+            full_prob: np.ndarray (H, W), float32
+            skipped: number of tiles not run
         """
         tile_preds = []
         tile_infos = []
+        skipped = 0
+        triaged = 0
+        buffer = None
 
-        for tile, info in tile_image(image):
-            tile_norm = normalize_tile(tile, method="imagenet")
+        for tile, info in tile_image(image, tile_size=INFERENCE_TILE, pad_edges=True):
+            if keep is not None and not keep(info):
+                skipped += 1
+                continue
 
-            x = (
-                torch.tensor(tile_norm)
-                .permute(2, 0, 1)
-                .unsqueeze(0)
-                .float()
-                .to(self.device)
-            )
+            if buffer is None or buffer.shape != tile.shape:
+                buffer = np.empty(tile.shape, dtype=np.float32)
 
-            logits = self.model(x)
-            probs = torch.sigmoid(logits)[0, 0].cpu().numpy()
+            x = self._to_tensor(tile, scale, buffer)
+
+            if triage and self.triage is not None and self._is_roof_free(x):
+                triaged += 1
+                continue
+
+            with timer("inference"):
+                probs = torch.sigmoid(self.model(x))[0, 0].cpu().numpy()
 
             tile_preds.append(probs)
             tile_infos.append(info)
 
+        count(counter, len(tile_preds))
+        if triage:
+            count("tiles_triaged", triaged)
+
         full_prob = stitch_tiles(
             tile_preds,
             tile_infos,
             full_shape=image.shape[:2],
         )
 
+        return full_prob, skipped
+
+    @torch.no_grad()
+    @timed("coarse_pass")
+    def roof_likelihood(self, image: np.ndarray, factor: int, scale: float = None):
+        """
+        Cheap roof probability map from a downsampled copy of the image.
+
+        The scene is shrunk by factor (area averaging), so the model
+        sees about factor² fewer pixels.
+
+        Returns:
+            likelihood: np.ndarray (ceil(H / factor), ceil(W / factor)),
+                float32
+        """
+        scale = resolve_pixel_scale(image, scale)
+        h, w = image.shape[:2]
+        ch, cw = -(-h // factor), -(-w // factor)
+
+        small = cv2.resize(
+            np.ascontiguousarray(image),
+            (cw, ch),
+            interpolation=cv2.INTER_AREA,
+        )
+
+        likelihood, _ = self._predict_probs(small, scale, counter="coarse_tiles")
+        return likelihood
+
+    @torch.no_grad()
+    @timed("segmentation")
+    def predict(
+        self,
+        image: np.ndarray,
+        threshold: float = 0.5,
+        scale: float = None,
+    ):
+        """
+        Run tiled inference on full image.
+
+        With coarse_factor set, a roof_likelihood pass runs first and
+        only tiles whose footprint reaches coarse_threshold get the
+        full-resolution pass; the others are predicted as background.
+        With a triage classifier, tiles it rates as roof-free are
+        predicted as background too.
+
+        Args:
+            image: np.ndarray (H, W, 3), uint8/uint16 or float
+            threshold: sigmoid threshold
+            scale: value mapping pixels to 0–1 (see pixel_scale);
+                inferred from the image when None
+
+        Returns:
+            binary_mask: np.ndarray (H, W), uint8
+        """
+        scale = resolve_pixel_scale(image, scale)
+        keep = None
+
+        with torch_profile("inference"):
+            if self.coarse_factor:
+                likelihood = self.roof_likelihood(image, self.coarse_factor, scale)
+                keep = lambda info: tile_likelihood(  # noqa: E731
+                    likelihood, info, self.coarse_factor
+                ) >= self.coarse_threshold
+
+            full_prob, skipped = self._predict_probs(image, scale, keep, triage=True)
+
+        count("tiles_skipped", skipped)
+
         binary_mask = (full_prob >= threshold).astype(np.uint8)
         return binary_mask
+
+
+def tile_likelihood(likelihood: np.ndarray, info: dict, factor: int):
+    """
+    Highest coarse roof probability over a tile's footprint.
+
+    The footprint is grown by one coarse pixel on each side so roofs
+    straddling the tile edge still count.
+    """
+    y0 = max(0, info["y_offset"] // factor - 1)
+    x0 = max(0, info["x_offset"] // factor - 1)
+    y1 = -(-(info["y_offset"] + info["height"]) // factor) + 1
+    x1 = -(-(info["x_offset"] + info["width"]) // factor) + 1
+
+    window = likelihood[y0:y1, x0:x1]
+    return float(window.max()) if window.size else 0.0
@@ -0,0 +1,131 @@
+import numpy as np
+import shapely
+from shapely.errors import ShapelyError
+from shapely.geometry import shape
+
+from backend.services.db import iter_roofs_in_bbox
+
+TOTAL_KEYS = ("area_m2", "energy_kwh", "cost_nzd", "co2_kg")
+
+
+class RoofTotals:
+    """Running roof counts and savings over batches of roof rows."""
+
+    def __init__(self):
+        self.jobs = set()
+        self.counts = {"num_roofs": 0, "hot_roofs": 0, "cool_roofs": 0}
+        self.sums = dict.fromkeys(TOTAL_KEYS, 0.0)
+
+    def add(self, roofs):
+        for r in roofs:
+            self.jobs.add(r["job_id"])
+            self.counts["num_roofs"] += 1
+            self.counts["hot_roofs"] += r["roof_type"] == "hot"
+            self.counts["cool_roofs"] += r["roof_type"] == "cool"
+
+            for key in TOTAL_KEYS:
+                self.sums[key] += r[key] or 0.0
+
+        return self
+
+    def as_dict(self):
+        """Totals with the same keys as db.get_roof_totals."""
+        return {
+            "num_jobs": len(self.jobs),
+            **self.counts,
+            **{key: float(value) for key, value in self.sums.items()},
+        }
+
+
+def summarize_roofs(roofs):
+    """
+    Aggregate roof counts and savings over a list of roof rows.
+
+    Returns:
+        dict of totals (same keys as db.get_roof_totals)
+    """
+    return RoofTotals().add(roofs).as_dict()
+
+
+def _polygon(geometry: dict):
+    try:
+        polygon = shape(geometry)
+    except (ShapelyError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid geometry: {e}")
+
+    if polygon.geom_type not in ("Polygon", "MultiPolygon"):
+        raise ValueError(f"Expected a polygon, got {polygon.geom_type}")
+
+    return polygon
+
+
+def iter_roofs_in_polygon(geometry: dict, crs: str = None, page_size: int = 1000):
+    """
+    Roofs whose centroid falls inside a polygon, page by page.
+
+    The R*Tree narrows the search to the polygon's bounding box; each
+    page of candidates is tested against the exact geometry in one
+    vectorised call.
+
+    Args:
+        geometry: GeoJSON Polygon/MultiPolygon in the roofs' projected CRS
+        crs: restrict to roofs stored in this CRS
+        page_size: candidates read from the database at a time
+
+    Yields:
+        lists of roof dicts
+
+    Raises:
+        ValueError: if geometry is not a valid (Multi)Polygon
+    """
+    polygon = _polygon(geometry)
+
+    for page in iter_roofs_in_bbox(*polygon.bounds, crs=crs, page_size=page_size):
+        page = [r for r in page if r["centroid_x"] is not None]
+        if not page:
+            continue
+
+        xs = np.array([r["centroid_x"] for r in page])
+        ys = np.array([r["centroid_y"] for r in page])
+
+        inside = shapely.contains_xy(polygon, xs, ys)
+        yield [r for r, keep in zip(page, inside) if keep]
+
+
+def query_roofs_in_polygon(geometry: dict, crs: str = None, limit: int = None):
+    """
+    Roofs whose centroid falls inside a polygon; candidates stop being
+    read once limit roofs are found.
+
+    Returns:
+        list of at most limit roof dicts
+    """
+    roofs = []
+
+    for page in iter_roofs_in_polygon(geometry, crs=crs):
+        roofs.extend(page)
+
+        if limit is not None and len(roofs) >= limit:
+            return roofs[:limit]
+
+    return roofs
+
+
+def summarize_polygon(geometry: dict, crs: str = None, limit: int = 1000):
+    """
+    Totals over every roof inside a polygon, plus the first limit roofs.
+
+    One streaming pass: at most a page of candidates and limit roofs
+    are held in memory, however many roofs the polygon covers.
+
+    Returns:
+        (totals, roofs)
+    """
+    totals = RoofTotals()
+    roofs = []
+
+    for page in iter_roofs_in_polygon(geometry, crs=crs):
+        totals.add(page)
+        roofs.extend(page[:max(0, limit - len(roofs))])
+
+    return totals.as_dict(), roofs
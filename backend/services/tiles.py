@@ -0,0 +1,246 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import cv2
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_bounds
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+
+from backend.services.data_loader import raster_pixel_scale
+
+
+WEB_MERCATOR = "EPSG:3857"
+ORIGIN_SHIFT = 20037508.342789244  # half the Web Mercator world width (m)
+TILE_SIZE = 256
+
+# RGBA colour per class value (index = pixel value)
+THERMAL_PALETTE = np.array(
+    [
+        [0, 0, 0, 0],        # background
+        [255, 0, 0, 160],    # hot roof
+        [0, 102, 255, 160],  # cool roof
+    ],
+    dtype=np.uint8,
+)
+
+MASK_PALETTE = np.array(
+    [
+        [0, 0, 0, 0],
+        [255, 215, 0, 160],  # roof
+    ],
+    dtype=np.uint8,
+)
+
+
+def mercator_tile_bounds(z: int, x: int, y: int):
+    """
+    Web Mercator bounds of an XYZ tile.
+
+    Returns:
+        (minx, miny, maxx, maxy) in EPSG:3857 metres
+    """
+    size = 2 * ORIGIN_SHIFT / (2 ** z)
+
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+
+    return minx, maxy - size, minx + size, maxy
+
+
+def _choose_overview(src, src_bounds, tile_res: float):
+    """
+    Pick the coarsest overview that is still at least as detailed as
+    the tile, so zoomed-out tiles never touch full-resolution data.
+
+    Returns:
+        overview level (0 = first overview) or None for full resolution
+    """
+    native_res = (src_bounds[2] - src_bounds[0]) / src.width
+    level = None
+
+    for i, factor in enumerate(src.overviews(1)):
+        if native_res * factor <= tile_res:
+            level = i
+
+    return level
+
+
+def read_tile(
+    path,
+    z: int,
+    x: int,
+    y: int,
+    indexes,
+    resampling=Resampling.nearest,
+    tile_size: int = TILE_SIZE,
+):
+    """
+    Read one XYZ tile from a raster in any CRS.
+
+    Only the source window under the tile is warped, from the best
+    matching overview level when the raster has overviews.
+
+    Returns:
+        (data, alpha, dtype) with data (bands, tile, tile) and alpha
+        (tile, tile) uint8, or None if the tile misses the raster
+    """
+    bounds = mercator_tile_bounds(z, x, y)
+    tile_res = (bounds[2] - bounds[0]) / tile_size
+
+    with rasterio.open(path) as src:
+        src_bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds)
+        dtype = src.dtypes[0]
+
+        if (
+            bounds[0] >= src_bounds[2] or bounds[2] <= src_bounds[0]
+            or bounds[1] >= src_bounds[3] or bounds[3] <= src_bounds[1]
+        ):
+            return None
+
+        level = _choose_overview(src, src_bounds, tile_res)
+
+    open_kwargs = {} if level is None else {"overview_level": level}
+
+    with rasterio.open(path, **open_kwargs) as src:
+        with WarpedVRT(
+            src,
+            crs=WEB_MERCATOR,
+            transform=from_bounds(*bounds, tile_size, tile_size),
+            width=tile_size,
+            height=tile_size,
+            resampling=resampling,
+            add_alpha=True,
+        ) as vrt:
+            data = vrt.read(indexes)
+            alpha = vrt.read(vrt.count)
+
+    return data, alpha, dtype
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    ok, buf = cv2.imencode(".png", cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA))
+    if not ok:
+        raise RuntimeError("PNG encoding failed")
+
+    return buf.tobytes()
+
+
+def empty_tile(tile_size: int = TILE_SIZE) -> bytes:
+    return encode_png(np.zeros((tile_size, tile_size, 4), dtype=np.uint8))
+
+
+@lru_cache(maxsize=256)
+def _rgb_scale(path) -> float:
+    # Job inputs never change once uploaded; float inputs cost a sample
+    return raster_pixel_scale(path)
+
+
+def _rgb_to_uint8(data: np.ndarray, path) -> np.ndarray:
+    if data.dtype == np.uint8:
+        return data
+
+    data = np.clip(data * (255.0 / _rgb_scale(path)), 0, 255)
+    return data.astype(np.uint8)
+
+
+def render_rgb_tile(path, z: int, x: int, y: int) -> bytes:
+    """Render an RGB raster tile as RGBA PNG bytes."""
+    tile = read_tile(path, z, x, y, [1, 2, 3], Resampling.bilinear)
+    if tile is None:
+        return empty_tile()
+
+    data, alpha, _ = tile
+    data = _rgb_to_uint8(data, path)
+
+    rgba = np.dstack([data[0], data[1], data[2], alpha])
+    return encode_png(rgba)
+
+
+def render_class_tile(path, z: int, x: int, y: int, palette: np.ndarray) -> bytes:
+    """Render a single-band class raster tile through an RGBA palette."""
+    tile = read_tile(path, z, x, y, 1, Resampling.nearest)
+    if tile is None:
+        return empty_tile()
+
+    data, alpha, _ = tile
+
+    classes = np.minimum(data, len(palette) - 1).astype(np.intp)
+    rgba = palette[classes]
+    rgba[alpha == 0] = 0
+
+    return encode_png(rgba)
+
+
+def preview_shape(path, max_width: int):
+    """(height, width) of a whole-raster preview at most max_width wide."""
+    with rasterio.open(path) as src:
+        factor = max(1.0, src.width / max_width)
+        return max(1, round(src.height / factor)), max(1, round(src.width / factor))
+
+
+def read_preview(path, shape, indexes, resampling=Resampling.nearest):
+    """
+    Whole raster resampled to shape (height, width).
+
+    The decimated read is served by GDAL from the raster's overviews
+    (internal, or the .ovr sidecar built for job inputs), so a large
+    scene is not decoded at full resolution.
+    """
+    with rasterio.open(path) as src:
+        return src.read(
+            indexes,
+            out_shape=(len(indexes), *shape),
+            resampling=resampling,
+        )
+
+
+def render_rgb_preview(path, shape) -> bytes:
+    """Whole RGB raster at shape as opaque RGBA PNG bytes."""
+    data = _rgb_to_uint8(read_preview(path, shape, [1, 2, 3], Resampling.average), path)
+
+    alpha = np.full(shape, 255, dtype=np.uint8)
+    return encode_png(np.dstack([data[0], data[1], data[2], alpha]))
+
+
+def render_class_preview(path, shape, palette: np.ndarray) -> bytes:
+    """Whole class raster at shape through an RGBA palette."""
+    data = read_preview(path, shape, [1])[0]
+
+    classes = np.minimum(data, len(palette) - 1).astype(np.intp)
+    return encode_png(palette[classes])
+
+
+class TileCache:
+    """
+    Thread-safe LRU cache of rendered tiles, bounded by total bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._tiles = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._tiles.get(key)
+            if png is not None:
+                self._tiles.move_to_end(key)
+
+            return png
+
+    def put(self, key, png: bytes):
+        with self._lock:
+            if key in self._tiles:
+                return
+
+            self._tiles[key] = png
+            self._size += len(png)
+
+            while self._size > self.max_bytes and self._tiles:
+                _, evicted = self._tiles.popitem(last=False)
+                self._size -= len(evicted)
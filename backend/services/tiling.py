@@ -1,15 +1,23 @@
 import numpy as np
 from typing import Iterator, Tuple
 
+from backend.utils.metrics import timed
+
 
 def tile_image(
     image: np.ndarray,
     tile_size: int = 512,
     overlap: int = 0,
+    pad_edges: bool = False,
 ) -> Iterator[Tuple[np.ndarray, dict]]:
     """
     Tile image into patches while preserving spatial indices.
 
+    Partial tiles at the right and bottom edges are dropped, unless
+    pad_edges is set: they are then yielded zero-padded to tile_size
+    (a copy; full tiles stay views), with info height/width giving
+    the valid part. Images smaller than one tile yield one tile.
+
     Returns:
         tile: (tile_size, tile_size, C)
         info: dict with spatial metadata
@@ -17,19 +25,34 @@ def tile_image(
     h, w, c = image.shape
     stride = tile_size - overlap
 
-    for y in range(0, h - tile_size + 1, stride):
-        for x in range(0, w - tile_size + 1, stride):
+    if pad_edges:
+        ys = range(0, max(h - overlap, 1), stride)
+        xs = range(0, max(w - overlap, 1), stride)
+    else:
+        ys = range(0, h - tile_size + 1, stride)
+        xs = range(0, w - tile_size + 1, stride)
+
+    for y in ys:
+        for x in xs:
             tile = image[y:y + tile_size, x:x + tile_size, :]
+            th, tw = tile.shape[:2]
+
+            if (th, tw) != (tile_size, tile_size):
+                padded = np.zeros((tile_size, tile_size, c), dtype=image.dtype)
+                padded[:th, :tw] = tile
+                tile = padded
 
             info = {
                 "x_offset": x,
                 "y_offset": y,
-                "height": tile_size,
-                "width": tile_size,
+                "height": th,
+                "width": tw,
             }
 
             yield tile, info
 
+
+@timed()
 def stitch_tiles(
     tile_preds,
     tile_infos,
@@ -40,7 +63,8 @@ def stitch_tiles(
 
     Args:
         tile_preds: list of np.ndarray (H, W) or (H, W, 1)
-        tile_infos: list of dicts with x_offset, y_offset
+        tile_infos: list of dicts with x_offset, y_offset, height,
+            width (padding beyond height/width is dropped)
         full_shape: (H, W)
 
     Returns:
@@ -57,7 +81,7 @@ def stitch_tiles(
         if pred.ndim == 3:
             pred = pred.squeeze(-1)
 
-        h, w = pred.shape
-        full_mask[y:y + h, x:x + w] = pred
+        h, w = info.get("height", pred.shape[0]), info.get("width", pred.shape[1])
+        full_mask[y:y + h, x:x + w] = pred[:h, :w]
 
     return full_mask
\ No newline at end of file
@@ -0,0 +1,203 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Read here rather than from backend.app.config, so services, training
+# scripts and benchmarks can time code without importing the app
+load_dotenv()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+
+PREFIX = "rooflytics"
+
+_NOOP = nullcontext()
+_local = threading.local()
+
+
+def process_peak_rss_bytes():
+    """
+    Peak resident set size of the whole process since it started, or
+    None if unavailable.
+
+    Not per job: a job's report carries the process high-water mark at
+    the time it finished, which earlier or concurrent jobs may have set.
+    """
+    if resource is None:
+        return None
+
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MetricsCollector:
+    """
+    Timers (count / total / max seconds) and counters.
+
+    One process-wide instance feeds /metrics; a short-lived instance is
+    attached to a thread while a job runs to report that job alone.
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stat = self.timers.setdefault(name, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "timers": {
+                    name: {
+                        "count": count,
+                        "total_s": round(total, 4),
+                        "max_s": round(peak, 4),
+                    }
+                    for name, (count, total, peak) in self.timers.items()
+                },
+                "counters": dict(self.counters),
+                "process_peak_rss_bytes": process_peak_rss_bytes(),
+            }
+
+
+registry = MetricsCollector()
+
+
+def _collectors():
+    job = getattr(_local, "job", None)
+    return (registry, job) if job is not None else (registry,)
+
+
+def count(name: str, value: float = 1):
+    """Increment a counter (e.g. tiles, roofs, pixels)."""
+    if not METRICS_ENABLED:
+        return
+
+    for c in _collectors():
+        c.inc(name, value)
+
+
+@contextmanager
+def _timer(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for c in _collectors():
+            c.observe(name, elapsed)
+
+
+def timer(name: str):
+    """Context manager timing a block; a shared no-op when disabled."""
+    if not METRICS_ENABLED:
+        return _NOOP
+
+    return _timer(name)
+
+
+def timed(name: str = None):
+    """
+    Decorator timing every call of a function.
+
+    When metrics are disabled the function is returned unwrapped.
+    """
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _timer(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def collect_job_metrics():
+    """
+    Attach a fresh collector to this thread for the duration of a job.
+
+    Yields:
+        MetricsCollector holding only this job's timings and counters
+    """
+    job = MetricsCollector()
+    previous = getattr(_local, "job", None)
+    _local.job = job
+
+    try:
+        yield job
+    finally:
+        _local.job = previous
+
+
+def bind_job_metrics(fn):
+    """
+    Wrap fn so that, when run on another thread (e.g. a pool worker),
+    it still reports into the calling thread's job collector.
+    """
+    job = getattr(_local, "job", None)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, "job", None)
+        _local.job = job
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.job = previous
+
+    return wrapper
+
+
+def render_prometheus() -> str:
+    """Process-wide metrics in the Prometheus text exposition format."""
+    snapshot = registry.as_dict()
+    lines = []
+
+    lines.append(f"# HELP {PREFIX}_timer_seconds Time spent in instrumented code")
+    lines.append(f"# TYPE {PREFIX}_timer_seconds summary")
+    for name, stat in sorted(snapshot["timers"].items()):
+        lines.append(f'{PREFIX}_timer_seconds_count{{name="{name}"}} {stat["count"]}')
+        lines.append(f'{PREFIX}_timer_seconds_sum{{name="{name}"}} {stat["total_s"]}')
+
+    lines.append(f"# HELP {PREFIX}_timer_max_seconds Slowest single call")
+    lines.append(f"# TYPE {PREFIX}_timer_max_seconds gauge")
+    for name, stat in sorted(snapshot["timers"].items()):
+        lines.append(f'{PREFIX}_timer_max_seconds{{name="{name}"}} {stat["max_s"]}')
+
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+        lines.append(f"{PREFIX}_{name}_total {value}")
+
+    rss = snapshot["process_peak_rss_bytes"]
+    if rss is not None:
+        lines.append(f"# HELP {PREFIX}_process_peak_rss_bytes Peak resident memory of the process")
+        lines.append(f"# TYPE {PREFIX}_process_peak_rss_bytes gauge")
+        lines.append(f"{PREFIX}_process_peak_rss_bytes {rss}")
+
+    return "\n".join(lines) + "\n"
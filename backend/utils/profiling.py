@@ -0,0 +1,145 @@
+import cProfile
+import io
+import pstats
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+_local = threading.local()
+
+
+class ProfileReport:
+    """
+    Summary of one profiled job: artifact files and top-N hotspots.
+    """
+
+    def __init__(self, output_dir: Path, top_n: int):
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.artifacts = []
+        self.hotspots = []
+        self.torch_ops = []
+        self.warnings = []
+
+    def as_dict(self):
+        return {
+            "artifacts": self.artifacts,
+            "hotspots": self.hotspots,
+            "torch_ops": self.torch_ops,
+            "warnings": self.warnings,
+        }
+
+
+def _hotspots(stats: pstats.Stats, top_n: int):
+    rows = sorted(
+        stats.stats.items(),
+        key=lambda item: item[1][2],  # total time inside the function
+        reverse=True,
+    )
+
+    return [
+        {
+            "function": f"{Path(filename).name}:{line}({name})",
+            "calls": nc,
+            "self_s": round(tt, 4),
+            "cumulative_s": round(ct, 4),
+        }
+        for (filename, line, name), (_, nc, tt, ct, _) in rows[:top_n]
+    ]
+
+
+@contextmanager
+def profile_job(output_dir, top_n: int = 25):
+    """
+    Run the enclosed block under cProfile (this thread only).
+
+    Writes profile.pstats (load with pstats / snakeviz) and
+    profile_top.txt into output_dir. Inference code can add a torch
+    operator profile to the same report through torch_profile().
+
+    Yields:
+        ProfileReport, filled in when the block exits
+    """
+    report = ProfileReport(output_dir, top_n)
+    profiler = cProfile.Profile()
+
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler already owns the interpreter (Python 3.12+)
+        report.warnings.append("cProfile unavailable: profiler busy")
+        profiler = None
+
+    _local.report = report
+
+    try:
+        yield report
+    finally:
+        _local.report = None
+
+        if profiler is not None:
+            profiler.disable()
+
+            stats_path = report.output_dir / "profile.pstats"
+            profiler.dump_stats(stats_path)
+
+            text = io.StringIO()
+            stats = pstats.Stats(profiler, stream=text)
+            stats.sort_stats("tottime").print_stats(top_n)
+
+            text_path = report.output_dir / "profile_top.txt"
+            text_path.write_text(text.getvalue())
+
+            report.artifacts += [stats_path.name, text_path.name]
+            report.hotspots = _hotspots(stats, top_n)
+
+
+@contextmanager
+def torch_profile(name: str = "inference"):
+    """
+    Record torch operator timings for a block when the current thread
+    is inside profile_job(); otherwise a no-op.
+
+    Writes torch_<name>_trace.json (chrome://tracing / Perfetto) and
+    torch_<name>_ops.txt next to the cProfile output.
+    """
+    report = getattr(_local, "report", None)
+
+    if report is None:
+        yield
+        return
+
+    import torch
+    from torch.profiler import profile, ProfilerActivity
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+
+    with profile(activities=activities, record_shapes=True) as prof:
+        yield
+
+    trace_path = report.output_dir / f"torch_{name}_trace.json"
+    prof.export_chrome_trace(str(trace_path))
+
+    averages = prof.key_averages()
+
+    ops_path = report.output_dir / f"torch_{name}_ops.txt"
+    ops_path.write_text(
+        averages.table(sort_by="self_cpu_time_total", row_limit=report.top_n)
+    )
+
+    report.artifacts += [trace_path.name, ops_path.name]
+    report.torch_ops = [
+        {
+            "op": e.key,
+            "calls": e.count,
+            "self_cpu_ms": round(e.self_cpu_time_total / 1000, 3),
+            "cpu_total_ms": round(e.cpu_time_total / 1000, 3),
+        }
+        for e in sorted(
+            averages,
+            key=lambda e: e.self_cpu_time_total,
+            reverse=True,
+        )[:report.top_n]
+    ]
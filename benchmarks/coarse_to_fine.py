@@ -0,0 +1,219 @@
+"""
+Tiles skipped vs recall lost by coarse-to-fine inference.
+
+Runs the exhaustive path once on a reference scene, then replays the
+coarse-to-fine tile selection for every factor/threshold pair. Tiles
+do not overlap, so the coarse-to-fine mask is exactly the exhaustive
+mask with the skipped tiles cleared and the sweep costs one coarse
+pass per factor.
+
+    python -m benchmarks.coarse_to_fine --scene data/rural.tif --checkpoint efficientnet_unet.pth
+    python -m benchmarks.coarse_to_fine --size 4096 --density sparse --model tiny --checkpoint ""
+
+For each factor the highest threshold keeping --min-recall of the
+exhaustive roofs is reported (the COARSE_THRESHOLD to deploy) and is
+checked with a real coarse-to-fine run. Results go to
+benchmarks/results/coarse-<timestamp>.json.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.app.config import DEFAULT_BACKBONE, MODEL_CHECKPOINT
+from backend.services.data_loader import (
+    decimation_factor,
+    load_geotiff,
+    raster_pixel_scale,
+)
+from backend.services.postprocess import clean_roof_mask
+from backend.services.segmentation import (
+    INFERENCE_TILE,
+    RoofSegmentationService,
+    tile_likelihood,
+)
+from backend.services.tiling import tile_image
+from benchmarks.run_benchmarks import RESULTS_DIR, environment
+from benchmarks.synthetic import DENSITIES, write_scene
+
+DEFAULT_THRESHOLDS = [0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]
+
+
+def roof_recall(reference: np.ndarray, mask: np.ndarray, min_area: int = 150):
+    """
+    Fraction of reference roofs that keep at least half their pixels
+    in mask.
+    """
+    cleaned = clean_roof_mask(reference, min_area=min_area)
+    num, labels = cv2.connectedComponents(cleaned, connectivity=8)
+
+    if num <= 1:
+        return 1.0
+
+    total = np.bincount(labels.ravel(), minlength=num)[1:]
+    kept = np.bincount(labels[mask > 0].ravel(), minlength=num)[1:]
+
+    return float(np.mean(kept * 2 >= total))
+
+
+def sweep(service, image, scale, factors, thresholds):
+    infos = [
+        info for _, info in tile_image(image, tile_size=INFERENCE_TILE, pad_edges=True)
+    ]
+
+    start = time.perf_counter()
+    exhaustive = service.predict(image, scale=scale)
+    exhaustive_s = time.perf_counter() - start
+
+    reference_pixels = int(exhaustive.sum())
+    rows = []
+
+    for factor in factors:
+        start = time.perf_counter()
+        likelihood = service.roof_likelihood(image, factor, scale)
+        coarse_s = time.perf_counter() - start
+
+        scores = [tile_likelihood(likelihood, info, factor) for info in infos]
+
+        for threshold in thresholds:
+            mask = exhaustive.copy()
+            skipped = 0
+
+            for info, score in zip(infos, scores):
+                if score < threshold:
+                    y, x = info["y_offset"], info["x_offset"]
+                    mask[y:y + info["height"], x:x + info["width"]] = 0
+                    skipped += 1
+
+            run = len(infos) - skipped
+            kept_pixels = int(mask.sum())
+
+            rows.append({
+                "factor": factor,
+                "threshold": threshold,
+                "tiles": len(infos),
+                "tiles_skipped": skipped,
+                "skipped_fraction": skipped / max(1, len(infos)),
+                "pixel_recall": kept_pixels / reference_pixels if reference_pixels else 1.0,
+                "roof_recall": roof_recall(exhaustive, mask),
+                "coarse_s": coarse_s,
+                "estimated_s": coarse_s + exhaustive_s * run / max(1, len(infos)),
+            })
+
+    return exhaustive_s, rows
+
+
+def recommend(rows, min_recall: float):
+    """
+    Per factor, the highest threshold whose roof recall is at least
+    min_recall.
+    """
+    best = {}
+
+    for row in rows:
+        if row["roof_recall"] < min_recall:
+            continue
+
+        current = best.get(row["factor"])
+        if current is None or row["threshold"] > current["threshold"]:
+            best[row["factor"]] = row
+
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scene", type=Path, default=None, help="reference GeoTIFF (default: synthetic)")
+    parser.add_argument("--size", type=int, default=4096, help="synthetic scene size")
+    parser.add_argument("--density", choices=sorted(DENSITIES), default="sparse")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--checkpoint", default=MODEL_CHECKPOINT or None)
+    parser.add_argument("--model", default=DEFAULT_BACKBONE)
+    parser.add_argument("--factors", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--min-recall", type=float, default=0.99, help="roof recall to keep")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    service = RoofSegmentationService(
+        checkpoint_path=args.checkpoint or None,
+        model_name=args.model,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scene = args.scene
+        if scene is None:
+            scene, _ = write_scene(
+                Path(tmp),
+                "reference",
+                args.size,
+                args.size,
+                density=DENSITIES[args.density],
+                seed=args.seed,
+            )
+
+        decimation = decimation_factor(scene, service.target_gsd)
+        image, _ = load_geotiff(scene, decimation=decimation)
+        scale = raster_pixel_scale(scene)
+
+    exhaustive_s, rows = sweep(service, image, scale, args.factors, args.thresholds)
+
+    print(f"exhaustive: {exhaustive_s:.2f} s")
+    print(f"{'factor':>6} {'thresh':>6} {'skipped':>12} {'px recall':>9} {'roof recall':>11} {'est. s':>7}")
+    for r in rows:
+        print(
+            f"{r['factor']:>6} {r['threshold']:>6.2f} "
+            f"{r['tiles_skipped']:>5}/{r['tiles']:<6} "
+            f"{r['pixel_recall']:>9.3f} {r['roof_recall']:>11.3f} {r['estimated_s']:>7.2f}"
+        )
+
+    recommended = recommend(rows, args.min_recall)
+
+    for factor, row in recommended.items():
+        service.coarse_factor = factor
+        service.coarse_threshold = row["threshold"]
+
+        start = time.perf_counter()
+        service.predict(image, scale=scale)
+        row["measured_s"] = time.perf_counter() - start
+
+        print(
+            f"factor {factor}: COARSE_THRESHOLD={row['threshold']} skips "
+            f"{row['tiles_skipped']}/{row['tiles']} tiles, roof recall "
+            f"{row['roof_recall']:.3f}, {row['measured_s']:.2f} s vs {exhaustive_s:.2f} s"
+        )
+
+    report = {
+        "environment": environment(),
+        "settings": {
+            "scene": str(args.scene) if args.scene else f"synthetic {args.size} {args.density}",
+            "model": args.model,
+            "checkpoint": args.checkpoint,
+            "decimation": decimation,
+            "min_recall": args.min_recall,
+        },
+        "exhaustive_s": exhaustive_s,
+        "results": rows,
+        "recommended": {str(f): r for f, r in recommended.items()},
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or RESULTS_DIR / f"coarse-{stamp}.json"
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
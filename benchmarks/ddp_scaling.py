@@ -0,0 +1,105 @@
+"""
+Scaling efficiency of DistributedDataParallel training on one host.
+
+Runs training/ddp_smoke.py under torchrun for each process count and
+compares global throughput with the single-process run:
+
+    python -m benchmarks.ddp_scaling --procs 1 2 4 8
+    python -m benchmarks.ddp_scaling --procs 1 2 --tiles 128 --tile-size 256
+
+Efficiency is samples/s with N processes divided by N times the
+samples/s with one; the node's cores are split evenly between the
+processes (see training/distributed.py). Results go to
+benchmarks/results/ddp-<timestamp>.json.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.run_benchmarks import RESULTS_DIR, environment
+
+
+def run(procs: int, args, workdir: Path):
+    cmd = [
+        sys.executable, "-m", "torch.distributed.run",
+        "--standalone", "--nproc-per-node", str(procs),
+        "-m", "training.ddp_smoke",
+        "--tiles", str(args.tiles),
+        "--tile-size", str(args.tile_size),
+        "--batch-size", str(args.batch_size),
+        "--epochs", str(args.epochs),
+        "--model", args.model,
+        "--output", str(workdir / f"ddp-{procs}.pth"),
+    ]
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.getenv("PYTHONPATH")])))
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+
+    # Rank 0 prints one JSON line; the rest is tqdm / torchrun noise
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+
+    raise RuntimeError(f"no result from {procs} processes:\n{out.stderr}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--tiles", type=int, default=64, help="tiles across all ranks")
+    parser.add_argument("--tile-size", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=4, help="per rank")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--model", default="student")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    procs = sorted(set([1] + args.procs))
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in procs:
+            rows.append(run(n, args, Path(tmp)))
+
+    base = rows[0]["samples_per_s"]
+
+    print(f"{'procs':>5} {'threads':>7} {'samples/s':>10} {'speedup':>8} {'efficiency':>10} {'in sync':>7}")
+    for r in rows:
+        r["speedup"] = r["samples_per_s"] / base
+        r["efficiency"] = r["speedup"] / r["world_size"]
+        print(
+            f"{r['world_size']:>5} {r['threads_per_rank']:>7} {r['samples_per_s']:>10.1f} "
+            f"{r['speedup']:>8.2f} {r['efficiency']:>10.2f} {str(r['weights_in_sync']):>7}"
+        )
+
+    report = {
+        "environment": dict(environment(), cpu_count=os.cpu_count()),
+        "settings": {
+            "tiles": args.tiles,
+            "tile_size": args.tile_size,
+            "batch_size": args.batch_size,
+            "epochs": args.epochs,
+            "model": args.model,
+        },
+        "results": rows,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or RESULTS_DIR / f"ddp-{stamp}.json"
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
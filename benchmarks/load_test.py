@@ -0,0 +1,438 @@
+"""
+End-to-end load test of the upload -> process -> status cycle.
+
+By default a backend is launched locally (uvicorn, in a throwaway
+working directory with its own database) serving a tiny randomly
+initialised model, so no checkpoint is needed:
+
+    python -m benchmarks.load_test --jobs 20 --rate 1 --concurrency 8
+    python -m benchmarks.load_test --jobs 50 --job-workers 2 --size 2048
+    python -m benchmarks.load_test --url http://10.0.0.5:8000 --jobs 20
+
+Jobs arrive at --rate per second (0 = all at once), with at most
+--concurrency in flight. The report gives throughput, p50/p95/p99
+latency per endpoint and per job, mean stage timings and the server's
+peak RSS, and is written to benchmarks/results/load-<timestamp>.json.
+With --baseline, a drop in throughput or a rise in p95 job latency
+beyond --tolerance exits with code 1.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.run_benchmarks import RESULTS_DIR, environment
+from benchmarks.synthetic import DENSITIES, write_scene
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+DONE = ("completed", "failed")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def launch_backend(workdir: Path, job_workers: int, model: str, startup_timeout: float = 120):
+    """
+    Run the API with uvicorn in workdir (fresh db/ and results/).
+
+    Yields:
+        base URL of the server
+    """
+    (workdir / "db").mkdir(exist_ok=True)
+    shutil.copy(REPO_ROOT / "db" / "schema.sql", workdir / "db" / "schema.sql")
+
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(
+            p for p in (str(REPO_ROOT), env.get("PYTHONPATH")) if p
+        ),
+        "MODEL_CHECKPOINT": "",
+        "DEFAULT_BACKBONE": model,
+        "JOB_WORKERS": str(job_workers),
+        "JOB_QUEUE_LIMIT": "0",
+        "METRICS_ENABLED": "1",
+    })
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    log_path = workdir / "server.log"
+
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "backend.app.main:app",
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--log-level", "warning",
+            ],
+            cwd=workdir,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    try:
+        deadline = time.monotonic() + startup_timeout
+
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(
+                    f"Backend exited during startup:\n{log_path.read_text()[-2000:]}"
+                )
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Backend did not become healthy in time")
+            time.sleep(0.25)
+
+        yield url
+
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+class Recorder:
+    """Thread-safe latency samples per endpoint."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def request(self, endpoint: str, send, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = send(*args, **kwargs)
+        except httpx.HTTPError:
+            with self._lock:
+                self.errors[endpoint] += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.samples[endpoint].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[endpoint] += 1
+
+        return response
+
+
+def run_job(client, recorder, path: Path, poll_interval: float, timeout: float):
+    """
+    Upload a scene, queue it and poll until it finishes.
+
+    Returns:
+        dict with status, latency_s and stage_timings
+    """
+    start = time.perf_counter()
+    outcome = {"status": "error", "latency_s": None, "stage_timings": {}}
+
+    try:
+        with open(path, "rb") as f:
+            r = recorder.request(
+                "upload",
+                client.post,
+                "/upload/",
+                files={"file": (path.name, f, "image/tiff")},
+            )
+        if r.status_code != 200:
+            return outcome
+
+        job_id = r.json()["job_id"]
+
+        r = recorder.request("process", client.post, f"/process/{job_id}")
+        if r.status_code == 503:
+            outcome["status"] = "rejected"
+            return outcome
+        if r.status_code != 202:
+            return outcome
+
+        while time.perf_counter() - start < timeout:
+            r = recorder.request("status", client.get, f"/status/{job_id}")
+            job = r.json()
+            if job["status"] in DONE:
+                outcome.update({
+                    "status": job["status"],
+                    "latency_s": time.perf_counter() - start,
+                    "stage_timings": job["stage_timings"],
+                })
+                return outcome
+            time.sleep(poll_interval)
+
+        outcome["status"] = "timeout"
+    except httpx.HTTPError:
+        pass
+
+    return outcome
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(np.mean(samples)) * 1000, 2),
+        "p50_ms": round(float(p50) * 1000, 2),
+        "p95_ms": round(float(p95) * 1000, 2),
+        "p99_ms": round(float(p99) * 1000, 2),
+        "max_ms": round(float(max(samples)) * 1000, 2),
+    }
+
+
+def peak_rss(client):
+    """Server peak RSS in bytes from /metrics, if exported."""
+    try:
+        text = client.get("/metrics").text
+    except httpx.HTTPError:
+        return None
+
+    for line in text.splitlines():
+        if line.startswith("rooflytics_process_peak_rss_bytes "):
+            return int(float(line.split()[1]))
+
+    return None
+
+
+def drive(url, inputs, jobs: int, rate: float, concurrency: int, poll_interval: float, timeout: float):
+    recorder = Recorder()
+    outcomes = []
+
+    limits = httpx.Limits(max_connections=concurrency * 2)
+
+    with httpx.Client(base_url=url, timeout=60, limits=limits) as client:
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = []
+
+            for i in range(jobs):
+                if rate > 0:
+                    # Open-loop arrivals at a fixed rate
+                    delay = start + i / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                futures.append(pool.submit(
+                    run_job,
+                    client,
+                    recorder,
+                    inputs[i % len(inputs)],
+                    poll_interval,
+                    timeout,
+                ))
+
+            outcomes = [f.result() for f in futures]
+
+        wall = time.perf_counter() - start
+        rss = peak_rss(client)
+
+    return recorder, outcomes, wall, rss
+
+
+def summarize(recorder, outcomes, wall: float, rss):
+    by_status = defaultdict(int)
+    for o in outcomes:
+        by_status[o["status"]] += 1
+
+    completed = [o for o in outcomes if o["status"] == "completed"]
+
+    stages = defaultdict(list)
+    for o in completed:
+        for name, seconds in o["stage_timings"].items():
+            stages[name].append(seconds)
+
+    return {
+        "wall_s": round(wall, 3),
+        "jobs": {
+            "submitted": len(outcomes),
+            **by_status,
+            "throughput_jobs_per_s": round(len(completed) / wall, 4),
+            "latency": percentiles([o["latency_s"] for o in completed]),
+        },
+        "endpoints": {
+            name: {**percentiles(samples), "errors": recorder.errors[name]}
+            for name, samples in sorted(recorder.samples.items())
+        },
+        "stages_mean_s": {
+            name: round(float(np.mean(values)), 4)
+            for name, values in stages.items()
+        },
+        "server_peak_rss_bytes": rss,
+    }
+
+
+def compare(summary, baseline, tolerance: float):
+    """
+    Returns:
+        list of human-readable regressions against a baseline report
+    """
+    regressions = []
+
+    before = baseline["summary"]["jobs"]
+    after = summary["jobs"]
+
+    if after["throughput_jobs_per_s"] < before["throughput_jobs_per_s"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {before['throughput_jobs_per_s']} -> "
+            f"{after['throughput_jobs_per_s']} jobs/s"
+        )
+
+    if before["latency"] and after["latency"]:
+        if after["latency"]["p95_ms"] > before["latency"]["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"p95 job latency {before['latency']['p95_ms']} -> "
+                f"{after['latency']['p95_ms']} ms"
+            )
+
+    return regressions
+
+
+def print_summary(summary):
+    jobs = summary["jobs"]
+    print(
+        f"\n{jobs['submitted']} jobs in {summary['wall_s']} s: "
+        f"{jobs.get('completed', 0)} completed, {jobs.get('failed', 0)} failed, "
+        f"{jobs.get('rejected', 0)} rejected, "
+        f"{jobs['throughput_jobs_per_s']} jobs/s"
+    )
+
+    rows = dict(summary["endpoints"])
+    if jobs["latency"]:
+        rows["job (end to end)"] = jobs["latency"]
+
+    print(f"\n{'':<18}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'errors':>8}")
+    for name, s in rows.items():
+        print(
+            f"{name:<18}{s['count']:>7}{s['p50_ms']:>11}{s['p95_ms']:>11}"
+            f"{s['p99_ms']:>11}{s.get('errors', ''):>8}"
+        )
+
+    if summary["stages_mean_s"]:
+        print("\nMean stage time (s): " + ", ".join(
+            f"{k} {v}" for k, v in summary["stages_mean_s"].items()
+        ))
+
+    if summary["server_peak_rss_bytes"]:
+        print(f"Server peak RSS: {summary['server_peak_rss_bytes'] / 1024 ** 2:.0f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=None, help="target a running server instead")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=1.0, help="job arrivals per second")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--job-workers", type=int, default=1)
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--size", type=int, default=1024, help="scene side in pixels")
+    parser.add_argument("--density", choices=sorted(DENSITIES), default="suburban")
+    parser.add_argument("--scenes", type=int, default=3, help="distinct input files")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=600, help="per job, seconds")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        inputs_dir = workdir / "inputs"
+        inputs_dir.mkdir()
+
+        inputs = [
+            write_scene(
+                inputs_dir,
+                f"scene_{i}",
+                args.size,
+                args.size,
+                density=DENSITIES[args.density],
+                seed=i,
+            )[0]
+            for i in range(args.scenes)
+        ]
+
+        server = (
+            launch_backend(workdir, args.job_workers, args.model)
+            if args.url is None
+            else nullcontext(args.url)
+        )
+
+        with server as url:
+            print(f"Driving {args.jobs} jobs against {url}")
+            recorder, outcomes, wall, rss = drive(
+                url,
+                inputs,
+                args.jobs,
+                args.rate,
+                args.concurrency,
+                args.poll_interval,
+                args.timeout,
+            )
+
+    summary = summarize(recorder, outcomes, wall, rss)
+    print_summary(summary)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+
+    report = {
+        "environment": environment(),
+        "settings": {
+            k: str(v) if isinstance(v, Path) else v
+            for k, v in vars(args).items()
+        },
+        "summary": summary,
+        "regressions": regressions,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or RESULTS_DIR / f"load-{stamp}.json"
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks for the CPU stages of the analysis pipeline.
+
+Scenes are synthetic GeoTIFFs (see benchmarks/synthetic.py), so runs
+are reproducible on any machine without the Christchurch data.
+
+    python -m benchmarks.run_benchmarks --sizes 1024 2048 --repeat 5
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/baseline.json
+
+Each run writes benchmarks/results/<timestamp>.json. With --baseline,
+any case whose median is more than --tolerance slower than the
+baseline is reported and the exit code is 1.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from backend.app import config
+from backend.services.clustering import (
+    cluster_roofs_by_reflectance,
+    create_thermal_cluster_mask,
+    extract_roof_reflectance,
+)
+from backend.services.data_loader import load_geotiff
+from backend.services.energy_model import compute_roof_areas, estimate_cooling_savings
+from backend.services.postprocess import clean_roof_mask
+from backend.services.preprocessing import normalize_tile, pixel_scale
+from backend.services.reflectance import compute_reflectance_map
+from backend.services.tiling import stitch_tiles, tile_image
+from benchmarks.synthetic import DEFAULT_GSD, DENSITIES, noisy_mask, write_scene
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BASELINE_PATH = RESULTS_DIR / "baseline.json"
+
+TILE_SIZE = 512
+
+ENERGY_CONSTANTS = {
+    "SOLAR_IRRADIANCE": config.SOLAR_IRRADIANCE,
+    "SUNLIGHT_HOURS": config.SUNLIGHT_HOURS,
+    "COOLING_EFFICIENCY": config.COOLING_EFFICIENCY,
+    "ELECTRICITY_PRICE": config.ELECTRICITY_PRICE,
+    "EMISSION_FACTOR": config.EMISSION_FACTOR,
+    "USAGE_FACTOR": 0.025,
+    "MAX_KWH_PER_ROOF": 5000,
+}
+
+
+def prepare_scene(directory: Path, size: int, density: str, seed: int):
+    """
+    Write a synthetic scene to disk, read it back the way the API does
+    and precompute every intermediate the cases need as input.
+    """
+    image_path, mask_path = write_scene(
+        directory,
+        f"scene_{size}_{density}",
+        size,
+        size,
+        density=DENSITIES[density],
+        seed=seed,
+    )
+
+    image, meta = load_geotiff(image_path)
+    mask, _ = load_geotiff(mask_path, is_mask=True)
+
+    scale = pixel_scale(meta["dtype"])
+    raw_mask = noisy_mask(mask, seed=seed)
+    cleaned = clean_roof_mask(raw_mask, min_area=150)
+    reflectance = compute_reflectance_map(image, cleaned, scale=scale)
+    roof_stats = cluster_roofs_by_reflectance(
+        extract_roof_reflectance(cleaned, reflectance)
+    )
+
+    tiles = list(tile_image(image, tile_size=TILE_SIZE))
+
+    return {
+        "image": image,
+        "scale": scale,
+        "raw_mask": raw_mask,
+        "cleaned": cleaned,
+        "reflectance": reflectance,
+        "roof_stats": roof_stats,
+        "roof_areas": compute_roof_areas(cleaned, DEFAULT_GSD ** 2),
+        "tiles": [t for t, _ in tiles],
+        "tile_infos": [info for _, info in tiles],
+        "tile_preds": [t[..., 0] > 128 for t, _ in tiles],
+    }
+
+
+def _normalize_all(s):
+    out = np.empty((TILE_SIZE, TILE_SIZE, 3), dtype=np.float32)
+    for tile in s["tiles"]:
+        normalize_tile(tile, "imagenet", scale=s["scale"], out=out)
+
+
+# name -> callable(scene) running the stage once on prepared inputs
+CASES = {
+    "tile_image": lambda s: list(tile_image(s["image"], tile_size=TILE_SIZE)),
+    "stitch_tiles": lambda s: stitch_tiles(
+        s["tile_preds"], s["tile_infos"], s["image"].shape[:2]
+    ),
+    "normalize_tile": _normalize_all,
+    "clean_roof_mask": lambda s: clean_roof_mask(s["raw_mask"], min_area=150),
+    "extract_roof_reflectance": lambda s: extract_roof_reflectance(
+        s["cleaned"], s["reflectance"]
+    ),
+    "cluster_roofs_by_reflectance": lambda s: cluster_roofs_by_reflectance(
+        s["roof_stats"]
+    ),
+    "create_thermal_cluster_mask": lambda s: create_thermal_cluster_mask(
+        s["cleaned"], s["roof_stats"]
+    ),
+    "estimate_cooling_savings": lambda s: estimate_cooling_savings(
+        s["roof_stats"], s["roof_areas"], ENERGY_CONSTANTS
+    ),
+}
+
+
+def measure(fn, repeat: int, warmup: int = 1):
+    """
+    Time fn() repeat times after warmup calls.
+
+    Returns:
+        dict with min/median/mean/max seconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples),
+    }
+
+
+def run(sizes, densities, cases, repeat: int, seed: int = 0):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for density in densities:
+                scene = prepare_scene(Path(tmp), size, density, seed)
+                num_roofs = len(scene["roof_stats"])
+
+                for name in cases:
+                    key = f"{name}/{size}/{density}"
+                    stats = measure(lambda: CASES[name](scene), repeat)
+                    stats.update({
+                        "case": name,
+                        "size": size,
+                        "density": density,
+                        "num_roofs": num_roofs,
+                    })
+                    results[key] = stats
+
+                    print(
+                        f"{key:<48} median {stats['median_s'] * 1000:9.2f} ms"
+                        f"  min {stats['min_s'] * 1000:9.2f} ms"
+                    )
+
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Compare medians against a baseline run.
+
+    Returns:
+        list of (key, baseline_s, current_s, ratio) for regressions
+    """
+    regressions = []
+
+    for key, stats in results.items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            continue
+
+        ratio = stats["median_s"] / reference["median_s"]
+        stats["baseline_median_s"] = reference["median_s"]
+        stats["ratio"] = round(ratio, 3)
+
+        if ratio > 1 + tolerance:
+            regressions.append((key, reference["median_s"], stats["median_s"], ratio))
+
+    return regressions
+
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 2048, 4096])
+    parser.add_argument(
+        "--densities",
+        nargs="+",
+        choices=sorted(DENSITIES),
+        default=["sparse", "dense"],
+    )
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown of the median before flagging (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"also write the run to {BASELINE_PATH}",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.densities, args.cases, args.repeat, args.seed)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    report = {
+        "environment": environment(),
+        "settings": {
+            "sizes": args.sizes,
+            "densities": args.densities,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "baseline": str(args.baseline) if args.baseline else None,
+            "tolerance": args.tolerance,
+        },
+        "results": results,
+        "regressions": [key for key, *_ in regressions],
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or RESULTS_DIR / f"{stamp}.json"
+
+    for path in [output] + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for key, before, after, ratio in regressions:
+            print(f"  {key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import numpy as np
+import cv2
+import rasterio
+from rasterio.transform import from_origin
+
+# Christchurch-like defaults: NZTM2000 at 7.5 cm ground sample distance
+DEFAULT_CRS = "EPSG:2193"
+DEFAULT_GSD = 0.075
+DEFAULT_ORIGIN = (1570000.0, 5180000.0)
+
+# Roof densities as the fraction of the scene covered by roofs
+DENSITIES = {
+    "sparse": 0.08,
+    "suburban": 0.2,
+    "dense": 0.35,
+}
+
+
+def make_scene(
+    height: int,
+    width: int,
+    density: float = 0.2,
+    roof_size=(20, 90),
+    dtype=np.uint8,
+    seed: int = 0,
+):
+    """
+    Generate a synthetic aerial scene with rectangular roofs.
+
+    Roofs are rotated rectangles drawn as either dark (hot) or bright
+    (cool) material on a textured ground, so reflectance clustering
+    has two real populations to separate.
+
+    Args:
+        height, width: scene size in pixels
+        density: target fraction of pixels covered by roofs
+        roof_size: (min, max) roof side length in pixels
+        dtype: np.uint8 or np.uint16 output pixels
+        seed: random seed
+
+    Returns:
+        image: np.ndarray (H, W, 3) of dtype
+        mask: np.ndarray (H, W), uint8 (0 or 1)
+    """
+    rng = np.random.default_rng(seed)
+
+    image = rng.normal(90, 18, (height, width, 3))
+    image[..., 1] += 15  # slightly green ground
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+
+    mean_side = sum(roof_size) / 2
+    num_roofs = int(density * height * width / mean_side ** 2)
+
+    for _ in range(num_roofs):
+        w, h = rng.uniform(*roof_size, size=2)
+        cx = rng.uniform(0, width)
+        cy = rng.uniform(0, height)
+        angle = rng.uniform(0, 90)
+
+        corners = cv2.boxPoints(((cx, cy), (w, h), angle)).astype(np.int32)
+
+        cv2.fillPoly(mask, [corners], 1)
+
+        shade = rng.normal(55, 10) if rng.random() < 0.5 else rng.normal(200, 15)
+        cv2.fillPoly(image, [corners], (shade, shade, shade))
+
+    image += rng.normal(0, 6, image.shape)
+    image = np.clip(image, 0, 255)
+
+    if np.dtype(dtype) == np.uint16:
+        image = image * 257
+
+    return image.astype(dtype), mask
+
+
+def noisy_mask(mask: np.ndarray, flip: float = 0.01, seed: int = 0):
+    """
+    Simulate a raw model prediction: flip a fraction of the pixels so
+    clean_roof_mask has speckle and holes to remove.
+    """
+    rng = np.random.default_rng(seed)
+
+    noise = rng.random(mask.shape) < flip
+    return np.where(noise, 1 - mask, mask).astype(np.uint8)
+
+
+def scene_meta(
+    height: int,
+    width: int,
+    count: int = 3,
+    dtype: str = "uint8",
+    crs: str = DEFAULT_CRS,
+    gsd: float = DEFAULT_GSD,
+):
+    """Rasterio metadata for a synthetic scene."""
+    return {
+        "driver": "GTiff",
+        "height": height,
+        "width": width,
+        "count": count,
+        "dtype": dtype,
+        "crs": crs,
+        "transform": from_origin(*DEFAULT_ORIGIN, gsd, gsd),
+    }
+
+
+def write_geotiff(path, array: np.ndarray, crs: str = DEFAULT_CRS, gsd: float = DEFAULT_GSD):
+    """
+    Write an (H, W, C) image or (H, W) mask as a tiled GeoTIFF.
+
+    Returns:
+        path
+    """
+    if array.ndim == 2:
+        array = array[..., None]
+
+    height, width, count = array.shape
+
+    meta = scene_meta(height, width, count, array.dtype.name, crs, gsd)
+    meta.update({"tiled": True, "blockxsize": 256, "blockysize": 256})
+
+    with rasterio.open(path, "w", **meta) as dst:
+        dst.write(array.transpose(2, 0, 1))
+
+    return path
+
+
+def write_scene(directory, name: str, height: int, width: int, density: float = 0.2, seed: int = 0):
+    """
+    Generate a scene and write it as <name>.tif plus <name>_label.tif.
+
+    Returns:
+        (image_path, mask_path)
+    """
+    image, mask = make_scene(height, width, density=density, seed=seed)
+
+    image_path = write_geotiff(directory / f"{name}.tif", image)
+    mask_path = write_geotiff(directory / f"{name}_label.tif", mask)
+
+    return image_path, mask_path
@@ -1,5 +1,7 @@
+-- One row per processed file; batch jobs have several
 CREATE TABLE IF NOT EXISTS analysis_results (
-    job_id            VARCHAR(36) PRIMARY KEY,
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id            VARCHAR(36) NOT NULL,
     tile_name         VARCHAR(255),
     num_roofs         INT,
     hot_roofs         INT,
@@ -9,5 +11,53 @@ CREATE TABLE IF NOT EXISTS analysis_results (
     co2_kg            DOUBLE,
     usage_factor      DOUBLE,
     max_kwh_per_roof  DOUBLE,
-    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (job_id, tile_name)
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id            VARCHAR(36) PRIMARY KEY,
+    status            VARCHAR(16) NOT NULL,
+    priority          INT DEFAULT 0,
+    profile           INT DEFAULT 0,
+    stage             VARCHAR(32),
+    progress          DOUBLE DEFAULT 0,
+    stage_timings     TEXT,
+    result            TEXT,
+    error             TEXT,
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at        TIMESTAMP,
+    finished_at       TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+
+CREATE TABLE IF NOT EXISTS roofs (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id            VARCHAR(36) NOT NULL,
+    tile_name         VARCHAR(255),
+    label             INT NOT NULL,
+    area_m2           DOUBLE,
+    mean_reflectance  DOUBLE,
+    roof_type         VARCHAR(8),
+    energy_kwh        DOUBLE,
+    cost_nzd          DOUBLE,
+    co2_kg            DOUBLE,
+    centroid_x        DOUBLE,
+    centroid_y        DOUBLE,
+    crs               VARCHAR(64),
+    min_x             DOUBLE,
+    min_y             DOUBLE,
+    max_x             DOUBLE,
+    max_y             DOUBLE
+);
+
+CREATE INDEX IF NOT EXISTS idx_roofs_job ON roofs (job_id, tile_name);
+CREATE INDEX IF NOT EXISTS idx_roofs_type ON roofs (roof_type);
+
+-- Spatial index over roof bounding boxes (id = roofs.id)
+CREATE VIRTUAL TABLE IF NOT EXISTS roofs_rtree USING rtree (
+    id,
+    min_x, max_x,
+    min_y, max_y
 );
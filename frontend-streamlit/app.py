@@ -1,41 +1,58 @@
+import io
+import time
+
 import streamlit as st
 import requests
 import numpy as np
-import rasterio
-import matplotlib.pyplot as plt
 from PIL import Image
 
 Image.MAX_IMAGE_PIXELS = None
 
-def load_tif_for_display(path):
-    with rasterio.open(path) as src:
-        data = src.read()
-
-    if data.shape[0] == 3:
-        # RGB
-        img = np.transpose(data, (1, 2, 0))
-        img = np.clip(img / 255.0, 0, 1)
-        return img
-    else:
-        # single band
-        return data[0]
 
-def overlay_thermal_mask(rgb, thermal_mask):
-    overlay = rgb.copy()
+def overlay_thermal_mask(rgb, thermal):
+    """
+    Alpha-blend the thermal layer over RGB in integer arithmetic.
 
-    # Hot roofs → red
-    overlay[thermal_mask == 1] = [1.0, 0.0, 0.0]
+    Args:
+        rgb: np.ndarray (H, W, 3), uint8
+        thermal: np.ndarray (H, W, 4), uint8 RGBA (transparent off roofs)
 
-    # Cool roofs → blue
-    overlay[thermal_mask == 2] = [0.0, 0.4, 1.0]
+    Returns:
+        blended: np.ndarray (H, W, 3), uint8
+    """
+    alpha = thermal[:, :, 3:].astype(np.uint16)
 
-    alpha = 0.5
-    blended = (1 - alpha) * rgb + alpha * overlay
+    blended = rgb * (255 - alpha) + thermal[:, :, :3] * alpha
 
-    return blended
+    return ((blended + 127) // 255).astype(np.uint8)
 
 
 API_BASE = "http://127.0.0.1:8000"
+POLL_INTERVAL_S = 1.0
+DISPLAY_WIDTH = 1024
+
+
+def fetch_preview(job_id, layer, **params):
+    """
+    One whole-layer preview rendered by the API from the raster's
+    overviews, so only a display-sized PNG is transferred.
+    """
+    r = requests.get(f"{API_BASE}/tiles/{job_id}/{layer}/preview.png", params=params)
+    r.raise_for_status()
+
+    return np.asarray(Image.open(io.BytesIO(r.content)).convert("RGBA"))
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def thermal_overlay(job_id, max_width):
+    rgb = fetch_preview(job_id, "rgb", max_width=max_width)[:, :, :3]
+    height, width = rgb.shape[:2]
+
+    # Same explicit grid: the mask may be at a decimated resolution
+    thermal = fetch_preview(job_id, "thermal", width=width, height=height)
+
+    return overlay_thermal_mask(rgb, thermal)
+
 
 st.set_page_config(page_title="Rooflytics", layout="centered")
 
@@ -58,82 +75,84 @@ if uploaded_file:
 
         with st.spinner("Running roof analysis..."):
             r = requests.post(f"{API_BASE}/process/{job_id}")
-            if r.status_code != 200:
+            if r.status_code != 202:
                 st.error("Backend error during processing")
                 st.code(r.text)
                 st.stop()
 
-            result = r.json()
+            progress_bar = st.progress(0.0)
 
-        st.success("Analysis complete")
+            while True:
+                status = requests.get(f"{API_BASE}/status/{job_id}").json()
+                progress_bar.progress(status["progress"])
 
-        st.markdown("### Summary")
+                if status["status"] in ("completed", "failed"):
+                    break
 
-        col1, col2, col3 = st.columns(3)
+                time.sleep(POLL_INTERVAL_S)
 
-        col1.metric("Total Roofs", result["num_roofs"])
-        col2.metric("Cool Roofs", result["cool_roofs"])
-        col3.metric("Hot Roofs", result["hot_roofs"])
+            if status["status"] == "failed":
+                st.error("Backend error during processing")
+                st.code(status["error"])
+                st.stop()
+
+            st.session_state["job_id"] = job_id
+            st.session_state["result"] = status["result"]
 
-        st.markdown("### Environmental Impact")
+        st.success("Analysis complete")
 
-        col4, col5 = st.columns(2)
+# Results persist across re-renders; artifacts come from the per-job cache
+if "result" in st.session_state:
+    job_id = st.session_state["job_id"]
+    result = st.session_state["result"]
 
-        col4.metric(
-            "Energy Savings (kWh / year)",
-            f'{result["total_energy_kwh_per_year"]:,}',
-        )
+    st.markdown("### Summary")
 
-        col5.metric(
-            "CO₂ Reduction (kg / year)",
-            f'{result["total_co2_kg_per_year"]:,}',
-        )
+    col1, col2, col3 = st.columns(3)
 
-        st.markdown("### Economic Impact")
+    col1.metric("Total Roofs", result["num_roofs"])
+    col2.metric("Cool Roofs", result["cool_roofs"])
+    col3.metric("Hot Roofs", result["hot_roofs"])
 
-        st.metric(
-            "Estimated Cost Savings (NZD / year)",
-            f'NZD {result["total_cost_nzd_per_year"]:,}',
-        )
+    st.markdown("### Environmental Impact")
 
+    col4, col5 = st.columns(2)
 
-        st.markdown("### Download Results")
+    col4.metric(
+        "Energy Savings (kWh / year)",
+        f'{result["total_energy_kwh_per_year"]:,}',
+    )
 
-        files = requests.get(
-            f"{API_BASE}/results/{job_id}"
-        ).json()["files"]
+    col5.metric(
+        "CO₂ Reduction (kg / year)",
+        f'{result["total_co2_kg_per_year"]:,}',
+    )
 
-        for f in files:
-            url = f"{API_BASE}/results/{job_id}/{f}"
-            st.markdown(f"- [{f}]({url})")
-        
-        st.markdown("### 🗺️ Thermal Roof Visualization")
+    st.markdown("### Economic Impact")
 
-        job_results_url = f"{API_BASE}/results/{job_id}"
+    st.metric(
+        "Estimated Cost Savings (NZD / year)",
+        f'NZD {result["total_cost_nzd_per_year"]:,}',
+    )
 
-        # Load images
-        input_tif = requests.get(
-            f"{job_results_url}/input.tif"
-        ).content
 
-        thermal_tif = requests.get(
-            f"{job_results_url}/thermal_clusters.tif"
-        ).content
+    st.markdown("### Download Results")
 
-        # Save temporarily
-        with open("temp_input.tif", "wb") as f:
-            f.write(input_tif)
+    files = requests.get(
+        f"{API_BASE}/results/{job_id}"
+    ).json()["files"]
 
-        with open("temp_thermal.tif", "wb") as f:
-            f.write(thermal_tif)
+    for f in files:
+        url = f"{API_BASE}/results/{job_id}/{f}"
+        st.markdown(f"- [{f}]({url})")
 
-        rgb = load_tif_for_display("temp_input.tif")
-        thermal = load_tif_for_display("temp_thermal.tif")
+    st.markdown("### 🗺️ Thermal Roof Visualization")
 
-        overlay = overlay_thermal_mask(rgb, thermal)
+    with st.spinner("Rendering overlay..."):
+        overlay = thermal_overlay(job_id, DISPLAY_WIDTH)
 
-        st.image(
-            overlay,
-            caption="Red = Hot roofs | Blue = Cool roofs",
-            width="stretch",
-        )
\ No newline at end of file
+    st.image(
+        overlay,
+        caption="Red = Hot roofs | Blue = Cool roofs",
+        width="stretch",
+    )
@@ -0,0 +1,194 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.transform import from_origin
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# backend.services.db keeps its database under ./db
+workdir = Path(tempfile.mkdtemp())
+(workdir / "db").mkdir()
+shutil.copy(ROOT / "db" / "schema.sql", workdir / "db" / "schema.sql")
+os.chdir(workdir)
+
+from backend.services import pipeline  # noqa: E402
+from backend.services.db import init_db  # noqa: E402
+from backend.services.mosaic import validate_batch  # noqa: E402
+from benchmarks.synthetic import DEFAULT_CRS, DEFAULT_GSD, DEFAULT_ORIGIN, make_scene  # noqa: E402
+
+SIZE = 1024
+HALF = SIZE // 2
+
+
+class ThresholdService:
+    """Stand-in for the segmentation model: dark or bright = roof."""
+
+    model_id = "threshold"
+    target_gsd = None
+
+    def predict(self, image, scale=None):
+        lum = image.astype(np.float32).mean(-1)
+        return ((lum < 75) | (lum > 160)).astype(np.uint8)
+
+
+def write_tile(path, pixels, col, row, transform=None):
+    transform = transform or from_origin(
+        DEFAULT_ORIGIN[0] + col * DEFAULT_GSD,
+        DEFAULT_ORIGIN[1] - row * DEFAULT_GSD,
+        DEFAULT_GSD,
+        DEFAULT_GSD,
+    )
+
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=pixels.shape[0],
+        width=pixels.shape[1],
+        count=3,
+        dtype="uint8",
+        crs=DEFAULT_CRS,
+        transform=transform,
+    ) as dst:
+        dst.write(pixels.transpose(2, 0, 1))
+
+
+def write_vrt(path, tiles):
+    lines = [
+        f'<VRTDataset rasterXSize="{SIZE}" rasterYSize="{SIZE}">',
+        f"<SRS>{DEFAULT_CRS}</SRS>",
+        f"<GeoTransform>{DEFAULT_ORIGIN[0]}, {DEFAULT_GSD}, 0, "
+        f"{DEFAULT_ORIGIN[1]}, 0, {-DEFAULT_GSD}</GeoTransform>",
+    ]
+    for band in (1, 2, 3):
+        lines.append(f'<VRTRasterBand dataType="Byte" band="{band}">')
+        for name, col, row in tiles:
+            lines.append(
+                f'<SimpleSource><SourceFilename relativeToVRT="1">{name}</SourceFilename>'
+                f"<SourceBand>{band}</SourceBand>"
+                f'<SrcRect xOff="0" yOff="0" xSize="{HALF}" ySize="{HALF}"/>'
+                f'<DstRect xOff="{col}" yOff="{row}" xSize="{HALF}" ySize="{HALF}"/>'
+                "</SimpleSource>"
+            )
+        lines.append("</VRTRasterBand>")
+    lines.append("</VRTDataset>")
+
+    path.write_text("\n".join(lines))
+
+
+def batch_dir(name, image, vrt_name=None):
+    inputs = workdir / name
+    inputs.mkdir()
+
+    tiles = []
+    for row in (0, HALF):
+        for col in (0, HALF):
+            tile = f"t_{row}_{col}.tif"
+            write_tile(inputs / tile, image[row:row + HALF, col:col + HALF], col, row)
+            tiles.append((tile, col, row))
+
+    if vrt_name:
+        write_vrt(inputs / vrt_name, tiles)
+
+    return inputs
+
+
+def run(name, inputs):
+    return pipeline.run_batch(inputs, workdir / "out" / name, name, ThresholdService())
+
+
+init_db()
+image, _ = make_scene(SIZE, SIZE, density=0.2, seed=3)
+
+# Several blocks per VRT, cut across the source files
+pipeline.MOSAIC_BLOCK_SIZE = 300
+
+whole_dir = workdir / "whole"
+whole_dir.mkdir()
+write_tile(whole_dir / "whole.tif", image, 0, 0)
+
+results = {
+    "whole": run("whole", whole_dir),
+    "tiles": run("tiles", batch_dir("tiles", image)),
+    "mosaic.vrt": run("mosaic", batch_dir("mosaic", image, "mosaic.vrt")),
+    "city_0.075m.vrt": run("dotted", batch_dir("dotted", image, "city_0.075m.vrt")),
+}
+
+for name, r in results.items():
+    print(f"{name:>16}: {r['num_roofs']} roofs, {r['total_energy_kwh_per_year']:.1f} kWh")
+
+# Member edges shift a few border pixels, never whole roofs
+reference = results["whole"]
+for name, r in results.items():
+    assert r["num_roofs"] == reference["num_roofs"], name
+    assert np.isclose(
+        r["total_energy_kwh_per_year"],
+        reference["total_energy_kwh_per_year"],
+        rtol=1e-3,
+    ), name
+
+# Only the VRT name differs
+assert results["city_0.075m.vrt"] == {**results["mosaic.vrt"], "job_id": "dotted"}
+
+# Every block of the dotted VRT keeps its own mask
+masks = sorted(p.name for p in (workdir / "out" / "dotted").glob("*_mask_cleaned.tif"))
+assert len(masks) == results["city_0.075m.vrt"]["num_members"], masks
+
+print("batch results match the single-file run, dotted VRT names included")
+
+
+def rejected(name, tiles):
+    """validate_batch error for a batch of (file name, transform)."""
+    inputs = workdir / name
+    inputs.mkdir()
+
+    for tile, transform in tiles:
+        write_tile(inputs / tile, image[:HALF, :HALF], 0, 0, transform)
+
+    try:
+        validate_batch(inputs)
+    except ValueError as e:
+        return str(e)
+
+    return None
+
+
+def on_grid(col, row):
+    return from_origin(
+        DEFAULT_ORIGIN[0] + col * DEFAULT_GSD,
+        DEFAULT_ORIGIN[1] - row * DEFAULT_GSD,
+        DEFAULT_GSD,
+        DEFAULT_GSD,
+    )
+
+
+north_up = on_grid(0, 0)
+
+assert rejected("adjacent", [("a.tif", north_up), ("b.tif", on_grid(HALF, 0))]) is None
+
+error = rejected("rotated", [
+    ("a.tif", north_up),
+    ("b.tif", on_grid(HALF, 0) * Affine.rotation(10)),
+])
+assert error and "b.tif" in error and "north-up" in error, error
+
+error = rejected("off_grid", [("a.tif", north_up), ("b.tif", on_grid(HALF + 0.5, 0))])
+assert error and "a.tif" in error and "b.tif" in error and "grid" in error, error
+
+error = rejected("same_bounds", [("a.tif", north_up), ("b.tif", north_up)])
+assert error and "a.tif" in error and "b.tif" in error and "overlap" in error, error
+
+error = rejected("overlapping", [
+    ("a.tif", north_up),
+    ("b.tif", on_grid(HALF, 0)),
+    ("c.tif", on_grid(HALF - 10, 10)),
+])
+assert error and "overlap" in error and "c.tif" in error, error
+
+shutil.rmtree(workdir, ignore_errors=True)
+print("rotated, off-grid and overlapping batches are rejected")
@@ -0,0 +1,84 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from backend.services.data_loader import load_geotiff, raster_pixel_scale
+from backend.services.preprocessing import normalize_tile, pixel_scale, to_uint8
+from training.dataset_production import RoofDatasetProduction, TileTriageDataset
+
+
+def write_float_scene(path, values, dtype="float32"):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=values.shape[0],
+        width=values.shape[1],
+        count=values.shape[2],
+        dtype=dtype,
+        crs="EPSG:2193",
+        transform=from_origin(0, 0, 0.3, 0.3),
+    ) as dst:
+        dst.write(values.transpose(2, 0, 1))
+
+
+rng = np.random.default_rng(0)
+pixels = rng.integers(0, 256, (600, 700, 3)).astype(np.float32)
+
+with tempfile.TemporaryDirectory() as tmp:
+    scene_255 = Path(tmp) / "float_255.tif"
+    scene_01 = Path(tmp) / "float_01.tif"
+    write_float_scene(scene_255, pixels)
+    write_float_scene(scene_01, pixels / 255.0)
+
+    assert pixel_scale("float32") is None
+    assert raster_pixel_scale(scene_255) == 255.0
+    assert raster_pixel_scale(scene_01) == 1.0
+
+    image, meta = load_geotiff(scene_255)
+    scale = raster_pixel_scale(scene_255)
+
+    # float32 0-255 must match the same scene stored as uint8
+    reference = pixels.astype(np.uint8)
+    assert np.array_equal(to_uint8(image, scale), reference)
+    assert np.allclose(
+        normalize_tile(image, scale=scale),
+        normalize_tile(reference),
+        atol=1e-5,
+    )
+
+    # Training tiles: a dark tile (all pixels <= 1) of a 0-255 float
+    # scene must not be read as a 0-1 tile
+    dark = rng.integers(0, 256, (1024, 1024, 3)).astype(np.float32)
+    dark[:512, :512] = rng.integers(0, 2, (512, 512, 3))
+    labels = np.zeros((1024, 1024, 1), dtype=np.uint8)
+    labels[600:700, 600:700] = 1
+
+    write_float_scene(Path(tmp) / "dark.tif", dark)
+    write_float_scene(Path(tmp) / "dark_uint8.tif", dark.astype(np.uint8), "uint8")
+    write_float_scene(Path(tmp) / "label.tif", labels, "uint8")
+
+    for random_crops in (False, True):
+        datasets = [
+            RoofDatasetProduction(
+                Path(tmp) / name,
+                Path(tmp) / "label.tif",
+                max_tiles=8,
+                fg_ratio=0.5,
+                random_crops=random_crops,
+            )
+            for name in ("dark.tif", "dark_uint8.tif")
+        ]
+        assert datasets[0].scale == 255.0
+
+        for i in range(len(datasets[0])):
+            assert np.array_equal(datasets[0][i][0], datasets[1][i][0])
+            assert np.array_equal(
+                TileTriageDataset(datasets[0])[i][0],
+                TileTriageDataset(datasets[1])[i][0],
+            )
+
+print("float32 0-255 and 0-1 scenes are scaled correctly")
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# backend.services.db keeps its database under ./db
+workdir = Path(tempfile.mkdtemp())
+(workdir / "db").mkdir()
+shutil.copy(ROOT / "db" / "schema.sql", workdir / "db" / "schema.sql")
+os.chdir(workdir)
+
+from backend.services.db import (  # noqa: E402
+    get_bbox_totals,
+    get_connection,
+    init_db,
+    insert_roofs,
+    iter_roofs_in_bbox,
+    query_roofs_in_bbox,
+)
+
+CRS = "EPSG:2193"
+
+# Query box edges at NZTM magnitudes, where float32 steps are 0.125 m
+# (eastings) and 0.5 m (northings)
+QUERY = (1570000.0, 5180000.0, 1570100.0, 5180100.0)
+
+
+def roof(label, min_x, min_y, max_x, max_y):
+    return {
+        "label": label,
+        "area_m2": 100.0,
+        "mean_reflectance": 0.5,
+        "roof_type": "hot",
+        "energy_kwh": 10.0,
+        "cost_nzd": 3.0,
+        "co2_kg": 1.0,
+        "centroid_x": (min_x + max_x) / 2,
+        "centroid_y": (min_y + max_y) / 2,
+        "crs": CRS,
+        "min_x": min_x,
+        "min_y": min_y,
+        "max_x": max_x,
+        "max_y": max_y,
+    }
+
+
+init_db()
+insert_roofs("job", "scene.tif", [
+    # Inside, touching the query's top edge exactly
+    roof(1, 1570010.0, 5180090.0, 1570020.0, 5180100.0),
+    # Just above the top edge and just right of the right edge: their
+    # float32 R*Tree boxes still reach into the query box
+    roof(2, 1570010.0, 5180100.2, 1570020.0, 5180110.0),
+    roof(3, 1570100.05, 5180010.0, 1570110.0, 5180020.0),
+])
+
+# The R*Tree alone would return the outside roofs
+rtree_hits = get_connection().execute(
+    """
+    SELECT COUNT(*) FROM roofs_rtree
+    WHERE max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?
+    """,
+    (QUERY[0], QUERY[2], QUERY[1], QUERY[3]),
+).fetchone()[0]
+assert rtree_hits == 3, rtree_hits
+
+labels = sorted(r["label"] for r in query_roofs_in_bbox(*QUERY, crs=CRS))
+assert labels == [1], labels
+
+paged = [r["label"] for page in iter_roofs_in_bbox(*QUERY, crs=CRS) for r in page]
+assert paged == [1], paged
+
+totals = get_bbox_totals(*QUERY, crs=CRS)
+assert totals["num_roofs"] == 1, totals
+
+# Point queries on the edge and just outside it
+assert [r["label"] for r in query_roofs_in_bbox(1570015.0, 5180100.0, 1570015.0, 5180100.0)] == [1]
+assert query_roofs_in_bbox(1570015.0, 5180100.1, 1570015.0, 5180100.1) == []
+
+shutil.rmtree(workdir, ignore_errors=True)
+print("bbox queries exclude roofs just outside the query box")
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def summed_area_table(mask: np.ndarray):
+    """
+    Summed-area table of a binary mask, padded with a zero row/column:
+    sat[y, x] = number of foreground pixels in mask[:y, :x].
+    """
+    h, w = mask.shape
+    dtype = np.int32 if h * w < 2 ** 31 else np.int64
+
+    sat = np.zeros((h + 1, w + 1), dtype=dtype)
+    np.cumsum(mask > 0, axis=0, dtype=dtype, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+
+    return sat
+
+
+def crop_foreground(sat: np.ndarray, x, y, size: int):
+    """
+    Foreground pixels of the size x size crop(s) at (x, y), in O(1)
+    per crop. x and y may be arrays.
+    """
+    return (
+        sat[y + size, x + size]
+        - sat[y, x + size]
+        - sat[y + size, x]
+        + sat[y, x]
+    )
+
+
+def sample_crops(
+    mask: np.ndarray,
+    num_crops: int,
+    tile_size: int = 512,
+    fg_ratio: float = 0.7,
+    rng: np.random.Generator = None,
+    max_draws: int = 50,
+):
+    """
+    Random-offset crops with a target share of foreground crops.
+
+    Candidates are drawn uniformly over all valid offsets, classified
+    with the summed-area table (any roof pixel = foreground, as in
+    RoofDatasetProduction) and kept until each quota is met. If a
+    scene cannot fill a quota within max_draws * num_crops candidates
+    (e.g. no empty area), fewer crops of that kind are returned.
+
+    Returns:
+        list of (x, y, has_roof)
+    """
+    rng = rng or np.random.default_rng()
+    h, w = mask.shape
+
+    if h < tile_size or w < tile_size:
+        return []
+
+    sat = summed_area_table(mask)
+
+    quota = {True: int(num_crops * fg_ratio)}
+    quota[False] = num_crops - quota[True]
+
+    crops = []
+    draws = max(1, max_draws * num_crops)
+
+    # Vectorised rejection sampling in batches of candidates
+    while draws > 0 and (quota[True] > 0 or quota[False] > 0):
+        n = min(draws, 4 * num_crops)
+        draws -= n
+
+        xs = rng.integers(0, w - tile_size + 1, n)
+        ys = rng.integers(0, h - tile_size + 1, n)
+        fg = crop_foreground(sat, xs, ys, tile_size) > 0
+
+        for x, y, has_roof in zip(xs, ys, fg):
+            has_roof = bool(has_roof)
+            if quota[has_roof] > 0:
+                quota[has_roof] -= 1
+                crops.append((int(x), int(y), has_roof))
+
+    return crops
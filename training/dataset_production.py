@@ -3,9 +3,10 @@ import torch
 from torch.utils.data import Dataset
 import numpy as np
 
-from backend.services.data_loader import load_geotiff
+from backend.services.data_loader import load_geotiff, raster_pixel_scale
 from backend.services.tiling import tile_image
-from backend.services.preprocessing import normalize_tile
+from backend.services.preprocessing import to_uint8
+from training.crop_sampler import sample_crops
 
 
 class RoofDatasetProduction(Dataset):
@@ -14,6 +15,9 @@ class RoofDatasetProduction(Dataset):
     - ImageNet normalization
     - Random tile sampling
     - Foreground + background balance
+
+    With random_crops, tiles are drawn at any offset (see
+    training/crop_sampler.py) instead of from the 512 px grid.
     """
 
     def __init__(
@@ -23,6 +27,7 @@ class RoofDatasetProduction(Dataset):
         max_tiles=300,
         fg_ratio=0.7,
         seed=42,
+        random_crops=False,
     ):
         random.seed(seed)
 
@@ -31,6 +36,22 @@ class RoofDatasetProduction(Dataset):
 
         assert mask.shape == image.shape[:2]
 
+        # Decided once per file (raster_pixel_scale), never per tile
+        self.scale = raster_pixel_scale(image_path)
+
+        if random_crops:
+            crops = sample_crops(
+                mask,
+                max_tiles,
+                fg_ratio=fg_ratio,
+                rng=np.random.default_rng(seed),
+            )
+            self.tiles, self.masks, self.has_roof = zip(*[
+                (image[y:y + 512, x:x + 512], mask[y:y + 512, x:x + 512], has_roof)
+                for x, y, has_roof in crops
+            ])
+            return
+
         fg_tiles = []
         bg_tiles = []
 
@@ -39,9 +60,9 @@ class RoofDatasetProduction(Dataset):
             mask_tile = mask[y0:y0 + 512, x0:x0 + 512]
 
             if mask_tile.sum() > 0:
-                fg_tiles.append((tile, mask_tile))
+                fg_tiles.append((tile, mask_tile, True))
             else:
-                bg_tiles.append((tile, mask_tile))
+                bg_tiles.append((tile, mask_tile, False))
 
         # ---- Balanced sampling ----
         num_fg = int(max_tiles * fg_ratio)
@@ -59,16 +80,67 @@ class RoofDatasetProduction(Dataset):
         samples = fg_samples + bg_samples
         random.shuffle(samples)
 
-        self.tiles, self.masks = zip(*samples)
+        self.tiles, self.masks, self.has_roof = zip(*samples)
 
     def __len__(self):
         return len(self.tiles)
 
     def __getitem__(self, idx):
-        x = normalize_tile(self.tiles[idx], method="imagenet")
-        y = self.masks[idx]
+        # uint8 views; normalised on device (training.engine.prepare_batch)
+        x = torch.from_numpy(to_uint8(self.tiles[idx], self.scale)).permute(2, 0, 1)
+        y = torch.from_numpy(self.masks[idx]).unsqueeze(0)
+
+        return x, y
+
+
+class TileTriageDataset(Dataset):
+    """
+    Tile-level "contains roof" labels for the triage classifier,
+    reusing the fg/bg split of a RoofDatasetProduction.
+    """
+
+    def __init__(self, tiles: RoofDatasetProduction):
+        self.tiles = tiles
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __getitem__(self, idx):
+        x = torch.from_numpy(to_uint8(self.tiles.tiles[idx], self.tiles.scale)).permute(2, 0, 1)
+        y = torch.tensor([float(self.tiles.has_roof[idx])])
+
+        return x, y
+
 
-        x = torch.tensor(x).permute(2, 0, 1).float()
-        y = torch.tensor(y).unsqueeze(0).float()
+class GridTriageDataset(Dataset):
+    """
+    Every tile of a scene, as inference sees it (the zero-padded 512 px
+    grid), with tile-level "contains roof" labels. Unlike the balanced
+    split, roof and empty tiles keep their natural proportions, so skip
+    rates measured on it are the ones a real scene gets.
+    """
+
+    def __init__(self, image_path, mask_path):
+        image, _ = load_geotiff(image_path, is_mask=False)
+        mask, _ = load_geotiff(mask_path, is_mask=True)
+
+        assert mask.shape == image.shape[:2]
+
+        self.scale = raster_pixel_scale(image_path)
+        self.tiles = []
+        self.has_roof = []
+
+        for tile, info in tile_image(image, pad_edges=True):
+            y0, x0 = info["y_offset"], info["x_offset"]
+
+            self.tiles.append(tile)
+            self.has_roof.append(bool(mask[y0:y0 + 512, x0:x0 + 512].any()))
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __getitem__(self, idx):
+        x = torch.from_numpy(to_uint8(self.tiles[idx], self.scale)).permute(2, 0, 1)
+        y = torch.tensor([float(self.has_roof[idx])])
 
         return x, y
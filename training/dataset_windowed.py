@@ -0,0 +1,248 @@
+import json
+import os
+import random
+import zlib
+from pathlib import Path
+
+import numpy as np
+import rasterio
+import torch
+from rasterio.windows import Window
+from torch.utils.data import Dataset
+
+from backend.services.data_loader import load_geotiff, raster_pixel_scale
+from backend.services.preprocessing import to_uint8
+from training.crop_sampler import sample_crops
+
+INDEX_VERSION = 2
+
+
+def _index_file(mask_path: Path, tile_size: int):
+    """
+    Foreground pixel count of every full tile of one mask.
+
+    The mask is read one tile-high strip at a time, so indexing a
+    large label costs a strip of memory, not the whole raster.
+    """
+    tiles = []
+
+    with rasterio.open(mask_path) as src:
+        width, height = src.width, src.height
+
+        for y in range(0, height - tile_size + 1, tile_size):
+            strip = src.read(1, window=Window(0, y, width, tile_size))
+
+            for x in range(0, width - tile_size + 1, tile_size):
+                fg = int(np.count_nonzero(strip[:, x:x + tile_size]))
+                tiles.append([x, y, fg])
+
+    return tiles
+
+
+def _stamp(path: Path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _load_cache(cache_path: Path, tile_size: int):
+    """Per-mask cache entries, or {} if missing or built differently."""
+    if cache_path is None or not Path(cache_path).exists():
+        return {}
+
+    with open(cache_path) as f:
+        cache = json.load(f)
+
+    if cache.get("version") != INDEX_VERSION or cache.get("tile_size") != tile_size:
+        return {}
+
+    return cache.get("files", {})
+
+
+def _save_cache(cache_path: Path, tile_size: int, files: dict):
+    tmp = Path(f"{cache_path}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": INDEX_VERSION, "tile_size": tile_size, "files": files}, f)
+    os.replace(tmp, cache_path)
+
+
+def _cache_entry(files: dict, path: Path):
+    """A mask's cache entry, emptied if the mask changed on disk."""
+    key = str(path.resolve())
+    entry = files.get(key)
+
+    if entry is None or entry["stamp"] != _stamp(path):
+        entry = {"stamp": _stamp(path)}
+        files[key] = entry
+
+    return entry
+
+
+def build_tile_index(mask_paths, tile_size: int = 512, cache_path: Path = None):
+    """
+    Tile windows with foreground statistics for a set of masks.
+
+    With cache_path, the index is kept on disk and a mask is only
+    rescanned when its size or modification time changed, so
+    start-up does not read every label on every run.
+
+    Returns:
+        dict mask path -> list of [x, y, fg_pixels]
+    """
+    files = _load_cache(cache_path, tile_size)
+    index = {}
+    changed = False
+
+    for path in map(Path, mask_paths):
+        entry = _cache_entry(files, path)
+
+        if "tiles" not in entry:
+            entry["tiles"] = _index_file(path, tile_size)
+            changed = True
+
+        index[str(path)] = entry["tiles"]
+
+    if cache_path is not None and changed:
+        _save_cache(cache_path, tile_size, files)
+
+    return index
+
+
+def build_crop_index(
+    mask_paths,
+    num_crops: int,
+    tile_size: int = 512,
+    fg_ratio: float = 0.7,
+    seed: int = 42,
+    cache_path: Path = None,
+):
+    """
+    Random-offset crops (training.crop_sampler) for a set of masks.
+
+    Each mask draws from its own generator, seeded with seed and the
+    mask's file name, so its crops do not depend on the other masks.
+    With cache_path, the crops are kept in the tile index cache under
+    the same size/mtime stamps: a mask is only read again when it
+    changed or the sampling settings did.
+
+    Returns:
+        dict mask path -> list of [x, y, has_roof]
+    """
+    files = _load_cache(cache_path, tile_size)
+    settings = f"{num_crops}:{fg_ratio}:{seed}"
+    index = {}
+    changed = False
+
+    for path in map(Path, mask_paths):
+        crops = _cache_entry(files, path).setdefault("crops", {})
+
+        if settings not in crops:
+            mask, _ = load_geotiff(path, is_mask=True)
+            rng = np.random.default_rng([seed, zlib.crc32(path.name.encode())])
+
+            crops[settings] = [
+                list(crop) for crop in sample_crops(mask, num_crops, tile_size, fg_ratio, rng)
+            ]
+            changed = True
+            del mask
+
+        index[str(path)] = crops[settings]
+
+    if cache_path is not None and changed:
+        _save_cache(cache_path, tile_size, files)
+
+    return index
+
+
+class RoofWindowDataset(Dataset):
+    """
+    Lazily read training tiles.
+
+    Same balanced fg/bg sampling as RoofDatasetProduction, but only
+    tile windows are kept in memory; each __getitem__ reads its image
+    and mask window from disk. Memory no longer grows with the corpus
+    and the dataset is cheap to copy into DataLoader workers.
+
+    With random_crops, windows are drawn at any offset from each mask's
+    summed-area table instead of from the grid index; the drawn crops
+    are cached in the same index file, so masks are only read again
+    when they change.
+
+    Pixels are mapped to uint8 with one scale per image
+    (raster_pixel_scale), the rule training.shards packs with too.
+    """
+
+    def __init__(
+        self,
+        image_paths,
+        mask_paths,
+        max_tiles=300,
+        fg_ratio=0.7,
+        seed=42,
+        tile_size=512,
+        index_path=None,
+        random_crops=False,
+    ):
+        rng = random.Random(seed)
+        self.tile_size = tile_size
+
+        # Decided once per file, never per window
+        self.scales = {str(p): raster_pixel_scale(p) for p in image_paths}
+
+        # (image path, mask path, x, y, has_roof)
+        self.samples = []
+
+        if random_crops:
+            index = build_crop_index(
+                mask_paths, max_tiles, tile_size, fg_ratio, seed, index_path
+            )
+
+            for image_path, mask_path in zip(image_paths, mask_paths):
+                self.samples.extend(
+                    (str(image_path), str(mask_path), x, y, has_roof)
+                    for x, y, has_roof in index[str(mask_path)]
+                )
+
+            rng.shuffle(self.samples)
+            self.has_roof = [s[4] for s in self.samples]
+            return
+
+        index = build_tile_index(mask_paths, tile_size, index_path)
+
+        for image_path, mask_path in zip(image_paths, mask_paths):
+            tiles = index[str(mask_path)]
+
+            fg_tiles = [(x, y) for x, y, fg in tiles if fg > 0]
+            bg_tiles = [(x, y) for x, y, fg in tiles if fg == 0]
+
+            # ---- Balanced sampling, per image ----
+            num_fg = int(max_tiles * fg_ratio)
+            num_bg = max_tiles - num_fg
+
+            for group, n, has_roof in (
+                (fg_tiles, num_fg, True),
+                (bg_tiles, num_bg, False),
+            ):
+                for x, y in rng.sample(group, min(len(group), n)):
+                    self.samples.append(
+                        (str(image_path), str(mask_path), x, y, has_roof)
+                    )
+
+        rng.shuffle(self.samples)
+
+        self.has_roof = [s[4] for s in self.samples]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        image_path, mask_path, col, row, _ = self.samples[idx]
+        window = Window(col, row, self.tile_size, self.tile_size)
+
+        tile, _ = load_geotiff(image_path, window=window)
+        mask, _ = load_geotiff(mask_path, is_mask=True, window=window)
+
+        # uint8 views; normalised on device (training.engine.prepare_batch)
+        x = torch.from_numpy(to_uint8(tile, self.scales[image_path])).permute(2, 0, 1)
+        y = torch.from_numpy((mask > 0).view(np.uint8)).unsqueeze(0)
+
+        return x, y
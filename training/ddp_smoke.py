@@ -0,0 +1,159 @@
+"""
+DistributedDataParallel smoke test on synthetic tiles.
+
+    torchrun --standalone --nproc-per-node 2 -m training.ddp_smoke
+    python -m training.ddp_smoke                  # one process, no DDP
+
+Trains the student model for a few epochs on random uint8 tiles with
+the real training engine, then checks that every rank ends with the
+same weights and that only rank 0 wrote the checkpoint. Rank 0 prints
+one JSON line with the global throughput (used by
+benchmarks/ddp_scaling.py).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import torch
+import torch.distributed as dist
+from torch.utils.data import DataLoader, TensorDataset
+
+from backend.models.model_factory import build_model
+from training.distributed import (
+    cleanup,
+    init_distributed,
+    is_main,
+    make_sampler,
+    save_checkpoint,
+    unwrap_model,
+    wrap_model,
+)
+from training.engine import setup_model, train_one_epoch
+from training.losses import BCEDiceLoss
+
+
+def synthetic_tiles(num_tiles: int, tile_size: int, seed: int = 0):
+    """Random uint8 tiles; the mask is a bright square on each tile."""
+    g = torch.Generator().manual_seed(seed)
+
+    x = torch.randint(0, 256, (num_tiles, 3, tile_size, tile_size), dtype=torch.uint8, generator=g)
+    y = torch.zeros(num_tiles, 1, tile_size, tile_size, dtype=torch.uint8)
+
+    q = tile_size // 4
+    x[:, :, q:3 * q, q:3 * q] = 230
+    y[:, :, q:3 * q, q:3 * q] = 1
+
+    return TensorDataset(x, y)
+
+
+def weights_match(model):
+    """True when every rank holds rank 0's weights."""
+    if not dist.is_initialized():
+        return True
+
+    flat = torch.cat([p.detach().reshape(-1) for p in unwrap_model(model).parameters()])
+    reference = flat.clone()
+    dist.broadcast(reference, src=0)
+
+    same = torch.tensor([int(torch.equal(flat, reference))])
+    dist.all_reduce(same, op=dist.ReduceOp.MIN)
+    return bool(same.item())
+
+
+def single_writer(wrote: bool, path: Path):
+    """
+    True when exactly one rank wrote the checkpoint, that rank is
+    rank 0, and the file is there (checked on rank 0, whose node holds
+    it).
+    """
+    # [ranks that wrote, rank 0 wrote and the file exists]
+    counts = torch.tensor([int(wrote), int(wrote and is_main() and path.exists())])
+    if dist.is_initialized():
+        dist.all_reduce(counts)
+
+    return counts.tolist() == [1, 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tiles", type=int, default=64, help="tiles across all ranks")
+    parser.add_argument("--tile-size", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=4, help="per rank")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--model", default="student")
+    parser.add_argument("--output", type=Path, default=Path("ddp_smoke.pth"))
+    args = parser.parse_args(argv)
+
+    rank, world_size = init_distributed()
+    device = "cpu"
+
+    # Same initial weights everywhere (DDP also broadcasts rank 0's)
+    torch.manual_seed(0)
+
+    dataset = synthetic_tiles(args.tiles, args.tile_size)
+    sampler = make_sampler(dataset)
+
+    loader = DataLoader(
+        dataset,
+        batch_size=args.batch_size,
+        shuffle=sampler is None,
+        sampler=sampler,
+    )
+
+    model = wrap_model(setup_model(build_model(args.model), device))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    loss_fn = BCEDiceLoss()
+
+    # Timed from a common start, so the slowest rank sets the pace
+    if dist.is_initialized():
+        dist.barrier()
+    start = time.perf_counter()
+
+    for epoch in range(args.epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        train_one_epoch(model, loader, optimizer, loss_fn, device)
+
+    if dist.is_initialized():
+        dist.barrier()
+    elapsed = time.perf_counter() - start
+
+    in_sync = weights_match(model)
+
+    if is_main():
+        args.output.unlink(missing_ok=True)
+    wrote = save_checkpoint(model, args.output)
+    one_writer = single_writer(wrote, args.output)
+
+    samples = len(sampler or dataset) * world_size * args.epochs
+
+    if is_main():
+        print(json.dumps({
+            "world_size": world_size,
+            "threads_per_rank": torch.get_num_threads(),
+            "samples": samples,
+            "seconds": elapsed,
+            "samples_per_s": samples / elapsed,
+            "weights_in_sync": in_sync,
+            "single_checkpoint_writer": one_writer,
+            "checkpoint": str(args.output),
+        }))
+
+    cleanup()
+
+    if not in_sync:
+        print(f"rank {rank}: weights differ from rank 0", file=sys.stderr)
+        return 1
+
+    if not one_writer:
+        print(f"rank {rank}: checkpoint not written by rank 0 alone", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
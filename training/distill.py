@@ -0,0 +1,196 @@
+import json
+import time
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import yaml
+from torch.utils.data import DataLoader, ConcatDataset
+from pathlib import Path
+
+from backend.models.model_factory import build_model, load_weights
+from training.dataset_production import RoofDatasetProduction
+from training.engine import prepare_batch
+from training.losses import BCEDiceLoss
+
+
+class DistillationLoss(nn.Module):
+    """
+    BCEDiceLoss on the labels plus a distillation term matching the
+    teacher's temperature-softened probabilities.
+    """
+
+    def __init__(self, alpha=0.5, temperature=2.0):
+        super().__init__()
+        self.alpha = alpha
+        self.temperature = temperature
+        self.hard = BCEDiceLoss()
+
+    def forward(self, preds, targets, teacher_logits):
+        t = self.temperature
+
+        soft = F.binary_cross_entropy_with_logits(
+            preds / t,
+            torch.sigmoid(teacher_logits / t),
+        )
+
+        # T² keeps the soft gradients on the scale of the hard loss
+        return (1 - self.alpha) * self.hard(preds, targets) + self.alpha * t * t * soft
+
+
+def distill_one_epoch(student, teacher, loader, optimizer, loss_fn, device):
+    student.train()
+    total_loss = 0.0
+
+    for x, y in loader:
+        x, y = prepare_batch(x, y, device)
+
+        with torch.no_grad():
+            teacher_logits = teacher(x)
+
+        optimizer.zero_grad()
+        preds = student(x)
+        loss = loss_fn(preds, y, teacher_logits)
+        loss.backward()
+        optimizer.step()
+
+        total_loss += loss.item()
+
+    return total_loss / len(loader)
+
+
+@torch.no_grad()
+def evaluate(student, teacher, loader, device):
+    """
+    IoU of the student against the teacher's masks and both models
+    against the labels, on held-out tiles.
+    """
+    student.eval()
+    teacher.eval()
+
+    inter = {"teacher": 0, "student_vs_labels": 0, "teacher_vs_labels": 0}
+    union = dict.fromkeys(inter, 0)
+
+    for x, y in loader:
+        x, y = prepare_batch(x, y, device)
+        labels = y > 0.5
+
+        s = torch.sigmoid(student(x)) >= 0.5
+        t = torch.sigmoid(teacher(x)) >= 0.5
+
+        for key, (a, b) in {
+            "teacher": (s, t),
+            "student_vs_labels": (s, labels),
+            "teacher_vs_labels": (t, labels),
+        }.items():
+            inter[key] += (a & b).sum().item()
+            union[key] += (a | b).sum().item()
+
+    return {
+        f"iou_{key}": inter[key] / union[key] if union[key] else 1.0
+        for key in inter
+    }
+
+
+@torch.no_grad()
+def tiles_per_second(model, device, tile_size=512, repeat=20):
+    """Single-tile throughput, as RoofSegmentationService.predict runs."""
+    model.eval()
+    x = torch.randn(1, 3, tile_size, tile_size, device=device)
+
+    for _ in range(3):
+        model(x)
+
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model(x)
+
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+    return repeat / (time.perf_counter() - start)
+
+
+def load_split(pairs, cfg):
+    return ConcatDataset([
+        RoofDatasetProduction(
+            img,
+            msk,
+            max_tiles=cfg["max_tiles"],
+            fg_ratio=cfg["fg_ratio"],
+            seed=cfg["seed"],
+        )
+        for img, msk in pairs
+    ])
+
+
+def main():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print("Using device:", device)
+
+    with open("training/configs/distill.yaml") as f:
+        cfg = yaml.safe_load(f)
+
+    DATA_DIR = Path(cfg["data_dir"])
+    image_paths = sorted((DATA_DIR / "image").glob("*.tif"))
+    mask_paths = sorted((DATA_DIR / "label").glob("*.tif"))
+
+    pairs = list(zip(image_paths, mask_paths))[:cfg["num_images"]]
+    train_pairs = pairs[:-cfg["val_images"]]
+    val_pairs = pairs[-cfg["val_images"]:]
+
+    train_loader = DataLoader(
+        load_split(train_pairs, cfg),
+        batch_size=cfg["batch_size"],
+        shuffle=True,
+        num_workers=cfg["num_workers"],
+    )
+    val_loader = DataLoader(
+        load_split(val_pairs, cfg),
+        batch_size=cfg["batch_size"],
+        num_workers=cfg["num_workers"],
+    )
+
+    teacher = build_model("efficientnet")
+    load_weights(teacher, cfg["teacher_checkpoint"])
+    teacher.to(device).eval()
+
+    student = build_model("student").to(device)
+
+    optimizer = torch.optim.AdamW(student.parameters(), lr=cfg["lr"], weight_decay=1e-4)
+    loss_fn = DistillationLoss(alpha=cfg["alpha"], temperature=cfg["temperature"])
+
+    for epoch in range(cfg["epochs"]):
+        loss = distill_one_epoch(student, teacher, train_loader, optimizer, loss_fn, device)
+        print(f"Epoch {epoch+1}/{cfg['epochs']} — Loss: {loss:.4f}")
+
+    report = evaluate(student, teacher, val_loader, device)
+    report.update({
+        "device": device,
+        "student_tiles_per_s": tiles_per_second(student, device),
+        "teacher_tiles_per_s": tiles_per_second(teacher, device),
+        "student_params": sum(p.numel() for p in student.parameters()),
+        "teacher_params": sum(p.numel() for p in teacher.parameters()),
+    })
+
+    print(
+        f"Student IoU vs teacher {report['iou_teacher']:.3f} "
+        f"(labels: student {report['iou_student_vs_labels']:.3f}, "
+        f"teacher {report['iou_teacher_vs_labels']:.3f})"
+    )
+    print(
+        f"Tiles/s on {device}: student {report['student_tiles_per_s']:.1f}, "
+        f"teacher {report['teacher_tiles_per_s']:.1f}"
+    )
+
+    torch.save(student.state_dict(), "student_unet.pth")
+    with open("student_unet.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print("Model saved as student_unet.pth (metrics in student_unet.json)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+DistributedDataParallel helpers for multi-process CPU training.
+
+Launched with torchrun, which sets RANK / WORLD_SIZE / LOCAL_RANK:
+
+    torchrun --nproc-per-node 4 -m training.train_efficientnet
+    torchrun --nnodes 2 --node-rank 0 --nproc-per-node 8 \\
+        --master-addr 10.0.0.5 --master-port 29500 -m training.train_efficientnet
+
+Without torchrun everything degrades to a single process.
+"""
+
+import os
+
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DistributedSampler
+
+
+def init_distributed(backend: str = "gloo"):
+    """
+    Join the process group when launched by torchrun.
+
+    Each rank gets an equal share of the node's cores; torchrun would
+    otherwise leave every rank at OMP_NUM_THREADS=1.
+
+    Returns:
+        (rank, world_size)
+    """
+    world_size = int(os.getenv("WORLD_SIZE", 1))
+
+    if world_size > 1 and not dist.is_initialized():
+        dist.init_process_group(backend=backend)
+
+        local_world = int(os.getenv("LOCAL_WORLD_SIZE", world_size))
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // local_world))
+
+    return rank(), world_size
+
+
+def rank():
+    return dist.get_rank() if dist.is_initialized() else 0
+
+
+def world_size():
+    return dist.get_world_size() if dist.is_initialized() else 1
+
+
+def is_main():
+    """Rank 0 logs and writes checkpoints."""
+    return rank() == 0
+
+
+def device_for_rank():
+    """cuda:<local rank> when CUDA is available, else cpu."""
+    if torch.cuda.is_available():
+        return f"cuda:{int(os.getenv('LOCAL_RANK', 0))}"
+    return "cpu"
+
+
+def wrap_model(model):
+    """
+    DistributedDataParallel around model when running distributed.
+
+    smp's EfficientNet encoder keeps a classification head (_conv_head,
+    _bn1) that the U-Net never uses, so its parameters get no gradient
+    and must be skipped by the all-reduce.
+    """
+    if not dist.is_initialized():
+        return model
+
+    device = next(model.parameters()).device
+    device_ids = [device.index] if device.type == "cuda" else None
+
+    return DistributedDataParallel(model, device_ids=device_ids, find_unused_parameters=True)
+
+
+def unwrap_model(model):
+    return model.module if isinstance(model, DistributedDataParallel) else model
+
+
+def make_sampler(dataset, shuffle=True, seed=42):
+    """
+    Per-rank shard of a map-style dataset; None in a single process
+    (use DataLoader(shuffle=...) then). Call set_epoch() every epoch.
+    """
+    if not dist.is_initialized():
+        return None
+
+    return DistributedSampler(dataset, shuffle=shuffle, seed=seed)
+
+
+def save_checkpoint(model, path):
+    """
+    Save the (unwrapped) model's weights from rank 0 only.
+
+    Returns:
+        True on the rank that wrote the file
+    """
+    if not is_main():
+        return False
+
+    torch.save(unwrap_model(model).state_dict(), path)
+    return True
+
+
+def barrier():
+    if dist.is_initialized():
+        dist.barrier()
+
+
+def mean_across_ranks(value: float):
+    """Average a scalar (e.g. epoch loss) over all ranks."""
+    if not dist.is_initialized():
+        return value
+
+    # On the rank's device: NCCL only reduces CUDA tensors
+    t = torch.tensor([value], dtype=torch.float64, device=device_for_rank())
+    dist.all_reduce(t)
+    return t.item() / dist.get_world_size()
+
+
+def cleanup():
+    if dist.is_initialized():
+        dist.destroy_process_group()
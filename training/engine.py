@@ -1,21 +1,153 @@
+import time
+from contextlib import nullcontext
+
 import torch
+from torch.nn.parallel import DistributedDataParallel
+from torch.amp import GradScaler
 from tqdm import tqdm
 
+from backend.services.preprocessing import IMAGENET_MEAN, IMAGENET_STD
+from training.distributed import is_main as _is_main, world_size
+
+_NORM = {}
+
+
+def normalize_batch(x: torch.Tensor):
+    """
+    ImageNet-normalise a uint8 (N, 3, H, W) batch on its own device.
+    """
+    if x.device not in _NORM:
+        mean = torch.tensor(IMAGENET_MEAN, device=x.device).view(1, 3, 1, 1)
+        std = torch.tensor(IMAGENET_STD, device=x.device).view(1, 3, 1, 1)
+
+        # (x / 255 - mean) / std  ==  x * gain - offset
+        _NORM[x.device] = (1 / (255 * std), mean / std)
+
+    gain, offset = _NORM[x.device]
+    return x.float().mul_(gain).sub_(offset)
+
+
+def prepare_batch(x, y, device, channels_last=False):
+    """
+    Move a batch to device and normalise it there.
+
+    Datasets return uint8 images and masks, so a quarter of the float32
+    bytes cross the DataLoader and the host-to-device copy. Float
+    inputs (e.g. RoofDataset's per-image normalisation) pass through.
+    """
+    x = x.to(device, non_blocking=True)
+    y = y.to(device, non_blocking=True)
+
+    if x.dtype == torch.uint8:
+        x = normalize_batch(x)
+
+    if channels_last:
+        x = x.contiguous(memory_format=torch.channels_last)
+
+    return x, y.float()
+
+
+def amp_dtype(device):
+    """fp16 on CUDA, bf16 on CPU (no fp16 kernels, no scaler needed)."""
+    return torch.float16 if torch.device(device).type == "cuda" else torch.bfloat16
+
+
+def make_scaler(device, amp: bool):
+    """Loss scaler for fp16 autocast; None where it is not needed."""
+    if amp and torch.device(device).type == "cuda":
+        return GradScaler("cuda")
+    return None
+
 
-def train_one_epoch(model, dataloader, optimizer, loss_fn, device):
+def setup_model(model, device, channels_last=False):
+    """Move model to device, optionally in channels_last layout."""
+    model = model.to(device)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    return model
+
+
+def train_one_epoch(
+    model,
+    dataloader,
+    optimizer,
+    loss_fn,
+    device,
+    amp=False,
+    scaler=None,
+    accumulation_steps=1,
+    channels_last=False,
+):
+    """
+    One training epoch.
+
+    Args:
+        amp: autocast the forward pass (see amp_dtype); the loss is
+            computed in fp32
+        scaler: GradScaler for fp16 (see make_scaler)
+        accumulation_steps: batches whose gradients are summed per
+            optimizer step; effective batch = batch size * steps
+        channels_last: feed inputs in channels_last layout (set the
+            model up with setup_model)
+
+    Returns:
+        mean loss per batch
+    """
     model.train()
     total_loss = 0.0
+    batches = 0
+    samples = 0
+    device_type = torch.device(device).type
 
-    for x, y in tqdm(dataloader):
-        x = x.to(device)
-        y = y.to(device)
+    optimizer.zero_grad(set_to_none=True)
+    start = time.perf_counter()
 
-        optimizer.zero_grad()
-        preds = model(x)
-        loss = loss_fn(preds, y)
-        loss.backward()
-        optimizer.step()
+    # Under DDP, ranks may get different batch counts (whole shards per
+    # rank); join() keeps the gradient all-reduces matched
+    join = model.join() if isinstance(model, DistributedDataParallel) else nullcontext()
+
+    with join:
+        for x, y in tqdm(dataloader, disable=not _is_main()):
+            x, y = prepare_batch(x, y, device, channels_last)
+
+            with torch.autocast(device_type, dtype=amp_dtype(device), enabled=amp):
+                preds = model(x)
+
+            loss = loss_fn(preds.float(), y)
+            scaled = loss / accumulation_steps
+
+            if scaler is not None:
+                scaler.scale(scaled).backward()
+            else:
+                scaled.backward()
 
-        total_loss += loss.item()
+            batches += 1
+            samples += x.shape[0]
+
+            if batches % accumulation_steps == 0:
+                _step(optimizer, scaler)
+
+            total_loss += loss.item()
+
+    # Flush a partial accumulation at the end of the epoch
+    if batches % accumulation_steps:
+        _step(optimizer, scaler)
+
+    elapsed = time.perf_counter() - start
+    if _is_main():
+        print(
+            f"[engine] {samples} samples in {elapsed:.1f} s "
+            f"({samples / elapsed:.1f} samples/s{' on rank 0' if world_size() > 1 else ''})"
+        )
+
+    return total_loss / max(1, batches)
+
+
+def _step(optimizer, scaler):
+    if scaler is not None:
+        scaler.step(optimizer)
+        scaler.update()
+    else:
+        optimizer.step()
 
-    return total_loss / len(dataloader)
+    optimizer.zero_grad(set_to_none=True)
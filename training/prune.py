@@ -0,0 +1,142 @@
+import copy
+import json
+
+import torch
+import torch.nn as nn
+import yaml
+from torch.utils.data import DataLoader
+from pathlib import Path
+
+from backend.models.model_factory import build_model, load_weights
+from backend.models.pruning import prune_unet
+from training.distill import load_split, tiles_per_second
+from training.losses import BCEDiceLoss
+from training.engine import make_scaler, train_one_epoch
+from training.validate import evaluate_iou
+
+
+@torch.no_grad()
+def count_flops(model, tile_size=512):
+    """
+    Multiply-adds x2 of the convolutions and linear layers for one
+    tile (element-wise ops are ignored).
+    """
+    flops = 0
+
+    def conv_hook(module, inputs, output):
+        nonlocal flops
+        k = module.kernel_size[0] * module.kernel_size[1]
+        flops += 2 * output.numel() * (module.in_channels // module.groups) * k
+
+    def linear_hook(module, inputs, output):
+        nonlocal flops
+        flops += 2 * output.numel() * module.in_features
+
+    handles = []
+    for m in model.modules():
+        if isinstance(m, nn.Conv2d):
+            handles.append(m.register_forward_hook(conv_hook))
+        elif isinstance(m, nn.Linear):
+            handles.append(m.register_forward_hook(linear_hook))
+
+    model.eval()
+    device = next(model.parameters()).device
+    model(torch.zeros(1, 3, tile_size, tile_size, device=device))
+
+    for h in handles:
+        h.remove()
+
+    return flops
+
+
+def report(model, level, val_loader, device):
+    # Latency is measured on CPU, where the pruned models are served
+    cpu_model = copy.deepcopy(model).cpu()
+
+    return {
+        "level": level,
+        "gflops_per_tile": count_flops(cpu_model) / 1e9,
+        "params": sum(p.numel() for p in model.parameters()),
+        "cpu_latency_ms_per_tile": 1000 / tiles_per_second(cpu_model, "cpu", repeat=10),
+        "val_iou": evaluate_iou(model, val_loader, device),
+    }
+
+
+def main():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print("Using device:", device)
+
+    with open("training/configs/prune.yaml") as f:
+        cfg = yaml.safe_load(f)
+
+    DATA_DIR = Path(cfg["data_dir"])
+    image_paths = sorted((DATA_DIR / "image").glob("*.tif"))
+    mask_paths = sorted((DATA_DIR / "label").glob("*.tif"))
+
+    pairs = list(zip(image_paths, mask_paths))[:cfg["num_images"]]
+    train_pairs = pairs[:-cfg["val_images"]]
+    val_pairs = pairs[-cfg["val_images"]:]
+
+    train_loader = DataLoader(
+        load_split(train_pairs, cfg),
+        batch_size=cfg["batch_size"],
+        shuffle=True,
+        num_workers=cfg["num_workers"],
+    )
+    val_loader = DataLoader(
+        load_split(val_pairs, cfg),
+        batch_size=cfg["batch_size"],
+        num_workers=cfg["num_workers"],
+    )
+
+    out_dir = Path(cfg["output_dir"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    model = build_model("efficientnet")
+    load_weights(model, cfg["checkpoint"])
+    model.to(device)
+
+    levels = [report(model, 0, val_loader, device)]
+
+    loss_fn = BCEDiceLoss()
+    scaler = make_scaler(device, cfg["amp"])
+
+    for level in range(1, cfg["rounds"] + 1):
+        prune_unet(model, cfg["ratio"], cfg["min_channels"])
+        model.to(device)
+
+        # Fresh optimizer: the parameters were replaced by smaller ones
+        optimizer = torch.optim.AdamW(model.parameters(), lr=cfg["lr"], weight_decay=1e-4)
+
+        for epoch in range(cfg["finetune_epochs"]):
+            loss = train_one_epoch(
+                model,
+                train_loader,
+                optimizer,
+                loss_fn,
+                device,
+                amp=cfg["amp"],
+                scaler=scaler,
+            )
+            print(f"Level {level} epoch {epoch+1}/{cfg['finetune_epochs']} — Loss: {loss:.4f}")
+
+        path = out_dir / f"efficientnet_unet_pruned{level}.pth"
+        torch.save(model.state_dict(), path)
+
+        levels.append(report(model, level, val_loader, device))
+        levels[-1]["checkpoint"] = str(path)
+
+    print(f"{'level':>5} {'GFLOPs':>8} {'params':>10} {'CPU ms':>8} {'val IoU':>8}")
+    for r in levels:
+        print(
+            f"{r['level']:>5} {r['gflops_per_tile']:>8.2f} {r['params']:>10,} "
+            f"{r['cpu_latency_ms_per_tile']:>8.1f} {r['val_iou']:>8.3f}"
+        )
+
+    with open(out_dir / "report.json", "w") as f:
+        json.dump(levels, f, indent=2)
+    print(f"Pruned models and report.json saved in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Pack training tiles into uint8 shards for fast loading.
+
+    python -m training.shards data/train data/shards --max-tiles 300
+
+Each shard is a pair of .npy files (images (N, T, T, 3) and masks
+(N, T, T), both uint8) plus an index.json describing all shards. The
+arrays are memory-mapped when read, so a batch costs a copy of its
+own tiles and nothing else.
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from rasterio.windows import Window
+from torch.utils.data import IterableDataset, get_worker_info
+
+from backend.services.data_loader import load_geotiff
+from backend.services.preprocessing import to_uint8
+from training.dataset_windowed import RoofWindowDataset
+from training.distributed import rank, world_size
+
+INDEX_NAME = "index.json"
+
+
+def pack_shards(
+    image_paths,
+    mask_paths,
+    out_dir,
+    shard_size=256,
+    max_tiles=300,
+    fg_ratio=0.7,
+    seed=42,
+    tile_size=512,
+    random_crops=False,
+):
+    """
+    Sample tiles (as RoofWindowDataset does) and write them to shards.
+
+    Tiles are streamed into memory-mapped output files, so packing
+    holds one tile in memory at a time.
+
+    Returns:
+        path of the written index.json
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    sampled = RoofWindowDataset(
+        image_paths,
+        mask_paths,
+        max_tiles=max_tiles,
+        fg_ratio=fg_ratio,
+        seed=seed,
+        tile_size=tile_size,
+        index_path=out_dir / "tile_index.json",
+        random_crops=random_crops,
+    )
+    samples = sampled.samples
+
+    shards = []
+
+    for start in range(0, len(samples), shard_size):
+        chunk = samples[start:start + shard_size]
+        name = f"shard-{len(shards):05d}"
+
+        images = np.lib.format.open_memmap(
+            out_dir / f"{name}.images.npy",
+            mode="w+",
+            dtype=np.uint8,
+            shape=(len(chunk), tile_size, tile_size, 3),
+        )
+        masks = np.lib.format.open_memmap(
+            out_dir / f"{name}.masks.npy",
+            mode="w+",
+            dtype=np.uint8,
+            shape=(len(chunk), tile_size, tile_size),
+        )
+
+        for i, (image_path, mask_path, col, row, _) in enumerate(chunk):
+            window = Window(col, row, tile_size, tile_size)
+
+            tile, _ = load_geotiff(image_path, window=window)
+            mask, _ = load_geotiff(mask_path, is_mask=True, window=window)
+
+            # Same per-image scale as RoofWindowDataset.__getitem__
+            images[i] = to_uint8(tile, sampled.scales[image_path])
+            masks[i] = mask > 0
+
+        images.flush()
+        masks.flush()
+        del images, masks
+
+        shards.append({
+            "images": f"{name}.images.npy",
+            "masks": f"{name}.masks.npy",
+            "count": len(chunk),
+            "fg_tiles": sum(s[4] for s in chunk),
+        })
+
+    index_path = out_dir / INDEX_NAME
+    with open(index_path, "w") as f:
+        json.dump({
+            "tile_size": tile_size,
+            "total": len(samples),
+            "shards": shards,
+        }, f, indent=2)
+
+    return index_path
+
+
+class ShardDataset(IterableDataset):
+    """
+    Stream (x, y) training pairs from packed shards, as uint8 tensors
+    (see training.engine.prepare_batch).
+
+    Each epoch the shard order is reshuffled and shards are dealt out
+    round-robin to every DataLoader worker of every rank (under
+    torch.distributed), so no two workers read the same tile. Tiles
+    are read from memory-mapped arrays and mixed through a shuffle
+    buffer spanning consecutive shards. Call set_epoch() before each
+    epoch for a new order.
+    """
+
+    def __init__(self, shard_dir, shuffle_buffer=64, seed=42):
+        self.shard_dir = Path(shard_dir)
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+
+        with open(self.shard_dir / INDEX_NAME) as f:
+            self.index = json.load(f)
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def __len__(self):
+        # Approximate per rank: shards are dealt out whole
+        return self.index["total"] // world_size()
+
+    def _my_shards(self, rng):
+        shards = list(self.index["shards"])
+        rng.shuffle(shards)
+
+        worker = get_worker_info()
+        workers = worker.num_workers if worker else 1
+        slot = rank() * workers + (worker.id if worker else 0)
+
+        return shards[slot::world_size() * workers]
+
+    def _tiles(self, shards, rng):
+        for shard in shards:
+            images = np.load(self.shard_dir / shard["images"], mmap_mode="r")
+            masks = np.load(self.shard_dir / shard["masks"], mmap_mode="r")
+
+            order = list(range(shard["count"]))
+            rng.shuffle(order)
+
+            for i in order:
+                yield images[i], masks[i]
+
+    def __iter__(self):
+        # Same seed in every worker: they agree on the shard order
+        rng = random.Random(self.seed + self.epoch)
+        shards = self._my_shards(rng)
+
+        worker = get_worker_info()
+        rng = random.Random(f"{self.seed}-{self.epoch}-{rank()}-{worker.id if worker else 0}")
+
+        buffer = []
+
+        for item in self._tiles(shards, rng):
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(item)
+                continue
+
+            i = rng.randrange(len(buffer))
+            buffer[i], item = item, buffer[i]
+            yield self._to_tensors(*item)
+
+        rng.shuffle(buffer)
+        for item in buffer:
+            yield self._to_tensors(*item)
+
+    @staticmethod
+    def _to_tensors(tile, mask):
+        # The one copy out of the memory map; uint8, normalised on device
+        x = torch.from_numpy(np.array(tile)).permute(2, 0, 1)
+        y = torch.from_numpy(np.array(mask)).unsqueeze(0)
+
+        return x, y
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("data_dir", type=Path, help="directory with image/ and label/")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--num-images", type=int, default=None)
+    parser.add_argument("--max-tiles", type=int, default=300, help="tiles per image")
+    parser.add_argument("--fg-ratio", type=float, default=0.7)
+    parser.add_argument("--shard-size", type=int, default=256, help="tiles per shard")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--random-crops", action="store_true", help="any-offset crops instead of the tile grid")
+    args = parser.parse_args(argv)
+
+    image_paths = sorted((args.data_dir / "image").glob("*.tif"))[:args.num_images]
+    mask_paths = sorted((args.data_dir / "label").glob("*.tif"))[:args.num_images]
+
+    index_path = pack_shards(
+        image_paths,
+        mask_paths,
+        args.out_dir,
+        shard_size=args.shard_size,
+        max_tiles=args.max_tiles,
+        fg_ratio=args.fg_ratio,
+        seed=args.seed,
+        random_crops=args.random_crops,
+    )
+
+    with open(index_path) as f:
+        index = json.load(f)
+
+    size_mb = sum(p.stat().st_size for p in args.out_dir.glob("*.npy")) / 1e6
+    print(
+        f"{index['total']} tiles in {len(index['shards'])} shards "
+        f"({size_mb:.0f} MB) written to {args.out_dir}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,33 @@
 import torch
 import yaml
-from torch.utils.data import DataLoader, ConcatDataset
-from torch.amp import autocast, GradScaler
+from torch.utils.data import DataLoader
 from pathlib import Path
 
 from backend.models.efficient_unet import get_efficientnet_unet
-from training.dataset_production import RoofDatasetProduction
+from training.dataset_windowed import RoofWindowDataset
+from training.distributed import (
+    barrier,
+    cleanup,
+    device_for_rank,
+    init_distributed,
+    is_main,
+    make_sampler,
+    mean_across_ranks,
+    save_checkpoint,
+    wrap_model,
+)
+from training.shards import INDEX_NAME, ShardDataset, pack_shards
+from training.engine import make_scaler, setup_model, train_one_epoch
 from training.losses import BCEDiceLoss
 
 
-def train_one_epoch(model, loader, optimizer, loss_fn, scaler, device):
-    model.train()
-    total_loss = 0.0
-
-    for x, y in loader:
-        x = x.to(device)
-        y = y.to(device)
-
-        optimizer.zero_grad()
-
-        with autocast("cuda"):
-            preds = model(x)
-            loss = loss_fn(preds, y)
-
-        scaler.scale(loss).backward()
-        scaler.step(optimizer)
-        scaler.update()
-
-        total_loss += loss.item()
-
-    return total_loss / len(loader)
-
-
 def main():
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print("Using device:", device)
+    # One process unless launched with torchrun (see training/distributed.py)
+    rank, world_size = init_distributed(
+        "nccl" if torch.cuda.is_available() else "gloo"
+    )
+    device = device_for_rank()
+    print(f"Using device: {device} (rank {rank}/{world_size})")
 
     with open("training/configs/efficientnet.yaml") as f:
         cfg = yaml.safe_load(f)
@@ -46,29 +39,66 @@ def main():
     image_paths = sorted(IMAGE_DIR.glob("*.tif"))
     mask_paths = sorted(MASK_DIR.glob("*.tif"))
 
-    datasets = [
-        RoofDatasetProduction(
-            img,
-            msk,
-            max_tiles=cfg["max_tiles"],
-            fg_ratio=cfg["fg_ratio"],
+    sampling = {
+        "max_tiles": cfg["max_tiles"],
+        "fg_ratio": cfg["fg_ratio"],
+        "seed": cfg["seed"],
+        "random_crops": cfg["random_crops"],
+    }
+
+    if cfg["input_format"] == "shards":
+        shard_dir = Path(cfg["shard_dir"])
+
+        # Packed once, by rank 0; delete shard_dir to resample
+        if is_main() and not (shard_dir / INDEX_NAME).exists():
+            print(f"Packing training tiles into {shard_dir}")
+            pack_shards(
+                image_paths[:cfg["num_images"]],
+                mask_paths[:cfg["num_images"]],
+                shard_dir,
+                shard_size=cfg["shard_size"],
+                **sampling,
+            )
+        barrier()
+
+        dataset = ShardDataset(
+            shard_dir,
+            shuffle_buffer=cfg["shuffle_buffer"],
             seed=cfg["seed"],
         )
-        for img, msk in zip(image_paths[:cfg["num_images"]],
-                            mask_paths[:cfg["num_images"]])
-    ]
+    else:
+        # Tiles are read lazily; the window index is cached next to the data
+        dataset = RoofWindowDataset(
+            image_paths[:cfg["num_images"]],
+            mask_paths[:cfg["num_images"]],
+            index_path=DATA_DIR / "tile_index.json",
+            **sampling,
+        )
 
-    dataset = ConcatDataset(datasets)
+    # ShardDataset shuffles and splits across ranks itself (shard
+    # order + shuffle buffer); window datasets use a DistributedSampler
+    sampler = None
+    if not isinstance(dataset, ShardDataset):
+        sampler = make_sampler(dataset, seed=cfg["seed"])
 
     loader = DataLoader(
         dataset,
         batch_size=cfg["batch_size"],
-        shuffle=True,
+        shuffle=sampler is None and not isinstance(dataset, ShardDataset),
+        sampler=sampler,
         num_workers=cfg["num_workers"],
         pin_memory=True,
     )
 
-    model = get_efficientnet_unet().to(device)
+    # Rank 0 downloads the ImageNet weights, the other ranks then read
+    # them from the cache
+    if not is_main():
+        barrier()
+    model = get_efficientnet_unet()
+    if is_main():
+        barrier()
+
+    model = wrap_model(setup_model(model, device, cfg["channels_last"]))
 
     optimizer = torch.optim.AdamW(
         model.parameters(),
@@ -77,16 +107,42 @@ def main():
     )
 
     loss_fn = BCEDiceLoss()
-    scaler = GradScaler("cuda")
+    scaler = make_scaler(device, cfg["amp"])
+
+    if is_main():
+        print(
+            f"Effective batch size "
+            f"{cfg['batch_size'] * cfg['accumulation_steps'] * world_size}"
+            f" (amp={cfg['amp']}, channels_last={cfg['channels_last']},"
+            f" ranks={world_size})"
+        )
 
     for epoch in range(cfg["epochs"]):
+        if isinstance(dataset, ShardDataset):
+            dataset.set_epoch(epoch)
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+
         loss = train_one_epoch(
-            model, loader, optimizer, loss_fn, scaler, device
+            model,
+            loader,
+            optimizer,
+            loss_fn,
+            device,
+            amp=cfg["amp"],
+            scaler=scaler,
+            accumulation_steps=cfg["accumulation_steps"],
+            channels_last=cfg["channels_last"],
         )
-        print(f"Epoch {epoch+1}/{cfg['epochs']} — Loss: {loss:.4f}")
+        loss = mean_across_ranks(loss)
+
+        if is_main():
+            print(f"Epoch {epoch+1}/{cfg['epochs']} — Loss: {loss:.4f}")
+
+    if save_checkpoint(model, "efficientnet_unet.pth"):
+        print("Model saved as efficientnet_unet.pth")
 
-    torch.save(model.state_dict(), "efficientnet_unet.pth")
-    print("Model saved as efficientnet_unet.pth")
+    cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import numpy as np
+import torch
+import torch.nn as nn
+import yaml
+from torch.utils.data import DataLoader, ConcatDataset
+from pathlib import Path
+
+from backend.models.tile_classifier import TileClassifier
+from training.dataset_production import (
+    GridTriageDataset,
+    RoofDatasetProduction,
+    TileTriageDataset,
+)
+from training.engine import prepare_batch, train_one_epoch
+
+THRESHOLDS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5]
+
+
+def load_split(paths, cfg):
+    return ConcatDataset([
+        TileTriageDataset(
+            RoofDatasetProduction(
+                img,
+                msk,
+                max_tiles=cfg["max_tiles"],
+                fg_ratio=cfg["fg_ratio"],
+                seed=cfg["seed"],
+            )
+        )
+        for img, msk in paths
+    ])
+
+
+@torch.no_grad()
+def evaluate_triage(model, loader, device, thresholds=THRESHOLDS):
+    """
+    Skip rate vs missed-roof rate per threshold on held-out tiles.
+
+    Pass every grid tile of the held-out scenes (GridTriageDataset):
+    on a balanced split, skip_rate says nothing about real scenes.
+    A tile is skipped when its roof probability is below the threshold;
+    missed_roof_rate is the fraction of roof tiles that would be skipped.
+    """
+    model.eval()
+    probs, labels = [], []
+
+    for x, y in loader:
+        x, y = prepare_batch(x, y, device)
+
+        probs.append(torch.sigmoid(model(x)).cpu().numpy().ravel())
+        labels.append(y.cpu().numpy().ravel())
+
+    probs = np.concatenate(probs)
+    has_roof = np.concatenate(labels) > 0.5
+
+    rows = []
+    for t in thresholds:
+        skipped = probs < t
+        rows.append({
+            "threshold": t,
+            "skip_rate": float(skipped.mean()),
+            "empty_skip_rate": float(skipped[~has_roof].mean()) if (~has_roof).any() else 0.0,
+            "missed_roof_rate": float(skipped[has_roof].mean()) if has_roof.any() else 0.0,
+        })
+
+    return rows
+
+
+def main():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print("Using device:", device)
+
+    with open("training/configs/triage.yaml") as f:
+        cfg = yaml.safe_load(f)
+
+    DATA_DIR = Path(cfg["data_dir"])
+    image_paths = sorted((DATA_DIR / "image").glob("*.tif"))
+    mask_paths = sorted((DATA_DIR / "label").glob("*.tif"))
+
+    pairs = list(zip(image_paths, mask_paths))[:cfg["num_images"]]
+    train_pairs = pairs[:-cfg["val_images"]]
+    val_pairs = pairs[-cfg["val_images"]:]
+
+    train_loader = DataLoader(
+        load_split(train_pairs, cfg),
+        batch_size=cfg["batch_size"],
+        shuffle=True,
+        num_workers=cfg["num_workers"],
+    )
+    # All tiles of the held-out scenes, not a balanced sample
+    val_loader = DataLoader(
+        ConcatDataset([GridTriageDataset(img, msk) for img, msk in val_pairs]),
+        batch_size=cfg["batch_size"],
+        num_workers=cfg["num_workers"],
+    )
+
+    model = TileClassifier().to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=cfg["lr"])
+    loss_fn = nn.BCEWithLogitsLoss()
+
+    for epoch in range(cfg["epochs"]):
+        loss = train_one_epoch(model, train_loader, optimizer, loss_fn, device)
+        print(f"Epoch {epoch+1}/{cfg['epochs']} — Loss: {loss:.4f}")
+
+    rows = evaluate_triage(model, val_loader, device)
+
+    roof_tiles = sum(sum(d.has_roof) for d in val_loader.dataset.datasets)
+    print(
+        f"Held out: all {len(val_loader.dataset)} tiles of {len(val_pairs)} "
+        f"scene(s), {roof_tiles} with roofs"
+    )
+
+    print(f"{'threshold':>9} {'skip rate':>9} {'empty skipped':>13} {'roofs missed':>12}")
+    for r in rows:
+        print(
+            f"{r['threshold']:>9.2f} {r['skip_rate']:>9.3f} "
+            f"{r['empty_skip_rate']:>13.3f} {r['missed_roof_rate']:>12.3f}"
+        )
+
+    ok = [r for r in rows if r["missed_roof_rate"] <= cfg["max_missed_rate"]]
+    if ok:
+        best = max(ok, key=lambda r: r["threshold"])
+        print(
+            f"TRIAGE_THRESHOLD={best['threshold']} skips {best['skip_rate']:.1%} "
+            f"of tiles, missing {best['missed_roof_rate']:.1%} of roof tiles"
+        )
+    else:
+        print(f"No threshold misses at most {cfg['max_missed_rate']:.1%} of roof tiles")
+
+    torch.save(model.state_dict(), "tile_triage.pth")
+    print("Model saved as tile_triage.pth")
+
+
+if __name__ == "__main__":
+    main()
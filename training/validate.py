@@ -0,0 +1,25 @@
+import torch
+
+from training.engine import prepare_batch
+
+
+@torch.no_grad()
+def evaluate_iou(model, loader, device, threshold=0.5):
+    """
+    Foreground IoU of a segmentation model over a labelled loader,
+    accumulated over all pixels (not averaged per tile).
+    """
+    model.eval()
+    intersection = 0
+    union = 0
+
+    for x, y in loader:
+        x, y = prepare_batch(x, y, device)
+
+        preds = torch.sigmoid(model(x)) >= threshold
+        labels = y > 0.5
+
+        intersection += (preds & labels).sum().item()
+        union += (preds | labels).sum().item()
+
+    return intersection / union if union else 1.0